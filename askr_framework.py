@@ -2,10 +2,15 @@
 
 import json
 import os
+import sys
 import importlib
+import importlib.util
 import inspect
+import ast
 import requests
+import requests.adapters
 import logging
+import logging.handlers
 import sqlite3
 import time
 import datetime
@@ -13,9 +18,22 @@ import threading
 import multiprocessing
 import signal
 import resource
+import fcntl
+import tempfile
 import psutil
 import queue
+import heapq
+import math
+import collections
+import multiprocessing.connection
+import multiprocessing.shared_memory
+import struct
 import hashlib
+import atexit
+import re
+import random
+import bisect
+import urllib.parse
 from flask import Flask, request
 from typing import List, Dict, Optional, Union, Any, Callable
 import threading
@@ -41,9 +59,98 @@ EVENT_INHERITANCE = {
     "MESSAGE_GROUP_BOT": ["MESSAGE_GROUP"],
 }
 
-PLUGIN_REGISTRY = {}  # type: Dict[str, List[callable]]
-UNCONDITIONAL_REGISTRY = []  # type: List[tuple[callable, int]]
-INITIALIZER_REGISTRY = []  # type: List[tuple[callable, str]]
+# Handlers are referenced as "module:function" so the parent never imports plugin code
+PLUGIN_REGISTRY = {}  # type: Dict[str, List[str]]
+UNCONDITIONAL_REGISTRY = []  # type: List[tuple[str, Dict]]
+INITIALIZER_REGISTRY = []  # type: List[tuple[str, str]]
+DEPENDENCY_REGISTRY = {}  # type: Dict[str, List[str]]
+SERVICE_REGISTRY = []  # type: List[str]
+DEFERRED_REGISTRY = {}  # type: Dict[str, str]
+
+SCHEDULER_JOBS = {}  # type: Dict[str, Dict]
+SCHEDULER_LOCK = threading.Lock()
+SCHEDULER_WAKE = threading.Event()
+DEFERRED_HEAP_ = []  # type: List[tuple[float, int, str, str]]
+DEFERRED_PENDING = {}  # type: Dict[str, int]
+DEFERRED_NEXT_ID = 1
+PRELOAD_REGISTRY = []  # type: List[str]
+LOADED_PLUGINS_ = []  # type: List[str]  # Plugins that survived initialization
+TRIGGER_REGISTRY = {}  # type: Dict[str, List[tuple[str, Dict]]]
+TRIGGER_MATCHERS = {}  # type: Dict[str, Dict]
+
+TRIGGER_EVENT_TYPES_: List[str] = ["MESSAGE_PRIVATE", "MESSAGE_GROUP", "MESSAGE_GROUP_MENTION", "MESSAGE_GROUP_BOT"]
+TRIGGER_KINDS_: List[str] = ["exact", "prefix", "keyword", "regex"]
+SCHEDULE_KEYS_: List[str] = ["handler", "seconds", "minutes", "cron", "jitter", "overlap", "missed"]
+SCHEDULE_OVERLAP_POLICIES_: List[str] = ["skip", "queue_one", "parallel"]
+SCHEDULE_MISSED_POLICIES_: List[str] = ["skip", "catch_up"]
+CRON_RANGES_: List[tuple[int, int]] = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]  # minute hour day month weekday
+HANDLER_PARAMS_: List[str] = ["simpleEvent", "rawEvent", "botContext"]
+
+SWITCH_STATIC = {}  # type: Dict[str, Dict]
+SWITCH_RUNTIME = {}  # type: Dict[tuple[str, str, str], bool]
+SWITCH_SCOPES_: List[str] = ["group", "user"]
+SWITCH_LIST_KEYS_: List[str] = ["allow_groups", "deny_groups", "allow_users", "deny_users"]
+
+PLUGIN_CONFIG_CACHE = {}  # type: Dict[str, tuple[int, str]]
+PLUGIN_CONFIG_COMMITTED = {}  # type: Dict[str, tuple[int, str]]  # last version known to be in the database
+PLUGIN_CONFIG_LOCK = threading.Lock()
+PLUGIN_KV_STORE = {}  # type: Dict[str, Dict[str, tuple[str, Optional[float]]]]
+PLUGIN_KV_LOCK = threading.Lock()
+PLUGIN_KV_PENDING = {}  # type: Dict[tuple[str, str], list]  # (plugin, key) -> [unwritten changes, entry last known to be in the database]
+PLUGIN_KV_SWEPT_AT = 0.0
+KV_ABSENT = object()  # botContext["KvAbsent"], the expected value of KvCompareAndSwap for a key that must not exist
+
+SHARED_STATE_HANDLE = None  # type: Optional[tuple[str, str, int, int]]  # (memory name, lock file, slots, slot size)
+SHARED_STATE_MEMORY = None  # type: Optional[multiprocessing.shared_memory.SharedMemory]
+SHARED_STATE_LOCK = None  # type: Optional[tuple[int, int, threading.Lock]]  # (pid, lock file descriptor, thread lock) of this process
+SHARED_STATE_COMPACTED_AT = 0.0
+SHARED_STATE_HEADER = struct.Struct("<qq")  # live entries, tombstones
+SHARED_STATE_SLOT = struct.Struct("<BBHxxxxQ")  # state (0 empty, 1 live, 2 tombstone), kind (0 int, 1 float), key length, key hash
+SHARED_STATE_VALUES_ = [struct.Struct("<qd"), struct.Struct("<dd")]  # value and expiry (0 never) at slot offset 16, by kind
+SHARED_STATE_KEY_OFFSET = 32
+
+WORKER_POOLS = {}  # type: Dict[str, Dict]
+WORKER_POOLS_LOCK = threading.Lock()
+
+SUPERVISOR_LOCK = threading.Lock()
+SUPERVISOR_PENDING = []  # type: List[Dict]
+SUPERVISOR_THREAD = None  # type: Optional[threading.Thread]
+SUPERVISOR_WAKE_RECV = None
+SUPERVISOR_WAKE_SEND = None
+SUPERVISOR_SIGNALED = False
+
+HISTORIAN_CONDITION = threading.Condition()
+HISTORIAN_PENDING = []  # type: List[Dict]
+HISTORIAN_FLUSHING = 0
+
+HTTP_SESSION = None  # type: Optional[requests.Session]
+HTTP_SESSION_PID = None  # type: Optional[int]
+HTTP_SESSION_LOCK = threading.Lock()
+
+OUTBOUND_QUEUES_ = []  # type: List[queue.Queue]
+OUTBOUND_DROPPED = 0  # Replies dropped on the supervisor thread because their sender queue was full
+
+WORKER_TASK_PIPE = None  # Set inside worker processes only
+WORKER_MEMORY_EXIT_CODE = 3  # A worker exits with this code when it cannot even report a MemoryError
+PARENT_REPLY_PENDING = object()  # Returned by ParentRequestHandler when the reply is sent later
+HANDLER_CACHE = {}  # type: Dict[str, Callable]
+WORKER_DATABASE = None  # type: Optional[sqlite3.Connection]
+WORKER_DATABASE_PID = None  # type: Optional[int]
+WORKER_DATABASE_LOCK = threading.Lock()
+
+DISPATCH_QUEUE = None  # type: Optional[queue.Queue]
+DISPATCH_LOCK = threading.Lock()
+DISPATCH_STATS = {"enqueued": 0, "dispatched": 0, "dropped": 0, "rejected": 0, "max_depth": 0}
+
+METRICS_LOCK = threading.Lock()
+METRICS_STAGES_: List[str] = ["ingress_parse", "historian_write", "process_spawn", "plugin_execution", "result_receive", "outbound_send"]
+METRICS_BUCKETS_: List[float] = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+METRICS_HISTOGRAMS = {stage: [0] * (len(METRICS_BUCKETS_) + 1) + [0.0] for stage in METRICS_STAGES_}  # type: Dict[str, List]
+METRICS_COUNTERS = {}  # type: Dict[tuple[str, str, str], int]
+
+PLUGIN_STATS_LOCK = threading.Lock()
+PLUGIN_STATS_ROLLED_HOUR = None  # type: Optional[int]
+PLUGIN_STATS_DIMENSIONS = {"plugins": "PLUGIN_NAME", "events": "EVENT_TYPE", "groups": "GROUP_ID"}
 
 CONFIG = {
     'NAPCAT_SERVER': {'api_url': 'http://localhost:29217'},
@@ -56,21 +163,85 @@ CONFIG = {
     'HTTP': {
         'max_retries': 3,
         'timeout_seconds': 10,
-        'status_check_timeout': 5
+        'status_check_timeout': 5,
+        'pool_connections': 4,
+        'pool_maxsize': 16,
+        'sender_threads': 4,
+        'send_queue_size': 1000
     },
     'PLUGIN_EXECUTION': {
         'max_cpu_time_seconds': 3.0,
         'max_wall_time_seconds': 30.0,
         'memory_limit_mb': 100,
-        'monitor_interval_seconds': 0.1,
-        'process_creation_method': 'spawn'
+        'memory_check_interval_seconds': 1.0,  # RSS polling of running workers, for platforms without RLIMIT_AS
+        'process_creation_method': 'spawn',
+        'initializer_parallelism': 4
+    },
+    'WORKER_POOL': {
+        'min_workers': 1,
+        'max_workers': 4,
+        'max_invocations': 500,
+        'max_rss_growth_mb': 50,
+        'idle_timeout_seconds': 300
+    },
+    'DISPATCH': {
+        'queue_size': 1000,
+        'worker_count': 8,
+        'backpressure_policy': 'block',  # 'reject', 'drop_oldest' or 'block'
+        'block_timeout_seconds': 5.0
+    },
+    'SERVICE': {
+        'memory_limit_mb': 200,
+        'max_cpu_percent': 50,  # Average over each check interval, 100 is one full core
+        'cpu_check_interval_seconds': 10,
+        'restart_backoff_initial_seconds': 5,
+        'restart_backoff_max_seconds': 300,
+        'stable_after_seconds': 300  # Backoff resets once a service has run this long
+    },
+    'SCHEDULER': {
+        'default_jitter_seconds': 10  # Spreads jobs that are due at the same moment
+    },
+    'DEFERRED': {
+        'max_delay_seconds': 30 * 86400,
+        'max_payload_bytes': 65536,
+        'max_pending_per_plugin': 1000
+    },
+    'PLUGIN_KV': {
+        'max_key_length': 256,
+        'max_value_bytes': 65536,
+        'max_scan_results': 1000,
+        'max_keys_per_plugin': 10000,
+        'sweep_interval_seconds': 60  # Expired keys are also dropped whenever they are touched
+    },
+    'SHARED_STATE': {
+        'slots': 16384,
+        'max_key_bytes': 96,  # Plugin name and key, UTF-8 encoded
+        'max_load': 0.75
+    },
+    'PLUGIN_STATS': {
+        'raw_retention_hours': 48,  # Per-invocation rows, older hours only remain as rollups
+        'hourly_retention_days': 30
+    },
+    'WORKER_DATABASE': {
+        'mmap_size_mb': 64,  # 0 disables memory-mapped reads
+        'cache_size_kb': 8192,
+        'cached_statements': 32
+    },
+    'HISTORIAN': {
+        'batch_max_rows': 200,
+        'batch_interval_ms': 50,
+        'synchronous': 'NORMAL'  # SQLite PRAGMA synchronous: 'OFF', 'NORMAL' or 'FULL'
     },
     'ADMIN_NOTIFICATION': {
         'enabled': False,
         'admin_qq': 999999999,
         'notify_level': 'WARNING',
-        'rate_limit_seconds': 300,
-        'message_format': 'Alert \n[{level}] {time}\n{message}'
+        'rate_limit_seconds': 300,  # The same message is sent at most once per this many seconds
+        'message_format': 'Alert \n[{level}] {time}\n{message}',
+        'queue_size': 200,
+        'digest_window_seconds': 5,  # Alerts arriving within this window share one message
+        'digest_max_records': 20,
+        'dedupe_max_entries': 1000
     }
 }
 
@@ -79,106 +250,121 @@ logging.basicConfig(level=logging.INFO)
 IS_MUTED = False
 
 LOGGING_LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40, 'CRITICAL': 50}
-AdminNotificationInProgress = False
-AdminNotificationLast = {}  # Rate limiting: {messageHash: timestamp}
+ADMIN_NOTIFICATION_QUEUE = None  # type: Optional[queue.Queue]
+ADMIN_NOTIFICATION_DROPPED = 0
+
+class AdminNotificationHandler(logging.handlers.QueueHandler):
+    # Hands records to the notifier thread, logging calls never block on the network
+    def __init__(self, notificationQueue: queue.Queue):
+        super().__init__(notificationQueue)
+        self.ownerPid = os.getpid()
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        # Forked workers inherit the handler but not the notifier thread, and the notifier must not alert on itself
+        if os.getpid() != self.ownerPid or record.threadName == "askr-notifier":
+            return
+        super().emit(record)
+    
+    def enqueue(self, record: logging.LogRecord) -> None:
+        global ADMIN_NOTIFICATION_DROPPED
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            ADMIN_NOTIFICATION_DROPPED += 1
 
 def MessageHasher(message: str) -> str:
     return hashlib.md5(message.encode('utf-8')).hexdigest()[:8]
 
-def NotificationEligibilityChecker(recordLevelName: str) -> bool:
-    if not CONFIG['ADMIN_NOTIFICATION']['enabled']:
-        return False
-    if not CONFIG['ADMIN_NOTIFICATION']['admin_qq']:
-        return False
-    
-    configLevel = CONFIG['ADMIN_NOTIFICATION']['notify_level']
-    configLevelNum = LOGGING_LEVELS.get(configLevel, 40)
-    recordLevelNum = LOGGING_LEVELS.get(recordLevelName, 0)
+def AdminNotifier(notificationQueue: queue.Queue) -> None:
+    global ADMIN_NOTIFICATION_DROPPED
+    notificationConfig = CONFIG['ADMIN_NOTIFICATION']
+    lastSent = collections.OrderedDict()  # type: collections.OrderedDict[str, float]
     
-    return recordLevelNum >= configLevelNum
-
-def QQNotificationSender(level: str, message: str) -> None:
-    def _sendNotification():
-        global AdminNotificationInProgress
+    while True:
+        records_ = [notificationQueue.get()]
         
-        if AdminNotificationInProgress:
-            return
+        # A burst of alerts becomes one digest instead of one message each
+        deadline = time.time() + notificationConfig['digest_window_seconds']
+        while len(records_) < notificationConfig['digest_max_records']:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                records_.append(notificationQueue.get(timeout=remaining))
+            except queue.Empty:
+                break
         
-        # Rate limiting based on message content hash
+        # Oldest entries first, so expired hashes are always at the front
         currentTime = time.time()
-        rateLimit = CONFIG['ADMIN_NOTIFICATION']['rate_limit_seconds']
-        messageHash = MessageHasher(message)
-        lastTime = AdminNotificationLast.get(messageHash, 0)
+        rateLimit = notificationConfig['rate_limit_seconds']
+        while lastSent and next(iter(lastSent.values())) < currentTime - rateLimit:
+            lastSent.popitem(last=False)
         
-        if currentTime - lastTime < rateLimit:
-            return
+        entries_ = []
+        repeated = 0
+        for record in records_:
+            message = record.getMessage()
+            messageHash = MessageHasher(message)
+            if messageHash in lastSent:
+                repeated += 1
+                continue
+            lastSent[messageHash] = currentTime
+            if len(lastSent) > notificationConfig['dedupe_max_entries']:
+                lastSent.popitem(last=False)
+            entries_.append((record.levelno, record.levelname, message))
+        
+        dropped, ADMIN_NOTIFICATION_DROPPED = ADMIN_NOTIFICATION_DROPPED, 0
+        if not entries_:
+            continue
+        
+        if len(entries_) == 1:
+            levelName, digestText = entries_[0][1], entries_[0][2]
+        else:
+            levelName = max(entries_)[1]
+            digestText = "\n".join(f"[{entryLevel}] {message}" for levelNo, entryLevel, message in entries_)
+        if repeated or dropped:
+            digestText += f"\n({repeated} repeated, {dropped} dropped)"
+        
+        notificationText = notificationConfig['message_format'].format(
+            level=levelName, time=datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'), message=digestText
+        )
+        requestBody = {
+            "user_id": notificationConfig['admin_qq'],
+            "message": [{"type": "text", "data": {"text": notificationText}}]
+        }
         
-        AdminNotificationInProgress = True
         try:
-            formattedTime = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            notificationText = CONFIG['ADMIN_NOTIFICATION']['message_format'].format(
-                level=level, time=formattedTime, message=message
-            )
-            
-            adminQQ = CONFIG['ADMIN_NOTIFICATION']['admin_qq']
-            requestBody = {
-                "user_id": adminQQ,
-                "message": [{"type": "text", "data": {"text": notificationText}}]
-            }
-            
-            baseUrl = CONFIG['NAPCAT_SERVER']['api_url']
-            fullUrl = f"{baseUrl}/send_private_msg"
-            
-            response = requests.post(fullUrl, json=requestBody, timeout=5.0)
-            
-            if response.status_code == 200:
-                AdminNotificationLast[messageHash] = currentTime
-                
-        except Exception:
-            # Silent failure to avoid recursion
-            pass
-        finally:
-            AdminNotificationInProgress = False
-    
-    # Background thread to avoid blocking
-    thread = threading.Thread(target=_sendNotification, daemon=True)
-    thread.start()
+            response = HttpSessionGetter().post(f"{CONFIG['NAPCAT_SERVER']['api_url']}/send_private_msg",
+                                                json=requestBody, timeout=5.0)
+            if response.status_code != 200:
+                logging.warning(f"Admin notification failed with HTTP {response.status_code}")
+        except Exception as e:
+            # Records from this thread are filtered out by the handler, so this cannot recurse
+            logging.warning(f"Admin notification failed: {e}")
 
 def LoggingNotificationConfigurator() -> None:
-    if not CONFIG['ADMIN_NOTIFICATION']['enabled']:
+    global ADMIN_NOTIFICATION_QUEUE
+    notificationConfig = CONFIG['ADMIN_NOTIFICATION']
+    
+    if not notificationConfig['enabled'] or not notificationConfig['admin_qq'] or ADMIN_NOTIFICATION_QUEUE is not None:
         return
     
-    # Monkey patch logging functions
-    originalFunctions = {
-        'debug': logging.debug, 'info': logging.info, 'warning': logging.warning,
-        'error': logging.error, 'critical': logging.critical
-    }
+    ADMIN_NOTIFICATION_QUEUE = queue.Queue(maxsize=notificationConfig['queue_size'])
     
-    def EnhancedLoggingCreator(levelName: str, originalFunc):
-        def enhancedLogging(msg, *args, **kwargs):
-            originalFunc(msg, *args, **kwargs)
-            
-            if NotificationEligibilityChecker(levelName):
-                try:
-                    formattedMsg = msg % args if args else str(msg)
-                    QQNotificationSender(levelName, formattedMsg)
-                except:
-                    pass
-        return enhancedLogging
+    notificationHandler = AdminNotificationHandler(ADMIN_NOTIFICATION_QUEUE)
+    notificationHandler.setLevel(LOGGING_LEVELS.get(notificationConfig['notify_level'], 40))
+    logging.getLogger().addHandler(notificationHandler)
     
-    for levelName, originalFunc in originalFunctions.items():
-        enhancedFunc = EnhancedLoggingCreator(levelName.upper(), originalFunc)
-        setattr(logging, levelName, enhancedFunc)
+    thread = threading.Thread(target=AdminNotifier, args=(ADMIN_NOTIFICATION_QUEUE,), name="askr-notifier", daemon=True)
+    thread.start()
 
-def AdminDispatcher(rawEvent: Dict) -> bool:
+def AdminDispatcher(parsedEvent: "ParsedEvent") -> bool:
     global IS_MUTED
     
     adminQQ = CONFIG['ADMIN_NOTIFICATION']['admin_qq']
-    if (rawEvent.get("post_type") == "message" and 
-        rawEvent.get("message_type") == "private" and
-        rawEvent.get("user_id") == adminQQ):
+    if parsedEvent.eventType == "MESSAGE_PRIVATE" and parsedEvent.userId == adminQQ:
         
-        command = rawEvent.get("raw_message", "").strip()
+        command = parsedEvent.rawEvent.get("raw_message", "").strip()
         
         if command == "mute":
             IS_MUTED = True
@@ -186,8 +372,40 @@ def AdminDispatcher(rawEvent: Dict) -> bool:
             return True
         elif command == "unmute":
             IS_MUTED = False
+            SCHEDULER_WAKE.set()  # Let catch_up jobs run what they missed
             logging.info(f"Admin {adminQQ} deactivated mute mode")
             return True
+        
+        # stats [hours], queried off the listener thread and sent back to the admin
+        if command == "stats" or command.startswith("stats "):
+            statsHours = command[6:].strip()
+            statsHours = int(statsHours) if statsHours.isdigit() and int(statsHours) > 0 else 24
+            
+            def _sendStats():
+                OutboundEnqueuer(PluginStatsReporter(statsHours), parsedEvent)
+            
+            threading.Thread(target=_sendStats, daemon=True).start()
+            logging.info(f"Admin {adminQQ} requested plugin stats for the last {statsHours}h")
+            return True
+        
+        # enable|disable|reset <plugin> group|user <id>, the outcome is sent back to the admin
+        commandParts_ = command.split()
+        if len(commandParts_) == 4 and commandParts_[0] in ("enable", "disable", "reset"):
+            switchAction, pluginName, scope, targetId = commandParts_
+            enabled = {"enable": True, "disable": False, "reset": None}[switchAction]
+            if pluginName not in LOADED_PLUGINS_:
+                switchReply = f"Unknown plugin '{pluginName}'. Loaded plugins: {', '.join(LOADED_PLUGINS_)}"
+            elif scope not in SWITCH_SCOPES_:
+                switchReply = f"Unknown scope '{scope}', expected one of: {', '.join(SWITCH_SCOPES_)}"
+            elif not targetId.isdigit():
+                switchReply = f"Invalid {scope} id '{targetId}', expected a number"
+            elif PluginSwitchSetter(pluginName, scope, targetId, enabled):
+                switchReply = f"Plugin {pluginName} {switchAction} for {scope} {targetId}: done"
+                logging.info(f"Admin {adminQQ} set plugin {pluginName} {switchAction} for {scope} {targetId}")
+            else:
+                switchReply = f"Plugin {pluginName} {switchAction} for {scope} {targetId}: failed"
+            OutboundEnqueuer(switchReply, parsedEvent)
+            return True
     
     return False
 
@@ -253,10 +471,101 @@ def DatabaseInitializer() -> None:
                 PLUGIN_NAME TEXT PRIMARY KEY,
                 CONFIG_DATA TEXT NOT NULL,
                 CREATED_AT INTEGER NOT NULL,
+                UPDATED_AT INTEGER NOT NULL,
+                VERSION INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        
+        # Databases created before config versions lack the column
+        configColumns_ = [row[1] for row in databaseConnect.execute("PRAGMA table_info(PLUGIN_CONFIGS)")]
+        if "VERSION" not in configColumns_:
+            databaseConnect.execute("ALTER TABLE PLUGIN_CONFIGS ADD COLUMN VERSION INTEGER NOT NULL DEFAULT 0")
+        
+        # Plugin key-value table (one row per key, VALUE is JSON, EXPIRES_AT NULL never expires)
+        databaseConnect.execute("""
+            CREATE TABLE IF NOT EXISTS PLUGIN_KV (
+                PLUGIN_NAME TEXT NOT NULL,
+                KEY TEXT NOT NULL,
+                VALUE TEXT NOT NULL,
+                EXPIRES_AT REAL,
+                UPDATED_AT INTEGER NOT NULL,
+                PRIMARY KEY (PLUGIN_NAME, KEY)
+            )
+        """)
+        databaseConnect.execute("""
+            CREATE INDEX IF NOT EXISTS IDX_PLUGIN_KV_EXPIRES 
+            ON PLUGIN_KV(EXPIRES_AT)
+        """)
+        
+        # Plugin switches table (runtime per-group/per-user toggles)
+        databaseConnect.execute("""
+            CREATE TABLE IF NOT EXISTS PLUGIN_SWITCHES (
+                PLUGIN_NAME TEXT NOT NULL,
+                SCOPE TEXT NOT NULL,
+                TARGET_ID TEXT NOT NULL,
+                ENABLED INTEGER NOT NULL,
+                UPDATED_AT INTEGER NOT NULL,
+                PRIMARY KEY (PLUGIN_NAME, SCOPE, TARGET_ID)
+            )
+        """)
+        
+        # Scheduler state table (last handled run of each UNCONDITIONAL job)
+        databaseConnect.execute("""
+            CREATE TABLE IF NOT EXISTS SCHEDULER_STATE (
+                JOB_ID TEXT PRIMARY KEY,
+                LAST_DUE REAL NOT NULL,
                 UPDATED_AT INTEGER NOT NULL
             )
         """)
         
+        # Plugin stats table (one row per invocation, pruned after raw_retention_hours)
+        databaseConnect.execute("""
+            CREATE TABLE IF NOT EXISTS PLUGIN_STATS (
+                ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                PLUGIN_NAME TEXT NOT NULL,
+                EVENT_TYPE TEXT NOT NULL,
+                GROUP_ID INTEGER,
+                WALL_TIME REAL NOT NULL,
+                CPU_TIME REAL,
+                PEAK_RSS INTEGER,
+                EXIT_REASON TEXT NOT NULL,
+                TIMESTAMP INTEGER NOT NULL
+            )
+        """)
+        databaseConnect.execute("""
+            CREATE INDEX IF NOT EXISTS IDX_PLUGIN_STATS_TIME 
+            ON PLUGIN_STATS(TIMESTAMP)
+        """)
+        
+        # Hourly plugin stats rollups, GROUP_ID 0 means no group
+        databaseConnect.execute("""
+            CREATE TABLE IF NOT EXISTS PLUGIN_STATS_HOURLY (
+                HOUR INTEGER NOT NULL,
+                PLUGIN_NAME TEXT NOT NULL,
+                EVENT_TYPE TEXT NOT NULL,
+                GROUP_ID INTEGER NOT NULL,
+                INVOCATIONS INTEGER NOT NULL,
+                FAILURES INTEGER NOT NULL,
+                WALL_TIME_SUM REAL NOT NULL,
+                WALL_TIME_MAX REAL NOT NULL,
+                CPU_TIME_SUM REAL NOT NULL,
+                CPU_TIME_MAX REAL NOT NULL,
+                PEAK_RSS_MAX INTEGER NOT NULL,
+                PRIMARY KEY (HOUR, PLUGIN_NAME, EVENT_TYPE, GROUP_ID)
+            )
+        """)
+        
+        # Deferred invocations table (plugin callbacks waiting for their due time)
+        databaseConnect.execute("""
+            CREATE TABLE IF NOT EXISTS DEFERRED_INVOCATIONS (
+                ID INTEGER PRIMARY KEY,
+                PLUGIN_NAME TEXT NOT NULL,
+                DUE_AT REAL NOT NULL,
+                PAYLOAD TEXT NOT NULL,
+                CREATED_AT INTEGER NOT NULL
+            )
+        """)
+        
         databaseConnect.commit()
         databaseConnect.close()
         
@@ -266,38 +575,895 @@ def DatabaseInitializer() -> None:
         logging.critical(f"Failed to initialize database: {e}")
         sys.exit(1)
 
+def CronParser(expression: str) -> List[set]:
+    fields_ = expression.split()
+    if len(fields_) != 5:
+        raise ValueError(f"cron expression needs 5 fields, got {len(fields_)}")
+    
+    cronFields_ = []
+    for field, (lowest, highest) in zip(fields_, CRON_RANGES_):
+        values = set()
+        for part in field.split(","):
+            rangePart, _, stepPart = part.partition("/")
+            step = int(stepPart) if stepPart else 1
+            if rangePart == "*":
+                start, end = lowest, highest
+            elif "-" in rangePart:
+                start, end = (int(bound) for bound in rangePart.split("-", 1))
+            else:
+                start = int(rangePart)
+                end = highest if stepPart else start
+            if step <= 0 or start < lowest or end > highest or start > end:
+                raise ValueError(f"cron field '{field}' is out of range {lowest}-{highest}")
+            values.update(range(start, end + 1, step))
+        cronFields_.append(values)
+    
+    # Both 0 and 7 mean Sunday
+    if 7 in cronFields_[4]:
+        cronFields_[4] = (cronFields_[4] - {7}) | {0}
+    
+    # Like cron, a restricted day of month and day of week match when either one does
+    dayRestricted = fields_[2] != "*" and fields_[4] != "*"
+    return cronFields_ + [dayRestricted]
+
+def CronNextTime(cronFields_: List, after: float) -> Optional[float]:
+    minutes_, hours_, days_, months_, weekdays_, dayRestricted = cronFields_
+    moment = datetime.datetime.fromtimestamp(after).replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+    
+    # Jump whole months, days and hours at a time, a few hundred steps cover any expression
+    for _ in range(10000):
+        if moment.month not in months_:
+            moment = (moment.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)).replace(day=1)
+            continue
+        
+        dayMatched = moment.day in days_
+        weekdayMatched = (moment.weekday() + 1) % 7 in weekdays_
+        if dayRestricted:
+            dayMatched = dayMatched or weekdayMatched
+        else:
+            dayMatched = dayMatched and weekdayMatched
+        if not dayMatched:
+            moment = moment.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            continue
+        
+        if moment.hour not in hours_:
+            moment = moment.replace(minute=0) + datetime.timedelta(hours=1)
+            continue
+        
+        if moment.minute not in minutes_:
+            moment += datetime.timedelta(minutes=1)
+            continue
+        
+        return moment.timestamp()
+    
+    return None
+
+def ScheduleNextRun(schedule: Dict, after: float) -> Optional[float]:
+    if schedule["kind"] == "cron":
+        return CronNextTime(schedule["cron"], after)
+    
+    # Interval jobs keep their phase, so late runs never push the following ones back
+    period = schedule["seconds"]
+    return schedule["anchor"] + (math.floor((after - schedule["anchor"]) / period) + 1) * period
+
+def ScheduleRegistrar(moduleName: str, scheduleSpec: Any, topLevelNames: Dict[str, Optional[set]]) -> None:
+    # Legacy forms: "handler" runs every minute, ["handler", N] on minutes divisible by N
+    if isinstance(scheduleSpec, str):
+        scheduleSpec = {"handler": scheduleSpec, "cron": "* * * * *"}
+    elif isinstance(scheduleSpec, list) and len(scheduleSpec) == 2 and isinstance(scheduleSpec[0], str):
+        handlerName, interval = scheduleSpec
+        if not isinstance(interval, int) or interval <= 0 or interval > 60:
+            logging.error(f"Plugin {moduleName} UNCONDITIONAL interval must be integer 1-60, got {interval}")
+            return
+        scheduleSpec = {"handler": handlerName, "cron": f"*/{interval} * * * *"}
+    
+    if isinstance(scheduleSpec, dict):
+        scheduleSpecs_ = [scheduleSpec]
+    elif isinstance(scheduleSpec, list) and scheduleSpec and all(isinstance(spec, dict) for spec in scheduleSpec):
+        scheduleSpecs_ = scheduleSpec
+    else:
+        logging.error(f"Plugin {moduleName} UNCONDITIONAL must be a string, [name, minutes], a dict or a list of dicts, skipping")
+        return
+    
+    for spec in scheduleSpecs_:
+        unknownKeys_ = [key for key in spec if key not in SCHEDULE_KEYS_]
+        if unknownKeys_:
+            logging.error(f"Plugin {moduleName} UNCONDITIONAL has unknown keys {unknownKeys_}. Valid keys: {SCHEDULE_KEYS_}")
+            continue
+        
+        periodKeys_ = [key for key in ("seconds", "minutes", "cron") if key in spec]
+        if len(periodKeys_) != 1:
+            logging.error(f"Plugin {moduleName} UNCONDITIONAL needs exactly one of 'seconds', 'minutes' or 'cron'")
+            continue
+        
+        jitter = spec.get("jitter", CONFIG['SCHEDULER']['default_jitter_seconds'])
+        if not isinstance(jitter, (int, float)) or isinstance(jitter, bool) or jitter < 0:
+            logging.error(f"Plugin {moduleName} UNCONDITIONAL jitter must be a non-negative number, got {jitter!r}")
+            continue
+        
+        periodKey = periodKeys_[0]
+        periodValue = spec[periodKey]
+        if periodKey == "cron":
+            try:
+                if not isinstance(periodValue, str):
+                    raise ValueError("must be a string")
+                cronFields_ = CronParser(periodValue)
+                if CronNextTime(cronFields_, time.time()) is None:
+                    raise ValueError("never fires")
+            except ValueError as e:
+                logging.error(f"Plugin {moduleName} UNCONDITIONAL cron '{periodValue}' is invalid: {e}")
+                continue
+            schedule = {"kind": "cron", "cron": cronFields_, "description": f"cron '{periodValue}'"}
+        else:
+            if not isinstance(periodValue, (int, float)) or isinstance(periodValue, bool) or periodValue <= 0:
+                logging.error(f"Plugin {moduleName} UNCONDITIONAL {periodKey} must be a positive number, got {periodValue!r}")
+                continue
+            seconds = periodValue * 60 if periodKey == "minutes" else periodValue
+            if seconds < 1:
+                logging.error(f"Plugin {moduleName} UNCONDITIONAL cannot run more often than once per second")
+                continue
+            # Never jitter past half the period, runs would start swapping places
+            jitter = min(jitter, seconds / 2)
+            schedule = {"kind": "interval", "seconds": seconds, "anchor": None, "description": f"every {seconds}s"}
+        schedule["jitter"] = jitter
+        
+        schedule["overlap"] = spec.get("overlap", "skip")
+        if schedule["overlap"] not in SCHEDULE_OVERLAP_POLICIES_:
+            logging.error(f"Plugin {moduleName} UNCONDITIONAL overlap must be one of {SCHEDULE_OVERLAP_POLICIES_}")
+            continue
+        
+        schedule["missed"] = spec.get("missed", "skip")
+        if schedule["missed"] not in SCHEDULE_MISSED_POLICIES_:
+            logging.error(f"Plugin {moduleName} UNCONDITIONAL missed must be one of {SCHEDULE_MISSED_POLICIES_}")
+            continue
+        
+        handlerName = spec.get("handler")
+        if not isinstance(handlerName, str):
+            logging.error(f"Plugin {moduleName} UNCONDITIONAL needs a 'handler' function name, skipping")
+            continue
+        
+        handlerRef = HandlerValidator(moduleName, handlerName, topLevelNames)
+        if handlerRef is None:
+            continue
+        
+        UNCONDITIONAL_REGISTRY.append((handlerRef, schedule))
+        logging.info(f"Registered {moduleName}.{handlerName} for UNCONDITIONAL event ({schedule['description']}, jitter {jitter}s)")
+
+def SchedulerStateLoader() -> Dict[str, float]:
+    dbPath = CONFIG['PATHS']['database_file']
+    
+    try:
+        databaseConnect = sqlite3.connect(dbPath, timeout=5.0)
+        rows = databaseConnect.execute("SELECT JOB_ID, LAST_DUE FROM SCHEDULER_STATE").fetchall()
+        databaseConnect.close()
+    except Exception as e:
+        logging.error(f"Failed to load scheduler state: {e}")
+        return {}
+    
+    return dict(rows)
+
+def SchedulerStateSaver(job: Dict, dueAt: float) -> None:
+    WriterEnqueuer("SCHEDULER_STATE",
+                   "INSERT INTO SCHEDULER_STATE (JOB_ID, LAST_DUE, UPDATED_AT) VALUES (?, ?, ?) "
+                   "ON CONFLICT(JOB_ID) DO UPDATE SET LAST_DUE = excluded.LAST_DUE, UPDATED_AT = excluded.UPDATED_AT",
+                   (job["id"], dueAt, int(time.time())))
+
+def ScheduledJobRunner(job: Dict, dueAt: float, runAt: float) -> None:
+    handlerRef = job["handler"]
+    schedule = job["schedule"]
+    emptyRawEvent = {"post_type": "unconditional", "time": int(time.time())}
+    parsedEvent = ParsedEvent(emptyRawEvent, eventType="UNCONDITIONAL")
+    startTime = time.time()
+    
+    # Called with SCHEDULER_LOCK held
+    metrics = job["metrics"]
+    job["running"] += 1
+    metrics["runs"] += 1
+    metrics["last_run_at"] = startTime
+    metrics["last_lag"] = max(0.0, startTime - runAt)
+    metrics["max_lag"] = max(metrics["max_lag"], metrics["last_lag"])
+    SchedulerStateSaver(job, dueAt)
+    
+    def completionCallback(result):
+        duration = time.time() - startTime
+        with SCHEDULER_LOCK:
+            job["running"] -= 1
+            metrics["last_duration"] = duration
+            if isinstance(result, dict) and "_error" in result:
+                metrics["failures"] += 1
+            queuedRun = job["queuedRun"] is not None
+        
+        if schedule["kind"] == "interval" and duration > schedule["seconds"]:
+            logging.warning(f"UNCONDITIONAL job {job['id']} took {duration:.1f}s, longer than its {schedule['seconds']}s interval")
+        if queuedRun:
+            SCHEDULER_WAKE.set()
+        
+        if isinstance(result, dict) and "_error" in result:
+            logging.error(f"Plugin {handlerRef} raised {result['_type']}: {result['_error']}")
+        elif result is not None:
+            OutboundEnqueuer(result, parsedEvent)
+    
+    try:
+        PluginSubmitter(handlerRef, None, parsedEvent, completionCallback)
+    except Exception as e:
+        logging.error(f"Failed to submit plugin {handlerRef}: {e}")
+        job["running"] -= 1
+        metrics["failures"] += 1
+
+def ScheduledJobFirer(job: Dict, dueAt: float, runAt: float) -> None:
+    schedule = job["schedule"]
+    metrics = job["metrics"]
+    
+    with SCHEDULER_LOCK:
+        if IS_MUTED:
+            metrics["missed"] += 1
+            if schedule["missed"] == "catch_up":
+                # Missed runs collapse into a single catch-up run after unmute
+                if job["missedRun"] is None:
+                    job["missedRun"] = (dueAt, runAt)
+            else:
+                SchedulerStateSaver(job, dueAt)
+            return
+        
+        if job["running"] and schedule["overlap"] != "parallel":
+            if schedule["overlap"] == "queue_one" and job["queuedRun"] is None:
+                job["queuedRun"] = (dueAt, runAt)
+                return
+            metrics["skipped"] += 1
+            SchedulerStateSaver(job, dueAt)
+            logging.warning(f"UNCONDITIONAL job {job['id']} is still running, skipped the run due at "
+                            f"{datetime.datetime.fromtimestamp(dueAt).strftime('%H:%M:%S')}")
+            return
+        
+        ScheduledJobRunner(job, dueAt, runAt)
+
+def SchedulerStats() -> Dict[str, Dict]:
+    with SCHEDULER_LOCK:
+        return {jobId: dict(job["metrics"], running=job["running"], next_due=job["dueAt"])
+                for jobId, job in SCHEDULER_JOBS.items()}
+
+def DeferredLoader() -> None:
+    global DEFERRED_NEXT_ID
+    dbPath = CONFIG['PATHS']['database_file']
+    
+    try:
+        databaseConnect = sqlite3.connect(dbPath, timeout=5.0)
+        rows = databaseConnect.execute("SELECT ID, PLUGIN_NAME, DUE_AT, PAYLOAD FROM DEFERRED_INVOCATIONS").fetchall()
+        databaseConnect.close()
+    except Exception as e:
+        logging.error(f"Failed to load deferred invocations: {e}")
+        return
+    
+    with SCHEDULER_LOCK:
+        for deferredId, pluginName, dueAt, payloadJson in rows:
+            DEFERRED_NEXT_ID = max(DEFERRED_NEXT_ID, deferredId + 1)
+            if pluginName not in DEFERRED_REGISTRY:
+                logging.warning(f"Deferred invocation {deferredId} of {pluginName} has no DEFERRED handler, keeping it for later")
+                continue
+            heapq.heappush(DEFERRED_HEAP_, (dueAt, deferredId, pluginName, payloadJson))
+            DEFERRED_PENDING[pluginName] = DEFERRED_PENDING.get(pluginName, 0) + 1
+        
+        if DEFERRED_HEAP_:
+            logging.info(f"Loaded {len(DEFERRED_HEAP_)} pending deferred invocations")
+
+def DeferredRegistrar(pluginName: str, delaySeconds: float, payload: Any = None,
+                      onCommit: Optional[Callable[[Optional[int]], None]] = None) -> Optional[int]:
+    global DEFERRED_NEXT_ID
+    maxDelay = CONFIG['DEFERRED']['max_delay_seconds']
+    
+    if pluginName not in DEFERRED_REGISTRY:
+        logging.error(f"Plugin {pluginName} called Defer but declares no DEFERRED handler")
+        return None
+    
+    if isinstance(delaySeconds, bool) or not isinstance(delaySeconds, (int, float)) or not 0 <= delaySeconds <= maxDelay:
+        logging.error(f"Plugin {pluginName} Defer delay must be between 0 and {maxDelay} seconds, got {delaySeconds!r}")
+        return None
+    
+    try:
+        payloadJson = json.dumps(payload, ensure_ascii=False)
+    except (TypeError, ValueError) as e:
+        logging.error(f"Plugin {pluginName} Defer payload is not JSON serializable: {e}")
+        return None
+    
+    if len(payloadJson.encode('utf-8')) > CONFIG['DEFERRED']['max_payload_bytes']:
+        logging.error(f"Plugin {pluginName} Defer payload exceeds {CONFIG['DEFERRED']['max_payload_bytes']} bytes")
+        return None
+    
+    dueAt = time.time() + delaySeconds
+    with SCHEDULER_LOCK:
+        if DEFERRED_PENDING.get(pluginName, 0) >= CONFIG['DEFERRED']['max_pending_per_plugin']:
+            logging.error(f"Plugin {pluginName} already has {DEFERRED_PENDING[pluginName]} pending deferred invocations")
+            return None
+        
+        deferredId = DEFERRED_NEXT_ID
+        DEFERRED_NEXT_ID += 1
+        DEFERRED_PENDING[pluginName] = DEFERRED_PENDING.get(pluginName, 0) + 1
+    
+    # Scheduled only once the insert is committed, so the id a plugin gets always survives a restart
+    # and the delete after the run can never reach the writer first
+    def insertReporter(committed: bool) -> None:
+        with SCHEDULER_LOCK:
+            if committed:
+                heapq.heappush(DEFERRED_HEAP_, (dueAt, deferredId, pluginName, payloadJson))
+            else:
+                DEFERRED_PENDING[pluginName] -= 1
+        
+        if committed:
+            SCHEDULER_WAKE.set()
+        else:
+            logging.error(f"Deferred invocation {deferredId} of {pluginName} could not be stored, dropping it")
+        
+        if onCommit is not None:
+            onCommit(deferredId if committed else None)
+    
+    WriterEnqueuer("DEFERRED_INVOCATIONS",
+                   "INSERT INTO DEFERRED_INVOCATIONS (ID, PLUGIN_NAME, DUE_AT, PAYLOAD, CREATED_AT) VALUES (?, ?, ?, ?, ?)",
+                   (deferredId, pluginName, dueAt, payloadJson, int(time.time())),
+                   onCommit=insertReporter)
+    return deferredId
+
+def DeferredRunner(dueAt: float, deferredId: int, pluginName: str, payloadJson: str) -> None:
+    handlerRef = DEFERRED_REGISTRY.get(pluginName)
+    if handlerRef is None:
+        logging.warning(f"Deferred invocation {deferredId} of {pluginName} has no DEFERRED handler, keeping it for later")
+        with SCHEDULER_LOCK:
+            DEFERRED_PENDING[pluginName] -= 1
+        return
+    
+    deferredRawEvent = {
+        "post_type": "deferred",
+        "time": int(time.time()),
+        "deferred_id": deferredId,
+        "due_at": dueAt,
+        "payload": json.loads(payloadJson)
+    }
+    parsedEvent = ParsedEvent(deferredRawEvent, eventType="DEFERRED")
+    
+    def completionCallback(result):
+        # The row is removed only after the handler ran, so a crash in between fires it again on restart
+        WriterEnqueuer("DEFERRED_INVOCATIONS", "DELETE FROM DEFERRED_INVOCATIONS WHERE ID = ?", (deferredId,))
+        with SCHEDULER_LOCK:
+            DEFERRED_PENDING[pluginName] -= 1
+        
+        if isinstance(result, dict) and "_error" in result:
+            logging.error(f"Plugin {handlerRef} raised {result['_type']}: {result['_error']}")
+        elif result is not None:
+            OutboundEnqueuer(result, parsedEvent)
+    
+    try:
+        PluginSubmitter(handlerRef, None, parsedEvent, completionCallback)
+    except Exception as e:
+        logging.error(f"Failed to submit deferred invocation {deferredId} of {handlerRef}: {e}")
+        with SCHEDULER_LOCK:
+            DEFERRED_PENDING[pluginName] -= 1
+
 def UnconditionalScheduler() -> None:
     logging.info("Starting UNCONDITIONAL scheduler")
     
+    savedDue = SchedulerStateLoader()
+    
+    # Timer heap of (run time, sequence, job); run time is the due time plus this run's jitter
+    timerHeap_ = []
+    now = time.time()
+    for sequence, (handlerRef, schedule) in enumerate(UNCONDITIONAL_REGISTRY):
+        # A handler can have several schedules, only later ones get a suffix so saved state stays valid
+        jobId = handlerRef
+        while jobId in SCHEDULER_JOBS:
+            jobId = f"{handlerRef}#{sequence}"
+        
+        job = {
+            "id": jobId,
+            "handler": handlerRef,
+            "schedule": schedule,
+            "dueAt": None,
+            "running": 0,
+            "queuedRun": None,
+            "missedRun": None,
+            "metrics": {"runs": 0, "skipped": 0, "missed": 0, "failures": 0, "last_run_at": None,
+                        "last_duration": None, "last_lag": None, "max_lag": 0.0}
+        }
+        SCHEDULER_JOBS[jobId] = job
+        
+        lastDue = savedDue.get(jobId)
+        if schedule["kind"] == "interval":
+            # Jobs that ran before keep their phase across restarts, so a restart never delays a run by up to a whole interval;
+            # new jobs start at a random phase so equal intervals do not line up
+            if lastDue is not None:
+                schedule["anchor"] = lastDue
+                job["dueAt"] = ScheduleNextRun(schedule, now)
+            else:
+                schedule["anchor"] = now + random.uniform(0, schedule["seconds"])
+                job["dueAt"] = schedule["anchor"]
+            missedDue = lastDue + schedule["seconds"] if lastDue is not None else None
+        else:
+            job["dueAt"] = ScheduleNextRun(schedule, now)
+            missedDue = CronNextTime(schedule["cron"], lastDue) if lastDue is not None else None
+        
+        # Runs that fell due while the framework was down
+        if schedule["missed"] == "catch_up" and missedDue is not None and missedDue <= now:
+            job["missedRun"] = (missedDue, missedDue)
+            job["metrics"]["missed"] += 1
+            logging.info(f"UNCONDITIONAL job {jobId} missed a run at "
+                         f"{datetime.datetime.fromtimestamp(missedDue).strftime('%Y-%m-%d %H:%M:%S')}, catching up")
+        
+        heapq.heappush(timerHeap_, (job["dueAt"] + random.uniform(0, schedule["jitter"]), sequence, job))
+    
     while True:
-        now = datetime.datetime.now()
-        secondsToNextMinute = 60 - now.second + 3  # +3s buffer to avoid rounding errors
-        time.sleep(secondsToNextMinute)
+        SCHEDULER_WAKE.clear()
         
-        if IS_MUTED:
+        # Held runs: catch-ups once unmuted, queue_one runs once the previous run finished
+        # Deferred invocations that fell due while muted also wait for unmute
+        dueDeferred_ = []
+        if not IS_MUTED:
+            with SCHEDULER_LOCK:
+                for job in SCHEDULER_JOBS.values():
+                    if job["missedRun"] is not None and not job["running"]:
+                        dueAt, runAt = job["missedRun"]
+                        job["missedRun"] = None
+                        ScheduledJobRunner(job, dueAt, runAt)
+                    elif job["queuedRun"] is not None and not job["running"]:
+                        dueAt, runAt = job["queuedRun"]
+                        job["queuedRun"] = None
+                        ScheduledJobRunner(job, dueAt, runAt)
+                
+                while DEFERRED_HEAP_ and DEFERRED_HEAP_[0][0] <= time.time():
+                    dueDeferred_.append(heapq.heappop(DEFERRED_HEAP_))
+        
+        for deferredEntry in dueDeferred_:
+            DeferredRunner(*deferredEntry)
+        
+        with SCHEDULER_LOCK:
+            nextDeferredAt = DEFERRED_HEAP_[0][0] if DEFERRED_HEAP_ and not IS_MUTED else math.inf
+        
+        runAt = timerHeap_[0][0] if timerHeap_ else math.inf
+        delay = min(runAt, nextDeferredAt) - time.time()
+        if delay > 0:
+            # Wake up at least once a minute to notice wall clock changes
+            SCHEDULER_WAKE.wait(min(delay, 60))
             continue
         
-        currentMinute = datetime.datetime.now().minute
+        if runAt > time.time():
+            continue  # Only a deferred invocation is due
         
-        # Collect handlers that should run this minute
-        due_handlers = []
-        for handler, interval in UNCONDITIONAL_REGISTRY:
-            if currentMinute % interval == 0:
-                due_handlers.append(handler)
+        runAt, sequence, job = heapq.heappop(timerHeap_)
+        ScheduledJobFirer(job, job["dueAt"], runAt)
         
-        if due_handlers:
-            emptyRawEvent = {"post_type": "unconditional", "time": int(time.time())}
+        schedule = job["schedule"]
+        with SCHEDULER_LOCK:
+            job["dueAt"] = ScheduleNextRun(schedule, max(job["dueAt"], time.time()))
+        if job["dueAt"] is None:
+            logging.error(f"UNCONDITIONAL job {job['id']} has no future run time, removing it")
+            continue
+        heapq.heappush(timerHeap_, (job["dueAt"] + random.uniform(0, schedule["jitter"]), sequence, job))
+
+def PluginSourceReader(pluginPath: str, moduleName: str) -> Optional[tuple[Dict, Dict[str, Optional[set]]]]:
+    try:
+        with open(pluginPath, 'r', encoding='utf-8') as f:
+            moduleTree = ast.parse(f.read(), filename=pluginPath)
+    except SyntaxError as e:
+        logging.error(f"Plugin {moduleName} has a syntax error at line {e.lineno}: {e.msg}, skipping")
+        return None
+    except Exception as e:
+        logging.error(f"Failed to read plugin {moduleName}: {e}")
+        return None
+    
+    manifestNode = None
+    topLevelNames = {}  # Function name to its parameter names, None for other top-level bindings
+    
+    for node in moduleTree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            arguments = node.args
+            paramNodes_ = arguments.posonlyargs + arguments.args + arguments.kwonlyargs
+            paramNodes_ += [param for param in (arguments.vararg, arguments.kwarg) if param is not None]
+            topLevelNames[node.name] = {param.arg for param in paramNodes_}
+            continue
+        
+        if isinstance(node, ast.Assign):
+            targets_ = node.targets
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            targets_ = [node.target]
+        else:
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                for alias in node.names:
+                    topLevelNames[(alias.asname or alias.name).split('.')[0]] = None
+            continue
+        
+        for target in targets_:
+            if isinstance(target, ast.Name):
+                if target.id == "MANIFEST":
+                    manifestNode = node.value
+                else:
+                    topLevelNames[target.id] = None
+    
+    if manifestNode is None:
+        logging.error(f"Plugin {moduleName} has no MANIFEST, skipping")
+        return None
+    
+    # MANIFEST is read without running the plugin, so it has to be a plain literal
+    try:
+        manifest = ast.literal_eval(manifestNode)
+    except (ValueError, TypeError, SyntaxError, RecursionError):
+        logging.error(f"Plugin {moduleName} MANIFEST must be a literal dict, skipping")
+        return None
+    
+    if not isinstance(manifest, dict):
+        logging.error(f"Plugin {moduleName} MANIFEST is not a dict, skipping")
+        return None
+    
+    return manifest, topLevelNames
+
+def HandlerValidator(moduleName: str, functionName: str, topLevelNames: Dict[str, Optional[set]]) -> Optional[str]:
+    if functionName not in topLevelNames:
+        logging.error(f"Plugin {moduleName} declares function '{functionName}' but it doesn't exist")
+        return None
+    
+    actualParams = topLevelNames[functionName]
+    if actualParams is None:
+        logging.error(f"Plugin {moduleName}.{functionName} must be a function defined at the top level of the plugin")
+        return None
+    
+    unknownParams = actualParams - set(HANDLER_PARAMS_)
+    if unknownParams:
+        logging.error(f"Plugin {moduleName}.{functionName} has unknown parameters: {unknownParams}. "
+                      f"Allowed parameters are: {set(HANDLER_PARAMS_)}")
+        return None
+    
+    return f"{moduleName}:{functionName}"
+
+def HandlerPluginName(handlerRef: str) -> str:
+    return handlerRef.partition(":")[0]
+
+def HandlerResolver(handlerRef: str) -> Callable:
+    handlerFunction = HANDLER_CACHE.get(handlerRef)
+    if handlerFunction is None:
+        # The first invocation in a worker pays for the plugin's imports
+        moduleName, _, functionName = handlerRef.partition(":")
+        handlerFunction = getattr(importlib.import_module(moduleName), functionName)
+        if not callable(handlerFunction):
+            raise TypeError(f"{handlerRef} is not callable")
+        HANDLER_CACHE[handlerRef] = handlerFunction
+    return handlerFunction
+
+def TriggerRegistrar(moduleName: str, manifest: Dict) -> None:
+    triggers = manifest.get("TRIGGERS")
+    if triggers is None:
+        return
+    
+    if not isinstance(triggers, dict):
+        logging.error(f"Plugin {moduleName} TRIGGERS must be a dict of event type to trigger spec, skipping")
+        return
+    
+    for eventType, triggerSpec in triggers.items():
+        if eventType not in TRIGGER_EVENT_TYPES_:
+            logging.error(f"Plugin {moduleName} declares TRIGGERS for '{eventType}'. "
+                          f"TRIGGERS are only supported for: {TRIGGER_EVENT_TYPES_}")
+            continue
+        
+        functionName = manifest.get(eventType)
+        handlerRef = f"{moduleName}:{functionName}" if isinstance(functionName, str) else None
+        if handlerRef is None or handlerRef not in PLUGIN_REGISTRY[eventType]:
+            logging.error(f"Plugin {moduleName} declares TRIGGERS for '{eventType}' but has no registered handler for it")
+            continue
+        
+        if not isinstance(triggerSpec, dict) or not triggerSpec:
+            logging.error(f"Plugin {moduleName} TRIGGERS for '{eventType}' must be a non-empty dict")
+            continue
+        
+        specValid = True
+        for triggerKind, patterns_ in triggerSpec.items():
+            if triggerKind not in TRIGGER_KINDS_:
+                logging.error(f"Plugin {moduleName} TRIGGERS for '{eventType}' has unknown kind '{triggerKind}'. "
+                              f"Valid kinds: {TRIGGER_KINDS_}")
+                specValid = False
+                break
             
-            def response_callback(result, event):
-                OutbondMessageParser(result, event)
+            if not isinstance(patterns_, list) or not all(isinstance(p, str) and p for p in patterns_):
+                logging.error(f"Plugin {moduleName} TRIGGERS '{triggerKind}' for '{eventType}' must be a list of non-empty strings")
+                specValid = False
+                break
             
-            PluginCaller(due_handlers, None, emptyRawEvent, response_callback)
+            if triggerKind == "regex":
+                try:
+                    for pattern in patterns_:
+                        re.compile(pattern)
+                except re.error as e:
+                    logging.error(f"Plugin {moduleName} TRIGGERS regex for '{eventType}' is invalid: {e}")
+                    specValid = False
+                    break
+        
+        if not specValid:
+            continue
+        
+        TRIGGER_REGISTRY.setdefault(eventType, []).append((handlerRef, triggerSpec))
+        logging.info(f"Registered TRIGGERS for {moduleName}.{functionName} on '{eventType}'")
+
+def TriggerCompiler(triggerEntries_: List[tuple]) -> Dict:
+    matcher = {
+        "filtered": set(),
+        "exact": {},
+        "prefixTrie": {},
+        "keywordPattern": None,
+        "keywordOwners": {},
+        "regexes": []
+    }
+    keywordHandlers = {}
+    
+    for handler, triggerSpec in triggerEntries_:
+        matcher["filtered"].add(handler)
+        
+        for exactText in triggerSpec.get("exact", []):
+            matcher["exact"].setdefault(exactText, set()).add(handler)
+        
+        for prefix in triggerSpec.get("prefix", []):
+            node = matcher["prefixTrie"]
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node.setdefault(None, set()).add(handler)
+        
+        for keyword in triggerSpec.get("keyword", []):
+            keywordHandlers.setdefault(keyword, set()).add(handler)
+        
+        if triggerSpec.get("regex"):
+            combinedRegex = re.compile("|".join(f"(?:{pattern})" for pattern in triggerSpec["regex"]))
+            matcher["regexes"].append((combinedRegex, handler))
+    
+    if keywordHandlers:
+        # Longest keywords first: the lookahead reports the longest keyword at each position,
+        # so every shorter keyword it starts with is credited to its owners as well
+        keywords_ = sorted(keywordHandlers, key=len, reverse=True)
+        for keyword in keywords_:
+            owners = set()
+            for otherKeyword in keywords_:
+                if keyword.startswith(otherKeyword):
+                    owners |= keywordHandlers[otherKeyword]
+            matcher["keywordOwners"][keyword] = owners
+        
+        matcher["keywordPattern"] = re.compile("(?=(" + "|".join(re.escape(k) for k in keywords_) + "))")
+    
+    return matcher
+
+def TriggerMatcher(matcher: Dict, text: str) -> set:
+    matchedHandlers = set()
+    if not text:
+        return matchedHandlers
+    
+    matchedHandlers |= matcher["exact"].get(text.strip(), set())
+    
+    node = matcher["prefixTrie"]
+    for char in text.lstrip():
+        node = node.get(char)
+        if node is None:
+            break
+        matchedHandlers |= node.get(None, set())
+    
+    if matcher["keywordPattern"]:
+        for match in matcher["keywordPattern"].finditer(text):
+            matchedHandlers |= matcher["keywordOwners"][match.group(1)]
+    
+    for combinedRegex, handler in matcher["regexes"]:
+        if handler not in matchedHandlers and combinedRegex.search(text):
+            matchedHandlers.add(handler)
+    
+    return matchedHandlers
+
+def SwitchRegistrar(moduleName: str, switchSpec: Dict) -> None:
+    if not isinstance(switchSpec, dict):
+        logging.error(f"Plugin {moduleName} SWITCH must be a dict, skipping")
+        return
+    
+    staticSwitch = {}
+    for switchKey, values_ in switchSpec.items():
+        if switchKey in SWITCH_LIST_KEYS_:
+            if not isinstance(values_, list):
+                logging.error(f"Plugin {moduleName} SWITCH '{switchKey}' must be a list of ids, skipping")
+                continue
+            staticSwitch[switchKey] = {str(value) for value in values_}
+        elif switchKey == "exempt_prefixes":
+            if not isinstance(values_, list) or not all(isinstance(p, str) and p for p in values_):
+                logging.error(f"Plugin {moduleName} SWITCH 'exempt_prefixes' must be a list of non-empty strings, skipping")
+                continue
+            staticSwitch[switchKey] = tuple(values_)
+        else:
+            logging.error(f"Plugin {moduleName} SWITCH has unknown key '{switchKey}'. "
+                          f"Valid keys: {SWITCH_LIST_KEYS_ + ['exempt_prefixes']}")
+    
+    if staticSwitch:
+        SWITCH_STATIC[moduleName] = staticSwitch
+        logging.info(f"Registered SWITCH for {moduleName}: {sorted(staticSwitch)}")
+
+def SwitchIndexLoader() -> None:
+    dbPath = CONFIG['PATHS']['database_file']
+    
+    try:
+        databaseConnect = sqlite3.connect(dbPath, timeout=5.0)
+        rows = databaseConnect.execute("SELECT PLUGIN_NAME, SCOPE, TARGET_ID, ENABLED FROM PLUGIN_SWITCHES").fetchall()
+        databaseConnect.close()
+    except Exception as e:
+        logging.error(f"Failed to load plugin switches: {e}")
+        return
+    
+    for pluginName, scope, targetId, enabled in rows:
+        SWITCH_RUNTIME[(pluginName, scope, targetId)] = bool(enabled)
+    
+    if rows:
+        logging.info(f"Loaded {len(rows)} plugin switches")
+
+def PluginSwitchSetter(pluginName: str, scope: str, targetId: Any, enabled: Optional[bool]) -> bool:
+    if scope not in SWITCH_SCOPES_:
+        logging.error(f"PluginSwitch: scope must be one of {SWITCH_SCOPES_}, got '{scope}'")
+        return False
+    
+    if not isinstance(targetId, (int, str)) or isinstance(targetId, bool) or not str(targetId):
+        logging.error(f"PluginSwitch: target id must be a non-empty int or str, got {targetId!r}")
+        return False
+    
+    if enabled is not None and not isinstance(enabled, bool):
+        logging.error(f"PluginSwitch: enabled must be True, False or None, got {enabled!r}")
+        return False
+    
+    switchKey = (pluginName, scope, str(targetId))
+    
+    # The in-memory index is authoritative, the table only restores it on restart
+    if enabled is None:
+        SWITCH_RUNTIME.pop(switchKey, None)
+        WriterEnqueuer("PLUGIN_SWITCHES",
+                       "DELETE FROM PLUGIN_SWITCHES WHERE PLUGIN_NAME = ? AND SCOPE = ? AND TARGET_ID = ?",
+                       switchKey)
+    else:
+        SWITCH_RUNTIME[switchKey] = enabled
+        WriterEnqueuer("PLUGIN_SWITCHES",
+                       "INSERT INTO PLUGIN_SWITCHES (PLUGIN_NAME, SCOPE, TARGET_ID, ENABLED, UPDATED_AT) VALUES (?, ?, ?, ?, ?) "
+                       "ON CONFLICT(PLUGIN_NAME, SCOPE, TARGET_ID) DO UPDATE SET ENABLED = excluded.ENABLED, UPDATED_AT = excluded.UPDATED_AT",
+                       switchKey + (int(enabled), int(time.time())))
+    
+    return True
+
+def PluginSwitchChecker(pluginName: str, parsedEvent: "ParsedEvent") -> bool:
+    staticSwitch = SWITCH_STATIC.get(pluginName)
+    if staticSwitch is None and not SWITCH_RUNTIME:
+        return True
+    
+    for scope, targetId in (("group", parsedEvent.groupId), ("user", parsedEvent.userId)):
+        if not targetId:
+            continue
+        targetId = str(targetId)
+        
+        # A runtime toggle overrides the MANIFEST lists for its scope
+        enabled = SWITCH_RUNTIME.get((pluginName, scope, targetId))
+        if enabled is None and staticSwitch:
+            allowed_ = staticSwitch.get(f"allow_{scope}s")
+            enabled = not (allowed_ is not None and targetId not in allowed_) and \
+                      targetId not in staticSwitch.get(f"deny_{scope}s", ())
+        
+        if enabled is False:
+            # Let the plugin still see commands that can switch it back on
+            exemptPrefixes = staticSwitch.get("exempt_prefixes") if staticSwitch else None
+            if exemptPrefixes and (parsedEvent.textMessage or "").lstrip().startswith(exemptPrefixes):
+                return True
+            return False
+    
+    return True
+
+def ZygotePreloader(pluginModules_: List[str]) -> None:
+    # The framework itself runs as __main__ when started directly
+    frameworkModule = '__main__' if __name__ == '__main__' else __name__
+    
+    preloadModules_ = [frameworkModule]
+    for moduleName in pluginModules_ + PRELOAD_REGISTRY:
+        if moduleName not in preloadModules_:
+            preloadModules_.append(moduleName)
+    
+    # The forkserver ignores the parent's sys.path before Python 3.12, hand it over explicitly
+    os.environ['PYTHONPATH'] = os.pathsep.join(os.path.abspath(path) for path in sys.path)
+
+    multiprocessing.set_forkserver_preload(preloadModules_)
+    logging.info(f"Zygote will preload {len(preloadModules_)} modules: {preloadModules_}")
+
+def InitializerRunner(loadedPlugins_: List[str]) -> List[str]:
+    parallelism = max(1, CONFIG['PLUGIN_EXECUTION']['initializer_parallelism'])
+    initializers = {pluginName: handlerRef for handlerRef, pluginName in INITIALIZER_REGISTRY}
+    failedPlugins_ = []
+    
+    # Every loaded plugin is ordered, one without an INITIALIZER completes as soon as its dependencies have,
+    # so an INITIALIZER also waits for those behind a dependency that has nothing to run
+    waitingOn = {}
+    dependents = {}
+    for pluginName, dependencies_ in DEPENDENCY_REGISTRY.items():
+        if pluginName not in loadedPlugins_:
+            continue
+        missing_ = [d for d in dependencies_ if d not in loadedPlugins_]
+        if missing_:
+            logging.error(f"Plugin {pluginName} depends on plugins that are not loaded: {missing_}")
+            failedPlugins_.append(pluginName)
+            continue
+        waitingOn[pluginName] = set(dependencies_)
+        for dependency in waitingOn[pluginName]:
+            dependents.setdefault(dependency, []).append(pluginName)
+    
+    readyPlugins = collections.deque(pluginName for pluginName in loadedPlugins_
+                                     if not waitingOn.get(pluginName) and pluginName not in failedPlugins_)
+    completionQueue = queue.Queue()
+    runningCount = 0
+    
+    def complete(pluginName):
+        for dependent in dependents.get(pluginName, []):
+            if dependent in failedPlugins_:
+                continue
+            if pluginName in failedPlugins_:
+                logging.error(f"Plugin {dependent} removed because its dependency {pluginName} failed")
+                failedPlugins_.append(dependent)
+                complete(dependent)
+                continue
+            waitingOn[dependent].discard(pluginName)
+            if not waitingOn[dependent]:
+                readyPlugins.append(dependent)
+    
+    def completionCallbackCreator(pluginName, startTime):
+        def completionCallback(result):
+            completionQueue.put((pluginName, result, time.time() - startTime))
+        return completionCallback
+    
+    if initializers:
+        logging.info(f"Executing {len(initializers)} INITIALIZER plugins with parallelism {parallelism}")
+    runStart = time.time()
+    
+    for pluginName in list(failedPlugins_):
+        complete(pluginName)
+    
+    while readyPlugins or runningCount:
+        while readyPlugins and runningCount < parallelism:
+            pluginName = readyPlugins.popleft()
+            if pluginName in failedPlugins_:
+                continue
+            if pluginName not in initializers:
+                complete(pluginName)
+                continue
+            try:
+                emptyRawEvent = {"post_type": "initializer", "time": int(time.time())}
+                PluginSubmitter(initializers[pluginName], None, ParsedEvent(emptyRawEvent, eventType="INITIALIZER"),
+                                completionCallbackCreator(pluginName, time.time()))
+                runningCount += 1
+            except Exception as e:
+                logging.error(f"INITIALIZER for plugin {pluginName} failed with exception: {e}")
+                failedPlugins_.append(pluginName)
+                complete(pluginName)
+        
+        if not runningCount:
+            break
+        
+        # The supervisor enforces the wall time limit, so every submission completes
+        pluginName, result, elapsed = completionQueue.get()
+        runningCount -= 1
+        
+        if isinstance(result, dict) and "_error" in result:
+            logging.error(f"INITIALIZER for plugin {pluginName} failed after {elapsed:.2f}s: {result['_error']}")
+            failedPlugins_.append(pluginName)
+        elif result is None:
+            logging.info(f"INITIALIZER for plugin {pluginName} completed successfully in {elapsed:.2f}s")
+        else:
+            logging.error(f"INITIALIZER for plugin {pluginName} returned unexpected result after {elapsed:.2f}s: {result}")
+        complete(pluginName)
+    
+    # Whatever is still waiting is part of a dependency cycle
+    for pluginName, dependencies_ in waitingOn.items():
+        if dependencies_ and pluginName not in failedPlugins_:
+            logging.error(f"Plugin {pluginName} has circular dependencies: {sorted(dependencies_)}")
+            failedPlugins_.append(pluginName)
+    
+    if initializers:
+        logging.info(f"INITIALIZER plugins finished in {time.time() - runStart:.2f}s")
+    
+    return failedPlugins_
 
 def Initializer() -> None:
     global PLUGIN_REGISTRY
     
     LoggingNotificationConfigurator()
     DatabaseInitializer()
+    SwitchIndexLoader()
+    ConfigCacheLoader()
+    KvStoreLoader()
+    SharedStateCreator()
     
     PLUGIN_REGISTRY = {eventType: [] for eventType in EVENT_TYPES_}
     
@@ -318,164 +1484,155 @@ def Initializer() -> None:
     
     logging.info(f"Found {len(pluginFiles_)} plugin files: {pluginFiles_}")
     
-    # Load each plugin file
+    # Workers import plugins by module name
+    if pluginsDir not in sys.path:
+        sys.path.insert(0, pluginsDir)
+    
+    # Read each plugin's MANIFEST from source, plugin code only ever runs inside workers
+    loadedPlugins_ = []
     for pluginFile in pluginFiles_:
         try:
             moduleName = pluginFile[:-3]
             
-            import sys
-            if pluginsDir not in sys.path:
-                sys.path.insert(0, pluginsDir)
+            pluginSource = PluginSourceReader(os.path.join(pluginsDir, pluginFile), moduleName)
+            if pluginSource is None:
+                continue
+            manifest, topLevelNames = pluginSource
             
-            pluginModule = importlib.import_module(moduleName)
+            loadedPlugins_.append(moduleName)
             
-            if not hasattr(pluginModule, 'MANIFEST'):
-                logging.error(f"Plugin {moduleName} has no MANIFEST, skipping")
-                continue
+            for eventType, functionName in manifest.items():
+                if eventType == "TRIGGERS":
+                    continue  # Resolved once the plugin's handlers are registered
+                
+                if eventType == "SWITCH":
+                    SwitchRegistrar(moduleName, functionName)
+                    continue
+                
+                if eventType == "DEPENDS_ON":
+                    if not isinstance(functionName, list) or not all(isinstance(d, str) and d for d in functionName):
+                        logging.error(f"Plugin {moduleName} DEPENDS_ON must be a list of plugin names, skipping")
+                        continue
+                    
+                    DEPENDENCY_REGISTRY[moduleName] = [d for d in functionName if d != moduleName]
+                    logging.info(f"Registered dependencies for {moduleName}: {functionName}")
+                    continue
+                
+                if eventType == "PRELOAD":
+                    if not isinstance(functionName, list):
+                        logging.error(f"Plugin {moduleName} PRELOAD must be a list of module names, skipping")
+                        continue
+                    
+                    # find_spec on a dotted name imports its parent packages, so only the top-level name is looked up here
+                    for preloadModule in functionName:
+                        if (not isinstance(preloadModule, str) or not all(part.isidentifier() for part in preloadModule.split("."))
+                                or importlib.util.find_spec(preloadModule.partition(".")[0]) is None):
+                            logging.error(f"Plugin {moduleName} PRELOAD module '{preloadModule}' not found, skipping")
+                            continue
+                        if preloadModule not in PRELOAD_REGISTRY:
+                            PRELOAD_REGISTRY.append(preloadModule)
+                    
+                    logging.info(f"Registered PRELOAD modules for {moduleName}: {functionName}")
+                    continue
                 
-            manifest = getattr(pluginModule, 'MANIFEST')
-            if not isinstance(manifest, dict):
-                logging.error(f"Plugin {moduleName} MANIFEST is not a dict, skipping")
-                continue
-            
-            for eventType, functionName in manifest.items():
                 if eventType == "INITIALIZER":
                     if not isinstance(functionName, str):
                         logging.error(f"Plugin {moduleName} INITIALIZER must be string, skipping")
                         continue
                     
-                    if not hasattr(pluginModule, functionName):
-                        logging.error(f"Plugin {moduleName} declares INITIALIZER function '{functionName}' but it doesn't exist")
-                        continue
-                        
-                    handlerFunction = getattr(pluginModule, functionName)
-                    if not callable(handlerFunction):
-                        logging.error(f"Plugin {moduleName}.{functionName} is not callable")
-                        continue
-                    
-                    sig = inspect.signature(handlerFunction)
-                    allowedParams = {'simpleEvent', 'rawEvent', 'botContext'}
-                    actualParams = set(sig.parameters.keys())
-                    
-                    unknownParams = actualParams - allowedParams
-                    if unknownParams:
-                        logging.error(f"Plugin {moduleName}.{functionName} has unknown parameters: {unknownParams}. "
-                                      f"Allowed parameters are: {allowedParams}")
+                    handlerRef = HandlerValidator(moduleName, functionName, topLevelNames)
+                    if handlerRef is None:
                         continue
                     
-                    INITIALIZER_REGISTRY.append((handlerFunction, moduleName))
+                    INITIALIZER_REGISTRY.append((handlerRef, moduleName))
                     logging.info(f"Registered {moduleName}.{functionName} for INITIALIZER event")
                     continue
                 
                 if eventType == "UNCONDITIONAL":
-                    interval = 1  # Default: every minute
-                    handlerName = functionName
-                    
-                    if isinstance(functionName, list):
-                        if len(functionName) == 2:
-                            handlerName, interval = functionName
-                        else:
-                            logging.error(f"Plugin {moduleName} UNCONDITIONAL has invalid format, skipping")
-                            continue
-                    elif not isinstance(functionName, str):
-                        logging.error(f"Plugin {moduleName} UNCONDITIONAL must be string or list, skipping")
+                    ScheduleRegistrar(moduleName, functionName, topLevelNames)
+                    continue
+                
+                if eventType == "DEFERRED":
+                    if not isinstance(functionName, str):
+                        logging.error(f"Plugin {moduleName} DEFERRED must be string, skipping")
                         continue
                     
-                    if not hasattr(pluginModule, handlerName):
-                        logging.error(f"Plugin {moduleName} declares UNCONDITIONAL function '{handlerName}' but it doesn't exist")
-                        continue
-                        
-                    handlerFunction = getattr(pluginModule, handlerName)
-                    if not callable(handlerFunction):
-                        logging.error(f"Plugin {moduleName}.{handlerName} is not callable")
+                    handlerRef = HandlerValidator(moduleName, functionName, topLevelNames)
+                    if handlerRef is None:
                         continue
                     
-                    if not isinstance(interval, int) or interval <= 0 or interval > 60:
-                        logging.error(f"Plugin {moduleName} UNCONDITIONAL interval must be integer 1-60, got {interval}")
+                    DEFERRED_REGISTRY[moduleName] = handlerRef
+                    logging.info(f"Registered {moduleName}.{functionName} for DEFERRED invocations")
+                    continue
+                
+                if eventType == "SERVICE":
+                    if not isinstance(functionName, str):
+                        logging.error(f"Plugin {moduleName} SERVICE must be string, skipping")
                         continue
                     
-                    sig = inspect.signature(handlerFunction)
-                    allowedParams = {'simpleEvent', 'rawEvent', 'botContext'}
-                    actualParams = set(sig.parameters.keys())
-                    
-                    unknownParams = actualParams - allowedParams
-                    if unknownParams:
-                        logging.error(f"Plugin {moduleName}.{handlerName} has unknown parameters: {unknownParams}. "
-                                      f"Allowed parameters are: {allowedParams}")
+                    handlerRef = HandlerValidator(moduleName, functionName, topLevelNames)
+                    if handlerRef is None:
                         continue
                     
-                    UNCONDITIONAL_REGISTRY.append((handlerFunction, interval))
-                    logging.info(f"Registered {moduleName}.{handlerName} for UNCONDITIONAL event (interval: {interval})")
+                    SERVICE_REGISTRY.append(handlerRef)
+                    logging.info(f"Registered {moduleName}.{functionName} as SERVICE")
                     continue
                 
                 # Regular event types
                 if eventType not in EVENT_TYPES_:
                     logging.error(f"Plugin {moduleName} declares invalid event type '{eventType}'. Valid types: {EVENT_TYPES_}")
                     continue
-                    
-                if not hasattr(pluginModule, functionName):
-                    logging.error(f"Plugin {moduleName} declares function '{functionName}' but it doesn't exist")
-                    continue
-                    
-                handlerFunction = getattr(pluginModule, functionName)
-                if not callable(handlerFunction):
-                    logging.error(f"Plugin {moduleName}.{functionName} is not callable")
-                    continue
                 
-                sig = inspect.signature(handlerFunction)
-                allowedParams = {'simpleEvent', 'rawEvent', 'botContext'}
-                actualParams = set(sig.parameters.keys())
+                if not isinstance(functionName, str):
+                    logging.error(f"Plugin {moduleName} handler for '{eventType}' must be a function name, skipping")
+                    continue
                 
-                unknownParams = actualParams - allowedParams
-                if unknownParams:
-                    logging.error(f"Plugin {moduleName}.{functionName} has unknown parameters: {unknownParams}. "
-                                  f"Allowed parameters are: {allowedParams}")
+                handlerRef = HandlerValidator(moduleName, functionName, topLevelNames)
+                if handlerRef is None:
                     continue
                 
-                PLUGIN_REGISTRY[eventType].append(handlerFunction)
+                PLUGIN_REGISTRY[eventType].append(handlerRef)
                 logging.info(f"Registered {moduleName}.{functionName} for event '{eventType}'")
+            
+            TriggerRegistrar(moduleName, manifest)
                 
         except Exception as e:
             logging.error(f"Failed to load plugin {pluginFile}: {e}")
             continue
     
-    # Execute INITIALIZER functions serially
-    failedPlugins_ = []
-    if INITIALIZER_REGISTRY:
-        logging.info(f"Executing {len(INITIALIZER_REGISTRY)} INITIALIZER plugins")
-        
-        for handlerFunction, pluginName in INITIALIZER_REGISTRY:
-            try:
-                emptyRawEvent = {"post_type": "initializer", "time": int(time.time())}
-                result = PluginCallerSingle(handlerFunction, None, emptyRawEvent)
-                
-                if isinstance(result, dict) and "_error" in result:
-                    logging.error(f"INITIALIZER for plugin {pluginName} failed: {result['_error']}")
-                    failedPlugins_.append(pluginName)
-                elif result is None:
-                    logging.info(f"INITIALIZER for plugin {pluginName} completed successfully")
-                else:
-                    logging.error(f"INITIALIZER for plugin {pluginName} returned unexpected result: {result}")
-                    
-            except Exception as e:
-                logging.error(f"INITIALIZER for plugin {pluginName} failed with exception: {e}")
-                failedPlugins_.append(pluginName)
+    # Zygote must know its preload list before the first worker is created
+    if CONFIG['PLUGIN_EXECUTION']['process_creation_method'] == 'zygote':
+        ZygotePreloader(loadedPlugins_)
+    
+    # INITIALIZERs may write configs and defer invocations and wait for the commit
+    HistorianStarter()
+    
+    # Pending invocations must be known before INITIALIZERs can defer new ones
+    DeferredLoader()
+    
+    failedPlugins_ = InitializerRunner(loadedPlugins_)
     
     # Remove failed plugins from all registries
     for pluginName in failedPlugins_:
         for eventType in PLUGIN_REGISTRY:
             PLUGIN_REGISTRY[eventType] = [
                 handler for handler in PLUGIN_REGISTRY[eventType]
-                if handler.__module__ != pluginName
+                if HandlerPluginName(handler) != pluginName
             ]
         
         UNCONDITIONAL_REGISTRY[:] = [
-            (handler, interval) for handler, interval in UNCONDITIONAL_REGISTRY
-            if handler.__module__ != pluginName
+            (handler, schedule) for handler, schedule in UNCONDITIONAL_REGISTRY
+            if HandlerPluginName(handler) != pluginName
         ]
         
+        SERVICE_REGISTRY[:] = [handler for handler in SERVICE_REGISTRY if HandlerPluginName(handler) != pluginName]
+        DEFERRED_REGISTRY.pop(pluginName, None)
+        
+        WorkerPoolCloser(pluginName)
         logging.error(f"Removed all functions for failed plugin: {pluginName}")
     
+    LOADED_PLUGINS_[:] = [pluginName for pluginName in loadedPlugins_ if pluginName not in failedPlugins_]
+    
     totalHandlers = sum(len(handlerList_) for handlerList_ in PLUGIN_REGISTRY.values())
     totalUnconditional = len(UNCONDITIONAL_REGISTRY)
     totalInitializers = len(INITIALIZER_REGISTRY)
@@ -491,12 +1648,32 @@ def Initializer() -> None:
     for eventType, handlerList_ in PLUGIN_REGISTRY.items():
         if handlerList_:
             logging.info(f"  {eventType}: {len(handlerList_)} handlers")
-    
+
+    # Compile prefilters for the handlers that survived initialization
+    for eventType, triggerEntries_ in TRIGGER_REGISTRY.items():
+        activeEntries_ = [(handler, triggerSpec) for handler, triggerSpec in triggerEntries_
+                          if handler in PLUGIN_REGISTRY[eventType]]
+        if activeEntries_:
+            TRIGGER_MATCHERS[eventType] = TriggerCompiler(activeEntries_)
+            logging.info(f"  {eventType}: {len(activeEntries_)} handlers behind TRIGGERS prefilter")
+
+    # Warm worker pools so the first events skip process startup
+    pooledPlugins_ = {HandlerPluginName(handler) for handlerList_ in PLUGIN_REGISTRY.values() for handler in handlerList_}
+    pooledPlugins_.update(HandlerPluginName(handler) for handler, schedule in UNCONDITIONAL_REGISTRY)
+    pooledPlugins_.update(DEFERRED_REGISTRY)
+    for pluginName in sorted(pooledPlugins_):
+        WorkerPoolWarmer(pluginName)
+    logging.info(f"Warmed worker pools for {len(pooledPlugins_)} plugins")
+
     # Start scheduler if needed
-    if UNCONDITIONAL_REGISTRY:
+    if UNCONDITIONAL_REGISTRY or DEFERRED_REGISTRY:
         schedulerThread = threading.Thread(target=UnconditionalScheduler, daemon=True)
         schedulerThread.start()
         logging.info("Started UNCONDITIONAL scheduler thread")
+    
+    OutboundStarter()
+    DispatchStarter()
+    ServiceStarter()
 
 def GroupMessageAnalyzer(rawEvent: Dict) -> str:
     selfId = str(rawEvent.get("self_id", ""))
@@ -594,123 +1771,89 @@ def EventTypeParser(rawEvent: Dict) -> str:
                    f"sub_sub_type='{rawEvent.get('sub_type')}'")
     return "UNEXPECTED"
 
-def InbondMessageParser(rawEvent: Dict) -> Union[Dict, None]:
-    eventType = EventTypeParser(rawEvent)
+def MessageTextExtractor(rawEvent: Dict) -> str:
+    textParts = []
+    
+    for segment in rawEvent.get("message", []):
+        if segment.get("type") == "text":
+            textParts.append(segment.get("data", {}).get("text", ""))
+    
+    return "".join(textParts)
+
+class ParsedEvent:
+    # Built once per event by NapCatListener, every later stage reads these instead of the raw dict
+    __slots__ = ("rawEvent", "serialized", "eventType", "triggerTypes",
+                 "groupId", "userId", "messageId", "textMessage")
     
-    match eventType:
+    def __init__(self, rawEvent: Dict, serialized: Optional[bytes] = None, eventType: Optional[str] = None):
+        self.rawEvent = rawEvent
+        self.serialized = serialized
+        self.eventType = eventType or EventTypeParser(rawEvent)
+        self.triggerTypes = [self.eventType] + EVENT_INHERITANCE.get(self.eventType, [])
+        self.groupId = rawEvent.get("group_id")
+        self.userId = rawEvent.get("user_id")
+        self.messageId = rawEvent.get("message_id")
+        
+        if self.eventType in ("MESSAGE_PRIVATE", "MESSAGE_GROUP", "MESSAGE_GROUP_MENTION", "MESSAGE_GROUP_BOT"):
+            self.textMessage = MessageTextExtractor(rawEvent)
+        else:
+            self.textMessage = None
+
+def InbondMessageParser(parsedEvent: ParsedEvent) -> Union[Dict, None]:
+    match parsedEvent.eventType:
         case "MESSAGE_PRIVATE":
-            messageSegments = rawEvent.get("message", [])
-            textParts = []
-            
-            for segment in messageSegments:
-                if segment.get("type") == "text":
-                    textData = segment.get("data", {})
-                    textContent = textData.get("text", "")
-                    textParts.append(textContent)
-            
-            fullText = "".join(textParts)
-            
             return {
-                "user_id": rawEvent.get("user_id"),
-                "text_message": fullText
+                "user_id": parsedEvent.userId,
+                "text_message": parsedEvent.textMessage
             }
             
         case "MESSAGE_GROUP" | "MESSAGE_GROUP_MENTION" | "MESSAGE_GROUP_BOT":
-            messageSegments = rawEvent.get("message", [])
-            textParts = []
-            
-            for segment in messageSegments:
-                if segment.get("type") == "text":
-                    textData = segment.get("data", {})
-                    textContent = textData.get("text", "")
-                    textParts.append(textContent)
-            
-            fullText = "".join(textParts)
-            
             return {
-                "user_id": rawEvent.get("user_id"),
-                "group_id": rawEvent.get("group_id"),
-                "text_message": fullText
+                "user_id": parsedEvent.userId,
+                "group_id": parsedEvent.groupId,
+                "text_message": parsedEvent.textMessage
             }
             
         case _:
             return None
 
-def SubprocessConfigReader(pluginName: str) -> Dict:
-    dbPath = CONFIG['PATHS']['database_file']
+def WorkerDatabaseGetter() -> sqlite3.Connection:
+    global WORKER_DATABASE, WORKER_DATABASE_PID
+    
+    # Opened once per worker and kept across invocations, a connection inherited through fork is never reused
+    currentPid = os.getpid()
+    if WORKER_DATABASE is not None and WORKER_DATABASE_PID == currentPid:
+        return WORKER_DATABASE
+    
+    databaseConfig = CONFIG['WORKER_DATABASE']
+    dbUri = f"file:{urllib.parse.quote(os.path.abspath(CONFIG['PATHS']['database_file']))}?mode=ro"
     
+    # Plugins may read from their own threads, WORKER_DATABASE_LOCK serializes access
+    databaseConnect = sqlite3.connect(dbUri, uri=True, timeout=5.0, check_same_thread=False,
+                                      cached_statements=databaseConfig['cached_statements'])
     try:
-        databaseConnect = sqlite3.connect(dbPath, timeout=5.0)
-        databaseConnect.execute("PRAGMA query_only = ON")  # Read-only mode for safety
-        cursor = databaseConnect.cursor()
-        
-        cursor.execute("""
-            SELECT CONFIG_DATA FROM PLUGIN_CONFIGS 
-            WHERE PLUGIN_NAME = ?
-        """, (pluginName,))
-        
-        row = cursor.fetchone()
+        databaseConnect.execute("PRAGMA query_only = ON")
+        databaseConnect.execute(f"PRAGMA mmap_size = {int(databaseConfig['mmap_size_mb']) * 1024 * 1024}")
+        databaseConnect.execute(f"PRAGMA cache_size = -{int(databaseConfig['cache_size_kb'])}")
+    except Exception:
         databaseConnect.close()
-        
-        if row:
-            try:
-                config = json.loads(row[0])
-                return config
-            except json.JSONDecodeError as e:
-                logging.error(f"ConfigReader: Invalid JSON for plugin {pluginName}: {e}")
-                return {}
-        else:
-            return {}
-            
-    except Exception as e:
-        logging.error(f"SubprocessConfigReader error for plugin {pluginName}: {e}")
-        return {}
-
-def SubprocessConfigWriter(pluginName: str, config: Dict) -> None:
-    dbPath = CONFIG['PATHS']['database_file']
+        raise
     
-    if not isinstance(config, dict):
-        logging.error(f"ConfigWriter: config must be a dict, got {type(config)} for plugin {pluginName}")
-        return
+    WORKER_DATABASE = databaseConnect
+    WORKER_DATABASE_PID = currentPid
+    return WORKER_DATABASE
+
+def WorkerDatabaseCloser() -> None:
+    global WORKER_DATABASE, WORKER_DATABASE_PID
     
-    try:
-        configData = json.dumps(config, ensure_ascii=False)
-        timestamp = int(time.time())
-        
-        maxRetries = 3
-        for attempt in range(maxRetries):
-            try:
-                databaseConnect = sqlite3.connect(dbPath, timeout=10.0)
-                
-                # UPSERT: preserve created_at, update updated_at
-                databaseConnect.execute("""
-                    INSERT OR REPLACE INTO PLUGIN_CONFIGS 
-                    (PLUGIN_NAME, CONFIG_DATA, CREATED_AT, UPDATED_AT) 
-                    VALUES (
-                        ?, 
-                        ?, 
-                        COALESCE((SELECT CREATED_AT FROM PLUGIN_CONFIGS WHERE PLUGIN_NAME = ?), ?),
-                        ?
-                    )
-                """, (pluginName, configData, pluginName, timestamp, timestamp))
-                
-                databaseConnect.commit()
-                databaseConnect.close()
-                return
-                
-            except sqlite3.OperationalError as e:
-                logging.warning(f"ConfigWriter attempt {attempt + 1}/{maxRetries} failed for plugin {pluginName}: {e}")
-                if attempt < maxRetries - 1:
-                    time.sleep(1)
-                else:
-                    logging.error(f"ConfigWriter failed after {maxRetries} attempts for plugin {pluginName}: {e}")
-                    
-            except Exception as e:
-                logging.error(f"ConfigWriter database error for plugin {pluginName}: {e}")
-                return
-                
-    except (TypeError, ValueError) as e:
-        logging.error(f"ConfigWriter: Failed to serialize config for plugin {pluginName}: {e}")
+    # After an error the next read opens a fresh connection
+    if WORKER_DATABASE is not None and WORKER_DATABASE_PID == os.getpid():
+        try:
+            WORKER_DATABASE.close()
+        except Exception:
+            pass
+    WORKER_DATABASE = None
+    WORKER_DATABASE_PID = None
 
 def SubprocessApiCaller(action: str, data: Dict) -> Union[Dict, None]:
     if not isinstance(action, str) or not action:
@@ -725,7 +1868,7 @@ def SubprocessApiCaller(action: str, data: Dict) -> Union[Dict, None]:
     fullUrl = f"{baseUrl}/{action}"
     
     try:
-        response = requests.post(fullUrl, json=data, timeout=5.0)
+        response = HttpSessionGetter().post(fullUrl, json=data, timeout=5.0)
         
         if response.status_code == 200:
             try:
@@ -746,15 +1889,8 @@ def SubprocessApiCaller(action: str, data: Dict) -> Union[Dict, None]:
         logging.error(f"ApiCaller: Request error for {action}: {e}")
         return None
 
-def SubprocessLibrarian(eventIdentifier: Dict, eventCount: int = 50) -> List[Dict]:
-    dbPath = CONFIG['PATHS']['database_file']
-    databaseConnect = None
-    
+def SubprocessLibrarian(eventIdentifier: Dict, eventCount: int = 50, historyOverlay_: Optional[List[tuple]] = None) -> List[Dict]:
     try:
-        databaseConnect = sqlite3.connect(dbPath, timeout=5.0)
-        databaseConnect.execute("PRAGMA query_only = ON")
-        cursor = databaseConnect.cursor()
-        
         identifierType = eventIdentifier.get("type")
         
         match identifierType:
@@ -765,16 +1901,16 @@ def SubprocessLibrarian(eventIdentifier: Dict, eventCount: int = 50) -> List[Dic
                 
                 # eventCount=0 means no limit
                 if eventCount == 0:
-                    cursor.execute("""
+                    querySql, queryParams = ("""
                         SELECT EVENT_DATA FROM FRIEND_EVENTS 
                         WHERE USER_ID = ? 
-                        ORDER BY TIMESTAMP DESC
+                        ORDER BY TIMESTAMP DESC, ID DESC
                     """, (userId,))
                 else:
-                    cursor.execute("""
+                    querySql, queryParams = ("""
                         SELECT EVENT_DATA FROM FRIEND_EVENTS 
                         WHERE USER_ID = ? 
-                        ORDER BY TIMESTAMP DESC 
+                        ORDER BY TIMESTAMP DESC, ID DESC 
                         LIMIT ?
                     """, (userId, eventCount))
                 
@@ -784,16 +1920,16 @@ def SubprocessLibrarian(eventIdentifier: Dict, eventCount: int = 50) -> List[Dic
                     return []
                 
                 if eventCount == 0:
-                    cursor.execute("""
+                    querySql, queryParams = ("""
                         SELECT EVENT_DATA FROM GROUP_EVENTS 
                         WHERE GROUP_ID = ? 
-                        ORDER BY TIMESTAMP DESC
+                        ORDER BY TIMESTAMP DESC, ID DESC
                     """, (groupId,))
                 else:
-                    cursor.execute("""
+                    querySql, queryParams = ("""
                         SELECT EVENT_DATA FROM GROUP_EVENTS 
                         WHERE GROUP_ID = ? 
-                        ORDER BY TIMESTAMP DESC 
+                        ORDER BY TIMESTAMP DESC, ID DESC 
                         LIMIT ?
                     """, (groupId, eventCount))
                 
@@ -803,23 +1939,31 @@ def SubprocessLibrarian(eventIdentifier: Dict, eventCount: int = 50) -> List[Dic
                     return []
                 
                 if eventCount == 0:
-                    cursor.execute("""
+                    querySql, queryParams = ("""
                         SELECT EVENT_DATA FROM OTHER_EVENTS 
                         WHERE EVENT_TYPE = ? 
-                        ORDER BY TIMESTAMP DESC
+                        ORDER BY TIMESTAMP DESC, ID DESC
                     """, (eventType,))
                 else:
-                    cursor.execute("""
+                    querySql, queryParams = ("""
                         SELECT EVENT_DATA FROM OTHER_EVENTS 
                         WHERE EVENT_TYPE = ? 
-                        ORDER BY TIMESTAMP DESC 
+                        ORDER BY TIMESTAMP DESC, ID DESC 
                         LIMIT ?
                     """, (eventType, eventCount))
                 
             case _:
                 return []
         
-        rows = cursor.fetchall()
+        # Statements are cached by the persistent connection, fetchall ends the implicit read
+        with WORKER_DATABASE_LOCK:
+            try:
+                fetchedRows = WorkerDatabaseGetter().execute(querySql, queryParams).fetchall()
+            except sqlite3.Error:
+                WorkerDatabaseCloser()
+                raise
+        
+        rows = HistoryOverlayMerger(fetchedRows, historyOverlay_ or [], eventIdentifier, eventCount)
         
         events = []
         for i, row in enumerate(rows):
@@ -836,157 +1980,862 @@ def SubprocessLibrarian(eventIdentifier: Dict, eventCount: int = 50) -> List[Dic
     except Exception as e:
         logging.error(f"SubprocessLibrarian error: {e}")
         return []
-    finally:
-        if databaseConnect:
+
+def ParentRequester(operation: str, arguments: tuple, waitReply: bool = True) -> Any:
+    if WORKER_TASK_PIPE is None:
+        logging.error(f"{operation} is only available inside plugin workers")
+        return None
+    
+    # The parent sends nothing else while an invocation runs, so the next message is the reply
+    WORKER_TASK_PIPE.send(("call", operation, arguments, waitReply))
+    if waitReply:
+        return WORKER_TASK_PIPE.recv()
+    return None
+
+def ParentReplier(conn, description: str) -> Callable[[Any], None]:
+    def replySender(reply: Any) -> None:
+        try:
+            conn.send(reply)
+        except Exception as e:
+            logging.error(f"Failed to reply to {description}: {e}")
+    return replySender
+
+def ParentRequestHandler(pluginName: str, operation: str, arguments: tuple,
+                         replySender: Optional[Callable[[Any], None]] = None) -> Any:
+    try:
+        match operation:
+            case "plugin_switch":
+                return PluginSwitchSetter(pluginName, *arguments)
+            case "defer":
+                if replySender is None:
+                    return DeferredRegistrar(pluginName, *arguments)
+                
+                # The writer thread replies with the id once the insert is committed
+                if DeferredRegistrar(pluginName, *arguments, onCommit=replySender) is None:
+                    return None
+                return PARENT_REPLY_PENDING
+            case "config_read":
+                return ConfigSnapshotGetter(pluginName)
+            case "config_write":
+                configData, expectedVersion, waitForCommit = arguments
+                if not waitForCommit or replySender is None:
+                    return ConfigCommitter(pluginName, configData, expectedVersion)
+                
+                # The writer thread replies once the batch holding this write is committed
+                if ConfigCommitter(pluginName, configData, expectedVersion, replySender) is None:
+                    return None
+                return PARENT_REPLY_PENDING
+            case "kv_get":
+                return KvReader(pluginName, *arguments)
+            case "kv_set":
+                return KvWriter(pluginName, *arguments)
+            case "kv_delete":
+                return KvDeleter(pluginName, *arguments)
+            case "kv_increment":
+                return KvIncrementer(pluginName, *arguments)
+            case "kv_swap":
+                return KvSwapper(pluginName, *arguments)
+            case "kv_scan":
+                return KvScanner(pluginName, *arguments)
+            case "shared_state_compact":
+                return SharedStateCompactionRunner()
+            case "emit":
+                if IS_MUTED:
+                    return None
+                emitRawEvent = {"post_type": "service", "time": int(time.time())}
+                OutboundEnqueuer(arguments[0], ParsedEvent(emitRawEvent, eventType="SERVICE"))
+                return None
+            case _:
+                logging.error(f"Plugin {pluginName} sent unknown request '{operation}'")
+                return None
+    except Exception as e:
+        logging.error(f"Plugin {pluginName} request '{operation}' failed: {e}")
+        return None
+
+def PluginInvoker(handlerRef: str, simpleEvent: Union[Dict, None], rawEvent: Dict, historyOverlay_: List[tuple],
+                  configSnapshot: Optional[tuple[int, Optional[str]]] = None,
+                  extraTools: Optional[Dict[str, Callable]] = None) -> Any:
+    pluginName = HandlerPluginName(handlerRef)
+    handler = HandlerResolver(handlerRef)
+    
+    # Events of this conversation the parent has not flushed yet
+    def Librarian(eventIdentifier: Dict, eventCount: int = 50) -> List[Dict]:
+        return SubprocessLibrarian(eventIdentifier, eventCount, historyOverlay_)
+    
+    # Config shipped with the invocation, services have none and ask the parent on every read
+    configState = list(configSnapshot) if configSnapshot is not None else None
+    
+    # Services have no snapshot, and a write sent without waiting leaves the version unknown
+    def ConfigStateGetter() -> list:
+        nonlocal configState
+        if configSnapshot is None or configState is None:
+            configState = list(ParentRequester("config_read", ()) or (0, None))
+        return configState
+    
+    def ConfigReader() -> Dict:
+        configData = ConfigStateGetter()[1]
+        if configData is None:
+            return {}
+        try:
+            return json.loads(configData)
+        except json.JSONDecodeError as e:
+            logging.error(f"ConfigReader: Invalid JSON for plugin {pluginName}: {e}")
+            return {}
+    
+    # Based on the version last read, a write after someone else's newer write is rejected
+    def ConfigWriter(config: Dict, waitForCommit: bool = False) -> Optional[bool]:
+        nonlocal configState
+        if not isinstance(config, dict):
+            logging.error(f"ConfigWriter: config must be a dict, got {type(config)} for plugin {pluginName}")
+            return False
+        
+        try:
+            configData = json.dumps(config, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            logging.error(f"ConfigWriter: Failed to serialize config for plugin {pluginName}: {e}")
+            return False
+        
+        if configState is None and configSnapshot is not None:
+            ConfigStateGetter()
+        expectedVersion = configState[0] if configState is not None else None
+        
+        # Without waiting the parent applies the write behind, a rejected write is only logged there,
+        # so the version is left unknown and fetched again on the next read or write
+        if not waitForCommit:
+            ParentRequester("config_write", (configData, expectedVersion, False), waitReply=False)
+            configState = None
+            return None
+        
+        newVersion = ParentRequester("config_write", (configData, expectedVersion, True))
+        if newVersion is None:
+            return False
+        configState = [newVersion, configData]
+        return True
+    
+    # Per-key state, every operation runs atomically in the parent
+    def KvEncoder(value: Any) -> Optional[str]:
+        try:
+            return json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            logging.error(f"KvStore: value is not JSON serializable for plugin {pluginName}: {e}")
+            return None
+    
+    def KvGet(key: str, default: Any = None) -> Any:
+        valueData = ParentRequester("kv_get", (key,))
+        return json.loads(valueData) if valueData is not None else default
+    
+    def KvSet(key: str, value: Any, ttlSeconds: Optional[float] = None) -> bool:
+        valueData = KvEncoder(value)
+        if valueData is None:
+            return False
+        return bool(ParentRequester("kv_set", (key, valueData, ttlSeconds)))
+    
+    def KvDelete(key: str) -> bool:
+        return bool(ParentRequester("kv_delete", (key,)))
+    
+    def KvIncrement(key: str, amount: Union[int, float] = 1, ttlSeconds: Optional[float] = None) -> Optional[Union[int, float]]:
+        return ParentRequester("kv_increment", (key, amount, ttlSeconds))
+    
+    # expected KV_ABSENT means the key must not exist yet, None matches a stored null
+    def KvCompareAndSwap(key: str, expected: Any, value: Any, ttlSeconds: Optional[float] = None) -> bool:
+        expectedData = KvEncoder(expected) if expected is not KV_ABSENT else None
+        valueData = KvEncoder(value)
+        if valueData is None or (expected is not KV_ABSENT and expectedData is None):
+            return False
+        return bool(ParentRequester("kv_swap", (key, expectedData, valueData, ttlSeconds)))
+    
+    def KvScan(prefix: str = "", limit: Optional[int] = None) -> Dict[str, Any]:
+        rows_ = ParentRequester("kv_scan", (prefix, limit)) or []
+        return {key: json.loads(valueData) for key, valueData in rows_}
+    
+    # Hot counters in the parent's shared memory, read and updated without a round trip
+    sharedState = {
+        "Get": lambda key, default=None: SharedStateReader(pluginName, key, default),
+        "Add": lambda key, amount=1, ttlSeconds=None: SharedStateAdder(pluginName, key, amount, ttlSeconds),
+        "Expire": lambda key, ttlSeconds: SharedStateExpirer(pluginName, key, ttlSeconds)
+    }
+    
+    # Toggles only the calling plugin, None restores the MANIFEST default
+    def PluginSwitch(scope: str, targetId: Union[int, str], enabled: Optional[bool]) -> bool:
+        return bool(ParentRequester("plugin_switch", (scope, targetId, enabled)))
+    
+    # Calls this plugin's DEFERRED handler with the payload once the delay has passed
+    def Defer(delaySeconds: float, payload: Any = None) -> Optional[int]:
+        return ParentRequester("defer", (delaySeconds, payload))
+    
+    botContext = {
+        "Librarian": Librarian,
+        "ConfigReader": ConfigReader,
+        "ConfigWriter": ConfigWriter,
+        "ApiCaller": SubprocessApiCaller,
+        "PluginSwitch": PluginSwitch,
+        "Defer": Defer,
+        "KvGet": KvGet,
+        "KvSet": KvSet,
+        "KvDelete": KvDelete,
+        "KvIncrement": KvIncrement,
+        "KvCompareAndSwap": KvCompareAndSwap,
+        "KvScan": KvScan,
+        "KvAbsent": KV_ABSENT,
+        "SharedState": sharedState
+    }
+    if extraTools:
+        botContext.update(extraTools)
+    
+    sig = inspect.signature(handler)
+    params = sig.parameters
+    
+    availableArgs = {
+        'simpleEvent': simpleEvent,
+        'rawEvent': rawEvent,
+        'botContext': botContext
+    }
+    
+    # Build call arguments based on function signature
+    callArgs = {}
+    for paramName in params:
+        if paramName in availableArgs:
+            callArgs[paramName] = availableArgs[paramName]
+    
+    return handler(**callArgs)
+
+def PluginWorker(taskPipe, memoryLimit: int, maxCpuTime: float, sharedStateHandle: Optional[tuple] = None):
+    global WORKER_TASK_PIPE
+    WORKER_TASK_PIPE = taskPipe
+    SharedStateAttacher(sharedStateHandle)
+    
+    # Set memory limit (Linux only)
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (memoryLimit, memoryLimit))
+    except Exception as e:
+        logging.warning(f"Failed to set memory limit: {e}")
+    
+    # SIGXCPU terminates the worker, never leave a core dump behind
+    try:
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        cpuHardLimit = resource.getrlimit(resource.RLIMIT_CPU)[1]
+    except Exception as e:
+        logging.warning(f"Failed to prepare CPU limit: {e}")
+        cpuHardLimit = None
+    
+    workerProcess = psutil.Process()
+    
+    # Serve invocations until the parent retires this worker
+    try:
+        while True:
             try:
-                databaseConnect.close()
+                task = taskPipe.recv()
+            except (EOFError, OSError):
+                break
+            
+            if task is None:
+                break
+            
+            handler, simpleEvent, rawEvent, historyOverlay_, configSnapshot = task
+            
+            usageBefore = resource.getrusage(resource.RUSAGE_SELF)
+            cpuBefore = usageBefore.ru_utime + usageBefore.ru_stime
+            
+            # RLIMIT_CPU counts the whole process lifetime, so move the soft limit per invocation
+            if cpuHardLimit is not None:
+                try:
+                    cpuSoftLimit = int(math.ceil(cpuBefore + maxCpuTime))
+                    if cpuHardLimit != resource.RLIM_INFINITY:
+                        cpuSoftLimit = min(cpuSoftLimit, cpuHardLimit)
+                    resource.setrlimit(resource.RLIMIT_CPU, (cpuSoftLimit, cpuHardLimit))
+                except Exception as e:
+                    logging.warning(f"Failed to set CPU limit: {e}")
+            
+            invokeStart = time.perf_counter()
+            try:
+                result = PluginInvoker(handler, simpleEvent, rawEvent, historyOverlay_, configSnapshot)
+            except Exception as e:
+                result = {"_error": str(e), "_type": type(e).__name__}
+            wallTime = time.perf_counter() - invokeStart
+            
+            if cpuHardLimit is not None:
+                try:
+                    resource.setrlimit(resource.RLIMIT_CPU, (cpuHardLimit, cpuHardLimit))
+                except Exception:
+                    pass
+            
+            usageAfter = resource.getrusage(resource.RUSAGE_SELF)
+            workerStats = {
+                "wall_time": wallTime,
+                "cpu_time": usageAfter.ru_utime + usageAfter.ru_stime - cpuBefore,
+                "peak_rss": usageAfter.ru_maxrss * 1024,
+                "rss": 0
+            }
+            try:
+                workerStats["rss"] = workerProcess.memory_info().rss
             except Exception:
                 pass
+            
+            try:
+                taskPipe.send(("result", result, workerStats))
+            except Exception as e:
+                taskPipe.send(("result", {"_error": f"Failed to send result: {e}", "_type": type(e).__name__}, workerStats))
+        
+        taskPipe.close()
+    except MemoryError:
+        # Under RLIMIT_AS even building the error reply can fail, the exit code tells the supervisor why
+        os._exit(WORKER_MEMORY_EXIT_CODE)
 
-def PluginWorker(handler, simpleEvent: Union[Dict, None], rawEvent: Dict, resultPipe, memoryLimit: int):
+def ServiceWorker(handlerRef: str, servicePipe, memoryLimit: int, sharedStateHandle: Optional[tuple] = None):
+    global WORKER_TASK_PIPE
+    WORKER_TASK_PIPE = servicePipe
+    SharedStateAttacher(sharedStateHandle)
+    
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (memoryLimit, memoryLimit))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    except Exception as e:
+        logging.warning(f"Failed to set service resource limits: {e}")
+    
+    # Responses go through the parent's outbound path, just like handler return values
+    def Emit(pluginResponse: Any) -> None:
+        ParentRequester("emit", (pluginResponse,), waitReply=False)
+    
+    rawEvent = {"post_type": "service", "time": int(time.time())}
     try:
-        # Set memory limit (Linux only)
+        PluginInvoker(handlerRef, None, rawEvent, [], extraTools={"Emit": Emit})
+    except BaseException as e:
         try:
-            resource.setrlimit(resource.RLIMIT_AS, (memoryLimit, memoryLimit))
-        except Exception as e:
-            logging.warning(f"Failed to set memory limit: {e}")
+            servicePipe.send(("result", {"_error": str(e), "_type": type(e).__name__}, None))
+        except Exception:
+            pass
+        sys.exit(1)
+    
+    servicePipe.close()
+
+def ServiceSupervisor(handlerRef: str) -> None:
+    pluginName = HandlerPluginName(handlerRef)
+    serviceConfig = CONFIG['SERVICE']
+    memoryLimit = serviceConfig['memory_limit_mb'] * 1024 * 1024
+    checkInterval = serviceConfig['cpu_check_interval_seconds']
+    backoff = serviceConfig['restart_backoff_initial_seconds']
+    
+    while True:
+        parentConn, childConn = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=ServiceWorker,
+            args=(handlerRef, childConn, memoryLimit, SHARED_STATE_HANDLE),
+            name=f"askr-service-{pluginName}",
+            daemon=True
+        )
+        process.start()
+        childConn.close()
         
-        pluginName = getattr(handler, '__module__', 'unknown_plugin')
+        startTime = time.time()
+        logging.info(f"Service {handlerRef} started (pid {process.pid})")
         
-        # Create plugin-specific config functions
-        def ConfigReader() -> Dict:
-            return SubprocessConfigReader(pluginName)
+        try:
+            serviceProcess = psutil.Process(process.pid)
+            lastCpuTime = 0.0
+        except psutil.Error:
+            serviceProcess = None
+        lastCheck = startTime
         
-        def ConfigWriter(config: Dict) -> None:
-            return SubprocessConfigWriter(pluginName, config)
+        waitables_ = [parentConn, process.sentinel]
+        stopReason = None
         
-        botContext = {
-            "Librarian": SubprocessLibrarian,
-            "ConfigReader": ConfigReader,
-            "ConfigWriter": ConfigWriter,
-            "ApiCaller": SubprocessApiCaller
-        }
+        def handleMessage(message):
+            nonlocal stopReason
+            if message[0] == "call":
+                _, operation, arguments, waitReply = message
+                replySender = ParentReplier(parentConn, f"service {handlerRef}")
+                reply = ParentRequestHandler(pluginName, operation, arguments, replySender)
+                if waitReply and reply is not PARENT_REPLY_PENDING:
+                    replySender(reply)
+            elif message[0] == "result":
+                result = message[1]
+                stopReason = f"raised {result['_type']}: {result['_error']}"
         
-        sig = inspect.signature(handler)
-        params = sig.parameters
+        while True:
+            ready_ = multiprocessing.connection.wait(waitables_, timeout=checkInterval)
+            
+            if parentConn in ready_:
+                try:
+                    message = parentConn.recv()
+                except (EOFError, OSError):
+                    waitables_ = [process.sentinel]
+                    continue
+                handleMessage(message)
+            
+            if process.sentinel in ready_:
+                break
+            
+            # CPU rate over the last interval, a service may idle but never spin
+            now = time.time()
+            if serviceProcess is not None and now - lastCheck >= checkInterval:
+                try:
+                    cpuTimes = serviceProcess.cpu_times()
+                    cpuTime = cpuTimes.user + cpuTimes.system
+                except psutil.Error:
+                    continue
+                cpuPercent = (cpuTime - lastCpuTime) / (now - lastCheck) * 100
+                lastCpuTime, lastCheck = cpuTime, now
+                
+                if cpuPercent > serviceConfig['max_cpu_percent']:
+                    stopReason = f"cpu_rate_exceeded ({cpuPercent:.0f}% > {serviceConfig['max_cpu_percent']}%)"
+                    process.kill()
+                    break
         
-        availableArgs = {
-            'simpleEvent': simpleEvent,
-            'rawEvent': rawEvent,
-            'botContext': botContext
-        }
+        # Messages sent just before the service exited are still buffered in the pipe, including its last Emits and its result
+        try:
+            while parentConn.poll():
+                handleMessage(parentConn.recv())
+        except (EOFError, OSError):
+            pass
+        
+        process.join(timeout=5)
+        parentConn.close()
+        
+        if stopReason is None and process.exitcode == 0:
+            logging.info(f"Service {handlerRef} returned, not restarting it")
+            return
+        
+        # Daemonic services are terminated when the framework exits
+        if not threading.main_thread().is_alive():
+            return
         
-        # Build call arguments based on function signature
-        callArgs = {}
-        for paramName in params:
-            if paramName in availableArgs:
-                callArgs[paramName] = availableArgs[paramName]
+        if stopReason is None:
+            stopReason = f"exited with code {process.exitcode}"
         
-        result = handler(**callArgs)
-        resultPipe.send(result)
+        # A service that ran long enough before failing starts over with a short delay
+        if time.time() - startTime >= serviceConfig['stable_after_seconds']:
+            backoff = serviceConfig['restart_backoff_initial_seconds']
         
+        MetricsCounter("service_restarts", pluginName, stopReason.split(" ")[0])
+        logging.error(f"Service {handlerRef} stopped: {stopReason}, restarting in {backoff}s")
+        time.sleep(backoff)
+        backoff = min(backoff * 2, serviceConfig['restart_backoff_max_seconds'])
+
+def ServiceStarter() -> None:
+    for handlerRef in SERVICE_REGISTRY:
+        thread = threading.Thread(target=ServiceSupervisor, args=(handlerRef,),
+                                  name=f"askr-service-{HandlerPluginName(handlerRef)}", daemon=True)
+        thread.start()
+    
+    if SERVICE_REGISTRY:
+        logging.info(f"Started {len(SERVICE_REGISTRY)} SERVICE plugins")
+
+def WorkerSpawner(pluginName: str) -> Dict:
+    memoryLimit = CONFIG['PLUGIN_EXECUTION']['memory_limit_mb'] * 1024 * 1024
+    maxCpuTime = CONFIG['PLUGIN_EXECUTION']['max_cpu_time_seconds']
+    
+    parentConn, childConn = multiprocessing.Pipe()
+    
+    # Daemonic so that idle workers never keep the framework from exiting
+    process = multiprocessing.Process(
+        target=PluginWorker,
+        args=(childConn, memoryLimit, maxCpuTime, SHARED_STATE_HANDLE),
+        name=f"askr-worker-{pluginName}",
+        daemon=True
+    )
+    spawnStart = time.perf_counter()
+    process.start()
+    MetricsObserver("process_spawn", time.perf_counter() - spawnStart)
+    childConn.close()
+    
+    return {
+        "pluginName": pluginName,
+        "process": process,
+        "conn": parentConn,
+        "invocations": 0,
+        "baselineRss": None,
+        "monitor": None,
+        "lastUsed": time.time()
+    }
+
+def WorkerRetirer(worker: Dict, force: bool = False) -> None:
+    process = worker["process"]
+    
+    try:
+        if force:
+            if process.is_alive():
+                process.kill()
+            process.join(timeout=1)
+        else:
+            # The worker exits on its own, multiprocessing reaps it on the next start
+            worker["conn"].send(None)
     except Exception as e:
-        resultPipe.send({"_error": str(e), "_type": type(e).__name__})
+        logging.warning(f"Error retiring worker for plugin {worker['pluginName']}: {e}")
     finally:
-        resultPipe.close()
+        try:
+            worker["conn"].close()
+        except Exception:
+            pass
 
-def PluginMonitor(process, startTime, maxCpuTime: float, maxWallTime: float, memoryLimit: int):
-    try:
-        pluginProcess = psutil.Process(process.pid)
-        
-        cpuTimes = pluginProcess.cpu_times()
-        totalCpuTime = cpuTimes.user + cpuTimes.system
+def WorkerPoolGetter(pluginName: str) -> Dict:
+    with WORKER_POOLS_LOCK:
+        pool = WORKER_POOLS.get(pluginName)
+        if pool is None:
+            pool = {
+                "pluginName": pluginName,
+                "idle": [],
+                "size": 0,
+                "backlog": collections.deque(),
+                "lock": threading.Lock()
+            }
+            WORKER_POOLS[pluginName] = pool
+        return pool
+
+def WorkerAcquirer(pool: Dict) -> Optional[Dict]:
+    with pool["lock"]:
+        # Most recently used first, so surplus workers age out
+        while pool["idle"]:
+            worker = pool["idle"].pop()
+            if worker["process"].is_alive():
+                return worker
+            pool["size"] -= 1
+            WorkerRetirer(worker, force=True)
         
-        if totalCpuTime > maxCpuTime:
-            return f"cpu_time_exceeded ({totalCpuTime:.2f}s > {maxCpuTime}s)"
+        # Scale up only while invocations are queued and the pool has room
+        if not pool["backlog"] or pool["size"] >= CONFIG['WORKER_POOL']['max_workers']:
+            return None
+        pool["size"] += 1
+    
+    try:
+        return WorkerSpawner(pool["pluginName"])
+    except Exception as e:
+        logging.error(f"Failed to spawn worker for plugin {pool['pluginName']}: {e}")
+        with pool["lock"]:
+            pool["size"] -= 1
+        return None
+
+def WorkerReleaser(pool: Dict, worker: Dict, recycleReason: Optional[str] = None, workerStats: Optional[Dict] = None) -> None:
+    poolConfig = CONFIG['WORKER_POOL']
+    worker["invocations"] += 1
+    
+    if not recycleReason and worker["invocations"] >= poolConfig['max_invocations']:
+        recycleReason = f"max_invocations_reached ({worker['invocations']})"
+    
+    if not recycleReason and workerStats and workerStats.get("rss"):
+        currentRss = workerStats["rss"]
+        if worker["baselineRss"] is None:
+            # First invocation has imported the plugin, measure from here
+            worker["baselineRss"] = currentRss
+        elif currentRss - worker["baselineRss"] > poolConfig['max_rss_growth_mb'] * 1024 * 1024:
+            growthMB = (currentRss - worker["baselineRss"]) / (1024 * 1024)
+            recycleReason = f"rss_growth_exceeded ({growthMB:.1f}MB > {poolConfig['max_rss_growth_mb']}MB)"
+    
+    if recycleReason:
+        logging.info(f"Recycling worker for plugin {pool['pluginName']}: {recycleReason}")
+        WorkerRetirer(worker, force=not worker["process"].is_alive())
+        with pool["lock"]:
+            pool["size"] -= 1
+        return
+    
+    currentTime = time.time()
+    worker["lastUsed"] = currentTime
+    expiredWorkers_ = []
+    
+    with pool["lock"]:
+        pool["idle"].append(worker)
         
-        wallTime = time.time() - startTime
-        if wallTime > maxWallTime:
-            return f"wall_time_exceeded ({wallTime:.2f}s > {maxWallTime}s)"
+        # Scale down workers that stayed idle too long, keeping the minimum warm
+        for idleWorker in list(pool["idle"]):
+            if pool["size"] <= poolConfig['min_workers']:
+                break
+            if currentTime - idleWorker["lastUsed"] > poolConfig['idle_timeout_seconds']:
+                pool["idle"].remove(idleWorker)
+                pool["size"] -= 1
+                expiredWorkers_.append(idleWorker)
+    
+    for expiredWorker in expiredWorkers_:
+        WorkerRetirer(expiredWorker)
+
+def WorkerPoolWarmer(pluginName: str) -> None:
+    pool = WorkerPoolGetter(pluginName)
+    
+    while True:
+        with pool["lock"]:
+            if pool["size"] >= CONFIG['WORKER_POOL']['min_workers']:
+                return
+            pool["size"] += 1
         
         try:
-            memInfo = pluginProcess.memory_info()
-            if memInfo.rss > memoryLimit:
-                memUsageMB = memInfo.rss / (1024 * 1024)
-                memLimitMB = memoryLimit / (1024 * 1024)
-                return f"memory_exceeded ({memUsageMB:.1f}MB > {memLimitMB:.1f}MB)"
-        except Exception:
-            pass
+            worker = WorkerSpawner(pluginName)
+        except Exception as e:
+            with pool["lock"]:
+                pool["size"] -= 1
+            logging.error(f"Failed to warm worker pool for plugin {pluginName}: {e}")
+            return
         
-        return None
+        with pool["lock"]:
+            pool["idle"].append(worker)
+
+def WorkerPoolCloser(pluginName: str) -> None:
+    with WORKER_POOLS_LOCK:
+        pool = WORKER_POOLS.pop(pluginName, None)
+    
+    if pool is None:
+        return
+    
+    with pool["lock"]:
+        idleWorkers_ = pool["idle"]
+        pool["idle"] = []
+        pool["size"] -= len(idleWorkers_)
+    
+    for worker in idleWorkers_:
+        WorkerRetirer(worker)
+
+def PluginSubmitter(handler, simpleEvent: Union[Dict, None], parsedEvent: ParsedEvent, completionCallback: Callable) -> None:
+    global SUPERVISOR_THREAD, SUPERVISOR_WAKE_RECV, SUPERVISOR_WAKE_SEND, SUPERVISOR_SIGNALED
+    
+    invocation = {
+        "handler": handler,
+        "simpleEvent": simpleEvent,
+        "rawEvent": parsedEvent.rawEvent,
+        "pluginName": HandlerPluginName(handler),
+        "eventType": parsedEvent.eventType,
+        "groupId": parsedEvent.groupId,
+        "callback": completionCallback,
+        "historyOverlay": HistoryOverlaySnapshot(parsedEvent),
+        "worker": None,
+        "startTime": None,
+        "done": False
+    }
+    
+    with SUPERVISOR_LOCK:
+        if SUPERVISOR_THREAD is None:
+            SUPERVISOR_WAKE_RECV, SUPERVISOR_WAKE_SEND = multiprocessing.Pipe(duplex=False)
+            SUPERVISOR_THREAD = threading.Thread(target=PluginSupervisor, name="askr-supervisor", daemon=True)
+            SUPERVISOR_THREAD.start()
         
-    except psutil.NoSuchProcess:
-        return None
-    except Exception as e:
-        logging.warning(f"Error monitoring process: {e}")
-        return None
+        SUPERVISOR_PENDING.append(invocation)
+        
+        # One wake-up byte is enough until the supervisor drains the pending list
+        if not SUPERVISOR_SIGNALED:
+            SUPERVISOR_SIGNALED = True
+            SUPERVISOR_WAKE_SEND.send_bytes(b'\0')
 
-def PluginCallerSingle(handler, simpleEvent: Union[Dict, None], rawEvent: Dict):
-    try:
-        maxCpuTime = CONFIG['PLUGIN_EXECUTION']['max_cpu_time_seconds']
-        maxWallTime = CONFIG['PLUGIN_EXECUTION']['max_wall_time_seconds']
-        memoryLimit = CONFIG['PLUGIN_EXECUTION']['memory_limit_mb'] * 1024 * 1024
+def PluginSupervisor() -> None:
+    global SUPERVISOR_SIGNALED
+    
+    maxCpuTime = CONFIG['PLUGIN_EXECUTION']['max_cpu_time_seconds']
+    maxWallTime = CONFIG['PLUGIN_EXECUTION']['max_wall_time_seconds']
+    memoryLimit = CONFIG['PLUGIN_EXECUTION']['memory_limit_mb'] * 1024 * 1024
+    memoryCheckInterval = CONFIG['PLUGIN_EXECUTION']['memory_check_interval_seconds']
+    nextMemoryCheck = 0.0
+    
+    runningByConn = {}  # type: Dict[Any, Dict]
+    runningBySentinel = {}  # type: Dict[int, Dict]
+    deadlines_ = []  # type: List[tuple[float, int, Dict]]
+    deadlineSequence = 0
+    
+    def finish(invocation: Dict, result: Any, recycleReason: Optional[str] = None, workerStats: Optional[Dict] = None):
+        invocation["done"] = True
+        worker = invocation["worker"]
         
-        parentConn, childConn = multiprocessing.Pipe()
+        pluginName = invocation["pluginName"]
+        if recycleReason:
+            exitReason = recycleReason.split(" ")[0]
+        elif isinstance(result, dict) and "_error" in result:
+            exitReason = "error"
+        else:
+            exitReason = "ok"
         
-        process = multiprocessing.Process(
-            target=PluginWorker,
-            args=(handler, simpleEvent, rawEvent, childConn, memoryLimit)
-        )
+        MetricsCounter("plugin_invocations", pluginName)
+        if exitReason == "error":
+            MetricsCounter("plugin_errors", pluginName)
+        elif exitReason != "ok":
+            MetricsCounter("plugin_terminations", pluginName, exitReason)
+        if workerStats:
+            MetricsObserver("plugin_execution", workerStats["wall_time"])
+        PluginStatsRecorder(invocation, exitReason, workerStats)
+        runningByConn.pop(worker["conn"], None)
+        runningBySentinel.pop(worker["process"].sentinel, None)
         
-        startTime = time.time()
-        process.start()
+        pool = WorkerPoolGetter(invocation["pluginName"])
+        WorkerReleaser(pool, worker, recycleReason, workerStats)
+        
+        try:
+            invocation["callback"](result)
+        except Exception as e:
+            logging.error(f"Error in completion callback for plugin {invocation['handler']}: {e}")
         
-        monitorInterval = CONFIG['PLUGIN_EXECUTION']['monitor_interval_seconds']
+        launch(pool)
+    
+    def launch(pool: Dict):
+        nonlocal deadlineSequence
         
-        while process.is_alive():
-            if parentConn.poll(timeout=monitorInterval):
+        while pool["backlog"]:
+            worker = WorkerAcquirer(pool)
+            if worker is None:
+                return
+            
+            invocation = pool["backlog"].popleft()
+            handler = invocation["handler"]
+            
+            # Taken at launch, an invocation that waited in the backlog still sees the latest config
+            configSnapshot = ConfigSnapshotGetter(invocation["pluginName"])
+            
+            try:
+                worker["conn"].send((handler, invocation["simpleEvent"], invocation["rawEvent"],
+                                     invocation["historyOverlay"], configSnapshot))
+            except Exception as e:
+                logging.error(f"Failed to dispatch plugin {handler} to worker: {e}")
+                WorkerReleaser(pool, worker, "dispatch_failed")
                 try:
-                    result = parentConn.recv()
-                    
-                    # Clean up process
-                    process.join(timeout=1)
-                    if process.is_alive():
-                        process.terminate()
-                        process.join(timeout=1)
-                        if process.is_alive():
-                            process.kill()
-                    
-                    return result
-                    
+                    invocation["callback"](None)
                 except Exception as e:
-                    logging.error(f"Error receiving result from plugin {handler.__name__}: {e}")
-                    return None
+                    logging.error(f"Error in completion callback for plugin {handler}: {e}")
+                continue
+            
+            invocation["worker"] = worker
+            invocation["startTime"] = time.time()
+            runningByConn[worker["conn"]] = invocation
+            runningBySentinel[worker["process"].sentinel] = invocation
+            
+            deadlineSequence += 1
+            heapq.heappush(deadlines_, (invocation["startTime"] + maxWallTime, deadlineSequence, invocation))
+    
+    while True:
+        try:
+            # Take newly submitted invocations
+            with SUPERVISOR_LOCK:
+                while SUPERVISOR_WAKE_RECV.poll():
+                    SUPERVISOR_WAKE_RECV.recv_bytes()
+                SUPERVISOR_SIGNALED = False
+                submitted_ = SUPERVISOR_PENDING[:]
+                SUPERVISOR_PENDING.clear()
+            
+            touchedPools_ = []
+            for invocation in submitted_:
+                pool = WorkerPoolGetter(invocation["pluginName"])
+                pool["backlog"].append(invocation)
+                if pool not in touchedPools_:
+                    touchedPools_.append(pool)
             
-            terminationReason = PluginMonitor(
-                process, startTime, maxCpuTime, maxWallTime, memoryLimit
+            for pool in touchedPools_:
+                launch(pool)
+            
+            # Sleep until a result, a worker death, a submission or the nearest deadline
+            while deadlines_ and deadlines_[0][2]["done"]:
+                heapq.heappop(deadlines_)
+            waitTimeout = max(0.0, deadlines_[0][0] - time.time()) if deadlines_ else None
+            if runningByConn:
+                memoryTimeout = max(0.0, nextMemoryCheck - time.time())
+                waitTimeout = memoryTimeout if waitTimeout is None else min(waitTimeout, memoryTimeout)
+            
+            readyObjects_ = multiprocessing.connection.wait(
+                [SUPERVISOR_WAKE_RECV] + list(runningByConn) + list(runningBySentinel),
+                timeout=waitTimeout
             )
             
-            if terminationReason:
-                logging.error(f"Plugin {handler.__name__} terminated: {terminationReason}")
+            for readyObject in readyObjects_:
+                if readyObject is SUPERVISOR_WAKE_RECV:
+                    continue
                 
-                process.terminate()
-                process.join(timeout=1)
-                if process.is_alive():
-                    process.kill()
-                    process.join()
+                invocation = runningByConn.get(readyObject) or runningBySentinel.get(readyObject)
+                if invocation is None or invocation["done"]:
+                    continue
+                
+                handler = invocation["handler"]
+                worker = invocation["worker"]
+                
+                # A worker may exit right after replying, prefer the reply
+                if worker["conn"].poll():
+                    try:
+                        receiveStart = time.perf_counter()
+                        message = worker["conn"].recv()
+                        MetricsObserver("result_receive", time.perf_counter() - receiveStart)
+                    except (EOFError, OSError):
+                        # The pipe closed because the worker died, handled below
+                        pass
+                    except Exception as e:
+                        logging.error(f"Error receiving result from plugin {handler}: {e}")
+                        finish(invocation, None, "receive_failed")
+                        continue
+                    else:
+                        # Requests from the running plugin, the result comes later on the same pipe
+                        if message[0] == "call":
+                            messageType, operation, arguments, waitReply = message
+                            replySender = ParentReplier(worker["conn"], f"plugin {handler}")
+                            reply = ParentRequestHandler(invocation["pluginName"], operation, arguments, replySender)
+                            if waitReply and reply is not PARENT_REPLY_PENDING:
+                                replySender(reply)
+                            continue
+                        
+                        messageType, result, workerStats = message
+                        
+                        # A MemoryError under RLIMIT_AS leaves the worker in an unknown state
+                        if isinstance(result, dict) and result.get("_type") == "MemoryError":
+                            finish(invocation, result, "memory_exceeded", workerStats)
+                        else:
+                            finish(invocation, result, None, workerStats)
+                        continue
+                
+                worker["process"].join(timeout=1)
+                exitCode = worker["process"].exitcode
+                if exitCode == -signal.SIGXCPU:
+                    terminationReason = f"cpu_time_exceeded (> {maxCpuTime}s)"
+                    logging.error(f"Plugin {handler} terminated: {terminationReason}")
+                elif exitCode in (WORKER_MEMORY_EXIT_CODE, -signal.SIGKILL):
+                    # The supervisor's own kills never get here, a SIGKILL comes from the kernel's OOM killer
+                    terminationReason = f"memory_exceeded (worker exited with code {exitCode})"
+                    logging.error(f"Plugin {handler} terminated: {terminationReason}")
+                else:
+                    terminationReason = f"worker_exited (code {exitCode})"
+                    logging.error(f"Plugin {handler} exited with code {exitCode}")
+                finish(invocation, None, terminationReason)
+            
+            # Enforce wall time limits
+            currentTime = time.time()
+            while deadlines_ and deadlines_[0][0] <= currentTime:
+                deadline, sequence, invocation = heapq.heappop(deadlines_)
+                if invocation["done"]:
+                    continue
+                
+                wallTime = currentTime - invocation["startTime"]
+                terminationReason = f"wall_time_exceeded ({wallTime:.2f}s > {maxWallTime}s)"
+                logging.error(f"Plugin {invocation['handler']} terminated: {terminationReason}")
+                
+                invocation["worker"]["process"].kill()
+                invocation["worker"]["process"].join(timeout=1)
+                finish(invocation, None, terminationReason)
+            
+            # RLIMIT_AS already bounds workers on Linux, RSS polling covers platforms where it cannot be set
+            if runningByConn and currentTime >= nextMemoryCheck:
+                nextMemoryCheck = currentTime + memoryCheckInterval
+                for invocation in list(runningByConn.values()):
+                    worker = invocation["worker"]
+                    try:
+                        if worker["monitor"] is None:
+                            worker["monitor"] = psutil.Process(worker["process"].pid)
+                        workerRss = worker["monitor"].memory_info().rss
+                    except Exception:
+                        continue  # Exited, reaped through its sentinel
                     
-                return None
-        
-        exitCode = process.exitcode
-        if exitCode != 0:
-            logging.error(f"Plugin {handler.__name__} exited with code {exitCode}")
+                    if workerRss > memoryLimit:
+                        terminationReason = f"memory_exceeded ({workerRss / (1024 * 1024):.1f}MB > {memoryLimit / (1024 * 1024):.1f}MB)"
+                        logging.error(f"Plugin {invocation['handler']} terminated: {terminationReason}")
+                        worker["process"].kill()
+                        worker["process"].join(timeout=1)
+                        finish(invocation, None, terminationReason)
+                
+        except Exception as e:
+            logging.error(f"Plugin supervisor error: {e}")
+            time.sleep(0.1)
+
+def PluginCallerSingle(handler, simpleEvent: Union[Dict, None], parsedEvent: ParsedEvent):
+    try:
+        resultQueue = queue.Queue(maxsize=1)
+        PluginSubmitter(handler, simpleEvent, parsedEvent, resultQueue.put)
         
-        return None
+        # The supervisor enforces the wall time limit, so a result always arrives
+        return resultQueue.get()
         
     except Exception as e:
-        logging.error(f"Failed to execute plugin {handler.__name__} in subprocess: {e}")
+        logging.error(f"Failed to execute plugin {handler} in subprocess: {e}")
         return None
 
 def PluginCaller(
-    handlers_: List[Callable], 
+    handlers_: List[str], 
     simpleEvent: Union[Dict, None], 
-    rawEvent: Dict,
+    parsedEvent: ParsedEvent,
     resultCallback: Optional[Callable] = None
 ) -> List[Any]:
     
@@ -996,27 +2845,18 @@ def PluginCaller(
     results = {}
     resultQueue = queue.Queue()
     
-    def executePluginThread(handler, handlerIndex):
-        try:
-            result = PluginCallerSingle(handler, simpleEvent, rawEvent)
-            
-            # Convert errors to None for parallel execution
-            if isinstance(result, dict) and "_error" in result:
-                logging.error(f"Plugin {handler.__name__} raised {result['_type']}: {result['_error']}")
-                result = None
-            
+    def completionCallbackCreator(handler, handlerIndex):
+        def completionCallback(result):
             resultQueue.put((handlerIndex, handler, result))
-        except Exception as e:
-            logging.error(f"Thread execution error for plugin {handler.__name__}: {e}")
-            resultQueue.put((handlerIndex, handler, None))
+        return completionCallback
     
-    # Start all plugin threads
-    threads_ = []
+    # Submit all handlers to the supervisor, which runs them in parallel
     for i, handler in enumerate(handlers_):
-        thread = threading.Thread(target=executePluginThread, args=(handler, i))
-        thread.daemon = True
-        thread.start()
-        threads_.append(thread)
+        try:
+            PluginSubmitter(handler, simpleEvent, parsedEvent, completionCallbackCreator(handler, i))
+        except Exception as e:
+            logging.error(f"Failed to submit plugin {handler}: {e}")
+            resultQueue.put((i, handler, None))
     
     # Process results as they complete
     completedCount = 0
@@ -1027,25 +2867,24 @@ def PluginCaller(
             handlerIndex, handler, result = resultQueue.get(timeout=maxWaitTime)
             completedCount += 1
             
+            # Convert errors to None for parallel execution
+            if isinstance(result, dict) and "_error" in result:
+                logging.error(f"Plugin {handler} raised {result['_type']}: {result['_error']}")
+                result = None
+            
             results[handlerIndex] = result
             
             # Immediate callback for successful results
             if resultCallback and result is not None:
                 try:
-                    resultCallback(result, rawEvent)
+                    resultCallback(result, parsedEvent)
                 except Exception as e:
-                    logging.error(f"Error in result callback for plugin {handler.__name__}: {e}")
+                    logging.error(f"Error in result callback for plugin {handler}: {e}")
                     
         except queue.Empty:
             logging.warning(f"Timeout waiting for plugin results after {maxWaitTime} seconds")
             break
     
-    # Cleanup threads
-    for thread in threads_:
-        thread.join(timeout=1)
-        if thread.is_alive():
-            logging.warning(f"Thread still alive after receiving its result - possible bug")
-    
     # Return results in original order
     orderedResults = []
     for i in range(len(handlers_)):
@@ -1053,13 +2892,76 @@ def PluginCaller(
     
     return orderedResults
 
+def HttpSessionGetter() -> requests.Session:
+    global HTTP_SESSION, HTTP_SESSION_PID
+    
+    # A session inherited through fork shares sockets with the parent, never reuse it
+    currentPid = os.getpid()
+    if HTTP_SESSION is not None and HTTP_SESSION_PID == currentPid:
+        return HTTP_SESSION
+    
+    with HTTP_SESSION_LOCK:
+        if HTTP_SESSION is None or HTTP_SESSION_PID != currentPid:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=CONFIG['HTTP']['pool_connections'],
+                pool_maxsize=CONFIG['HTTP']['pool_maxsize']
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            HTTP_SESSION = session
+            HTTP_SESSION_PID = currentPid
+        return HTTP_SESSION
+
+def OutboundStarter() -> None:
+    senderCount = CONFIG['HTTP']['sender_threads']
+    
+    for i in range(senderCount):
+        senderQueue = queue.Queue(maxsize=CONFIG['HTTP']['send_queue_size'])
+        OUTBOUND_QUEUES_.append(senderQueue)
+        thread = threading.Thread(target=OutboundSender, args=(senderQueue,), name=f"askr-sender-{i}", daemon=True)
+        thread.start()
+    
+    logging.info(f"Started {senderCount} outbound sender threads")
+
+def OutboundEnqueuer(pluginResponse: Any, parsedEvent: ParsedEvent) -> None:
+    global OUTBOUND_DROPPED
+    if not OUTBOUND_QUEUES_:
+        OutbondMessageParser(pluginResponse, parsedEvent)
+        return
+    
+    # Same conversation, same sender thread, so replies keep their order
+    conversationKey = parsedEvent.groupId or parsedEvent.userId or 0
+    senderQueue = OUTBOUND_QUEUES_[hash(conversationKey) % len(OUTBOUND_QUEUES_)]
+    
+    try:
+        senderQueue.put_nowait((pluginResponse, parsedEvent))
+    except queue.Full:
+        # The supervisor thread reaps every worker, it must never wait on a slow NapCat
+        if threading.current_thread() is SUPERVISOR_THREAD:
+            OUTBOUND_DROPPED += 1
+            logging.warning(f"Outbound queue full, dropped response for {conversationKey}")
+            return
+        logging.warning(f"Outbound queue full, waiting to send response for {conversationKey}")
+        senderQueue.put((pluginResponse, parsedEvent))
+
+def OutboundSender(senderQueue: queue.Queue) -> None:
+    while True:
+        pluginResponse, parsedEvent = senderQueue.get()
+        sendStart = time.perf_counter()
+        try:
+            OutbondMessageParser(pluginResponse, parsedEvent)
+        except Exception as e:
+            logging.error(f"Outbound sender error: {e}")
+        MetricsObserver("outbound_send", time.perf_counter() - sendStart)
+
 def NapCatSender(actionEndpoint: str, requestBody: Dict) -> None:
     baseUrl = CONFIG['NAPCAT_SERVER']['api_url']
     fullUrl = f"{baseUrl}/{actionEndpoint}"
     
     for attempt in range(CONFIG['HTTP']['max_retries']):
         try:
-            response = requests.post(
+            response = HttpSessionGetter().post(
                 fullUrl,
                 json=requestBody,
                 timeout=CONFIG['HTTP']['timeout_seconds']
@@ -1094,7 +2996,7 @@ def NapCatSender(actionEndpoint: str, requestBody: Dict) -> None:
     # Diagnostic: check bot status
     try:
         statusUrl = f"{baseUrl}/get_status"
-        statusResponse = requests.get(statusUrl, timeout=CONFIG['HTTP']['status_check_timeout'])
+        statusResponse = HttpSessionGetter().get(statusUrl, timeout=CONFIG['HTTP']['status_check_timeout'])
         if statusResponse.status_code == 200:
             statusData = statusResponse.json()
             logging.error(f"Failed to send {actionEndpoint}. Bot status: {statusData}")
@@ -1103,36 +3005,36 @@ def NapCatSender(actionEndpoint: str, requestBody: Dict) -> None:
     except Exception as e:
         logging.error(f"Failed to send {actionEndpoint}. Could not get bot status: {e}")
 
-def OutbondMessageParser(pluginResponse: Any, rawEvent: Dict) -> None:
+def OutbondMessageParser(pluginResponse: Any, parsedEvent: ParsedEvent) -> None:
     if isinstance(pluginResponse, str):
-        postType = rawEvent.get("post_type")
+        postType = parsedEvent.rawEvent.get("post_type")
         
         if postType == "message":
-            messageType = rawEvent.get("message_type")
+            messageType = parsedEvent.rawEvent.get("message_type")
             
             if messageType == "private":
                 requestBody = {
-                    "user_id": rawEvent.get("user_id"),
+                    "user_id": parsedEvent.userId,
                     "message": [{"type": "text", "data": {"text": pluginResponse}}]
                 }
                 NapCatSender("send_private_msg", requestBody)
                 
             elif messageType == "group":
                 requestBody = {
-                    "group_id": rawEvent.get("group_id"),
+                    "group_id": parsedEvent.groupId,
                     "message": [{"type": "text", "data": {"text": pluginResponse}}]
                 }
                 NapCatSender("send_group_msg", requestBody)
                 
         elif postType == "notice":
-            eventType = EventTypeParser(rawEvent)
+            eventType = parsedEvent.eventType
             
             if eventType == "NOTICE_BOT_OFFLINE":
                 logging.warning("Cannot send message for NOTICE_BOT_OFFLINE event")
                 return
                 
-            groupId = rawEvent.get("group_id")
-            userId = rawEvent.get("user_id")
+            groupId = parsedEvent.groupId
+            userId = parsedEvent.userId
             
             if groupId:
                 requestBody = {
@@ -1184,176 +3086,860 @@ def OutbondMessageParser(pluginResponse: Any, rawEvent: Dict) -> None:
                               f"Skipping invalid item: {repr(item)}")
                 continue
             
-            OutbondMessageParser(item, rawEvent)
+            OutbondMessageParser(item, parsedEvent)
             
     else:
         logging.warning(f"Invalid plugin response type: {type(pluginResponse).__name__}. "
                        f"Expected str, dict, or list of str/dict, got {repr(pluginResponse)}")
         return
 
-def Historian(rawEvent: Dict) -> None:
-    eventType = EventTypeParser(rawEvent)
+def HistoryRouter(parsedEvent: ParsedEvent) -> tuple[str, Any]:
+    eventType = parsedEvent.eventType
+    
+    # Classify events into appropriate tables, keyed the way Librarian looks them up
+    if eventType in ["MESSAGE_PRIVATE", "NOTICE_FRIEND_RECALL", "NOTICE_FRIEND_ADD", "NOTICE_PROFILE_LIKE"]:
+        if parsedEvent.userId:
+            return "FRIEND_EVENTS", parsedEvent.userId
+    
+    elif eventType in ["MESSAGE_GROUP", "MESSAGE_GROUP_MENTION", "MESSAGE_GROUP_BOT",
+                      "NOTICE_GROUP_RECALL", "NOTICE_GROUP_INCREASE", 
+                      "NOTICE_GROUP_DECREASE", "NOTICE_GROUP_ADMIN", "NOTICE_GROUP_BAN",
+                      "NOTICE_GROUP_UPLOAD", "NOTICE_GROUP_CARD", "NOTICE_ESSENCE",
+                      "NOTICE_GROUP_MSG_EMOJI_LIKE", "NOTICE_GROUP_NAME", "NOTICE_GROUP_TITLE"]:
+        if parsedEvent.groupId:
+            return "GROUP_EVENTS", parsedEvent.groupId
+    
+    elif eventType == "NOTICE_POKE":
+        # POKE can be in group or private
+        if parsedEvent.groupId:
+            return "GROUP_EVENTS", parsedEvent.groupId
+        elif parsedEvent.userId:
+            return "FRIEND_EVENTS", parsedEvent.userId
+    
+    # Default: OTHER_EVENTS
+    return "OTHER_EVENTS", eventType
+
+def Historian(parsedEvent: ParsedEvent) -> None:
+    eventType = parsedEvent.eventType
+    
+    # Skip high-frequency useless events
+    if eventType == "NOTICE_INPUT_STATUS":
+        return
+    
+    timestamp = int(time.time())
+    
+    # Store the request body as received instead of serializing the dict again
+    if parsedEvent.serialized:
+        eventData = parsedEvent.serialized.decode("utf-8")
+    else:
+        eventData = json.dumps(parsedEvent.rawEvent, ensure_ascii=False)
+    tableName, routingKey = HistoryRouter(parsedEvent)
+    
+    match tableName:
+        case "FRIEND_EVENTS":
+            insertSql = "INSERT INTO FRIEND_EVENTS (USER_ID, EVENT_TYPE, EVENT_DATA, TIMESTAMP) VALUES (?, ?, ?, ?)"
+            insertParams = (routingKey, eventType, eventData, timestamp)
+        case "GROUP_EVENTS":
+            insertSql = "INSERT INTO GROUP_EVENTS (GROUP_ID, USER_ID, EVENT_TYPE, EVENT_DATA, TIMESTAMP) VALUES (?, ?, ?, ?, ?)"
+            insertParams = (routingKey, parsedEvent.userId, eventType, eventData, timestamp)
+        case _:
+            insertSql = "INSERT INTO OTHER_EVENTS (EVENT_TYPE, EVENT_DATA, TIMESTAMP) VALUES (?, ?, ?)"
+            insertParams = (eventType, eventData, timestamp)
+    
+    # The writer thread persists it, Librarian reads it from the overlay until then
+    WriterEnqueuer(tableName, insertSql, insertParams, str(routingKey), eventData)
+
+def WriterEnqueuer(tableName: str, sql: str, params: tuple, overlayKey: Optional[str] = None, overlayData: Optional[str] = None,
+                   onCommit: Optional[Callable[[bool], None]] = None) -> None:
+    with HISTORIAN_CONDITION:
+        HISTORIAN_PENDING.append({
+            "table": tableName,
+            "key": overlayKey,
+            "data": overlayData,
+            "sql": sql,
+            "params": params,
+            "onCommit": onCommit,
+            "queuedAt": time.time()
+        })
+        if len(HISTORIAN_PENDING) == 1 or len(HISTORIAN_PENDING) >= CONFIG['HISTORIAN']['batch_max_rows']:
+            HISTORIAN_CONDITION.notify_all()
+
+# Rows in one transaction, each behind a savepoint, so a row the database rejects is dropped on its own
+def HistorianRowWriter(databaseConnect: sqlite3.Connection, batch_: List[Dict]) -> List[bool]:
+    committed_ = []
+    with databaseConnect:
+        databaseConnect.execute("BEGIN")
+        for entry in batch_:
+            databaseConnect.execute("SAVEPOINT historian_row")
+            try:
+                databaseConnect.execute(entry["sql"], entry["params"])
+                committed_.append(True)
+            except sqlite3.OperationalError:
+                raise
+            except sqlite3.Error as e:
+                databaseConnect.execute("ROLLBACK TO historian_row")
+                logging.error(f"Historian dropping a row for {entry['table']}: {e}")
+                committed_.append(False)
+            databaseConnect.execute("RELEASE historian_row")
+    return committed_
+
+def HistorianWriter() -> None:
+    dbPath = CONFIG['PATHS']['database_file']
+    maxRows = CONFIG['HISTORIAN']['batch_max_rows']
+    batchInterval = CONFIG['HISTORIAN']['batch_interval_ms'] / 1000
+    maxRetries = 3
+    databaseConnect = None
+    
+    while True:
+        with HISTORIAN_CONDITION:
+            while not HISTORIAN_PENDING:
+                HISTORIAN_CONDITION.wait()
+            
+            # Group commit: gather rows until the batch is full or the oldest row has waited long enough
+            deadline = HISTORIAN_PENDING[0]["queuedAt"] + batchInterval
+            while len(HISTORIAN_PENDING) < maxRows and not HISTORIAN_FLUSHING:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                HISTORIAN_CONDITION.wait(remaining)
+            
+            batch_ = HISTORIAN_PENDING[:maxRows]
+        
+        # Batch runs of the same statement, keeping writes in their original order
+        statements_ = []
+        for entry in batch_:
+            if statements_ and statements_[-1][0] == entry["sql"]:
+                statements_[-1][1].append(entry["params"])
+            else:
+                statements_.append((entry["sql"], [entry["params"]]))
+        
+        committed_ = [False] * len(batch_)
+        isolateRows = False
+        attempt = 0
+        while attempt < maxRetries:
+            try:
+                if databaseConnect is None:
+                    databaseConnect = sqlite3.connect(dbPath, timeout=10.0)
+                    databaseConnect.execute(f"PRAGMA synchronous={CONFIG['HISTORIAN']['synchronous']}")
+                
+                writeStart = time.perf_counter()
+                if isolateRows:
+                    committed_ = HistorianRowWriter(databaseConnect, batch_)
+                else:
+                    with databaseConnect:
+                        for statementSql, statementParams_ in statements_:
+                            databaseConnect.executemany(statementSql, statementParams_)
+                    committed_ = [True] * len(batch_)
+                MetricsObserver("historian_write", time.perf_counter() - writeStart)
+                break
+                
+            except sqlite3.OperationalError as e:
+                attempt += 1
+                logging.warning(f"Historian attempt {attempt}/{maxRetries} failed for {len(batch_)} rows: {e}")
+                if attempt < maxRetries:
+                    time.sleep(1)
+                else:
+                    logging.error(f"Historian failed after {maxRetries} attempts, dropping {len(batch_)} rows: {e}")
+                    
+            except Exception as e:
+                # A row the database rejects rolls back the whole batch, so write it again row by row without that row
+                if isinstance(e, sqlite3.Error) and not isolateRows:
+                    logging.warning(f"Historian batch of {len(batch_)} rows failed, retrying row by row: {e}")
+                    isolateRows = True
+                    continue
+                
+                logging.error(f"Historian database error, dropping {len(batch_)} rows: {e}")
+                try:
+                    databaseConnect.close()
+                except Exception:
+                    pass
+                databaseConnect = None
+                break
+        
+        # Only the writer removes entries, so the batch is still at the head
+        with HISTORIAN_CONDITION:
+            del HISTORIAN_PENDING[:len(batch_)]
+            HISTORIAN_CONDITION.notify_all()
+        
+        # Tell each writer whether its row reached the database
+        for entry, committed in zip(batch_, committed_):
+            if entry["onCommit"] is not None:
+                try:
+                    entry["onCommit"](committed)
+                except Exception as e:
+                    logging.error(f"Historian commit callback failed: {e}")
+
+def HistorianStarter() -> None:
+    thread = threading.Thread(target=HistorianWriter, name="askr-historian", daemon=True)
+    thread.start()
+    
+    # Give buffered events a chance to reach the database on a normal exit
+    atexit.register(HistorianFlusher)
+    
+    logging.info(f"Started history writer (batch {CONFIG['HISTORIAN']['batch_max_rows']} rows / "
+                 f"{CONFIG['HISTORIAN']['batch_interval_ms']}ms, synchronous={CONFIG['HISTORIAN']['synchronous']})")
+
+def HistorianFlusher(timeout: float = 5.0) -> bool:
+    global HISTORIAN_FLUSHING
+    deadline = time.time() + timeout
+    
+    with HISTORIAN_CONDITION:
+        # Counted so that concurrent flushes do not cancel each other
+        HISTORIAN_FLUSHING += 1
+        HISTORIAN_CONDITION.notify_all()
+        try:
+            while HISTORIAN_PENDING:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    logging.warning(f"Historian flush timed out with {len(HISTORIAN_PENDING)} events pending")
+                    return False
+                HISTORIAN_CONDITION.wait(remaining)
+        finally:
+            HISTORIAN_FLUSHING -= 1
+    
+    return True
+
+def HistoryOverlaySnapshot(parsedEvent: ParsedEvent) -> List[tuple[str, str, str]]:
+    with HISTORIAN_CONDITION:
+        if not HISTORIAN_PENDING:
+            return []
+        pending_ = HISTORIAN_PENDING[:]
+    
+    tableName, routingKey = HistoryRouter(parsedEvent)
+    routingKey = str(routingKey)
+    
+    return [(entry["table"], entry["key"], entry["data"]) for entry in pending_
+            if entry["table"] == tableName and entry["key"] == routingKey]
+
+def HistoryOverlayMerger(rows: List[tuple], overlay_: List[tuple[str, str, str]], eventIdentifier: Dict, eventCount: int) -> List[tuple]:
+    identifierKeys = {
+        "private": ("FRIEND_EVENTS", "user_id"),
+        "group": ("GROUP_EVENTS", "group_id"),
+        "other": ("OTHER_EVENTS", "event_type")
+    }
+    
+    tableName, keyField = identifierKeys.get(eventIdentifier.get("type"), (None, None))
+    if not tableName:
+        return rows
+    routingKey = str(eventIdentifier.get(keyField))
+    
+    overlayData_ = [eventData for entryTable, entryKey, eventData in overlay_
+                    if entryTable == tableName and entryKey == routingKey]
+    if not overlayData_:
+        return rows
+    
+    # An event flushed after the overlay was taken shows up in both, keep one copy
+    overlaySet = set(overlayData_)
+    merged_ = [(eventData,) for eventData in reversed(overlayData_)]
+    merged_.extend(row for row in rows if row[0] not in overlaySet)
+    
+    # Newest first, like the database rows
+    return merged_[:eventCount] if eventCount else merged_
+
+def ConfigCacheLoader() -> None:
+    dbPath = CONFIG['PATHS']['database_file']
+    
+    try:
+        databaseConnect = sqlite3.connect(dbPath, timeout=5.0)
+        rows = databaseConnect.execute("SELECT PLUGIN_NAME, CONFIG_DATA, VERSION FROM PLUGIN_CONFIGS").fetchall()
+        databaseConnect.close()
+    except Exception as e:
+        logging.error(f"Failed to load plugin configs: {e}")
+        return
+    
+    with PLUGIN_CONFIG_LOCK:
+        for pluginName, configData, version in rows:
+            PLUGIN_CONFIG_CACHE[pluginName] = (version, configData)
+            PLUGIN_CONFIG_COMMITTED[pluginName] = (version, configData)
+    
+    if rows:
+        logging.info(f"Loaded {len(rows)} plugin configs")
+
+def ConfigSnapshotGetter(pluginName: str) -> tuple[int, Optional[str]]:
+    # Version 0 means the plugin has never written a config
+    return PLUGIN_CONFIG_CACHE.get(pluginName, (0, None))
+
+def ConfigReader(pluginName: str) -> Dict:
+    if not pluginName:
+        logging.warning("ConfigReader: empty plugin name")
+        return {}
+    
+    configData = ConfigSnapshotGetter(pluginName)[1]
+    if configData is None:
+        return {}
+    
+    try:
+        return json.loads(configData)
+    except json.JSONDecodeError as e:
+        logging.error(f"ConfigReader: Invalid JSON for plugin {pluginName}: {e}")
+        return {}
+
+def ConfigCommitter(pluginName: str, configData: str, expectedVersion: Optional[int] = None,
+                    onCommit: Optional[Callable[[Optional[int]], None]] = None) -> Optional[int]:
+    # Held across the enqueue so versions reach the writer thread in order
+    with PLUGIN_CONFIG_LOCK:
+        currentVersion = ConfigSnapshotGetter(pluginName)[0]
+        if expectedVersion is not None and expectedVersion != currentVersion:
+            logging.warning(f"ConfigWriter: rejected stale write for plugin {pluginName} "
+                            f"(based on version {expectedVersion}, current version {currentVersion})")
+            return None
+        
+        newVersion = currentVersion + 1
+        timestamp = int(time.time())
+        
+        # The cache is authoritative at once, the writer thread persists it in its next batch
+        PLUGIN_CONFIG_CACHE[pluginName] = (newVersion, configData)
+        
+        # A dropped write is taken back out of the cache unless a later write, which carries the whole config, replaced it;
+        # the saved config comes back under a new version, so writes based on the dropped one are still rejected
+        def versionReporter(committed: bool) -> None:
+            with PLUGIN_CONFIG_LOCK:
+                if committed:
+                    if newVersion > PLUGIN_CONFIG_COMMITTED.get(pluginName, (0, None))[0]:
+                        PLUGIN_CONFIG_COMMITTED[pluginName] = (newVersion, configData)
+                elif PLUGIN_CONFIG_CACHE[pluginName][0] == newVersion:
+                    logging.error(f"ConfigWriter: version {newVersion} of plugin {pluginName} was not saved, reverting to the saved config")
+                    PLUGIN_CONFIG_CACHE[pluginName] = (newVersion + 1, PLUGIN_CONFIG_COMMITTED.get(pluginName, (0, None))[1])
+            if onCommit is not None:
+                onCommit(newVersion if committed else None)
+        
+        # UPSERT: preserve created_at, update updated_at
+        WriterEnqueuer("PLUGIN_CONFIGS",
+                       "INSERT INTO PLUGIN_CONFIGS (PLUGIN_NAME, CONFIG_DATA, CREATED_AT, UPDATED_AT, VERSION) VALUES (?, ?, ?, ?, ?) "
+                       "ON CONFLICT(PLUGIN_NAME) DO UPDATE SET CONFIG_DATA = excluded.CONFIG_DATA, "
+                       "UPDATED_AT = excluded.UPDATED_AT, VERSION = excluded.VERSION",
+                       (pluginName, configData, timestamp, timestamp, newVersion),
+                       onCommit=versionReporter)
+        
+        return newVersion
+
+def ConfigWriter(pluginName: str, config: Dict, expectedVersion: Optional[int] = None) -> Optional[int]:
+    if not pluginName:
+        logging.error("ConfigWriter: empty plugin name")
+        return None
+        
+    if not isinstance(config, dict):
+        logging.error(f"ConfigWriter: config must be a dict, got {type(config)} for plugin {pluginName}")
+        return None
+    
+    try:
+        configData = json.dumps(config, ensure_ascii=False)
+    except (TypeError, ValueError) as e:
+        logging.error(f"ConfigWriter: Failed to serialize config for plugin {pluginName}: {e}")
+        return None
+    
+    return ConfigCommitter(pluginName, configData, expectedVersion)
+
+def KvStoreLoader() -> None:
+    dbPath = CONFIG['PATHS']['database_file']
+    now = time.time()
     
-    # Skip high-frequency useless events
-    if eventType == "NOTICE_INPUT_STATUS":
+    try:
+        databaseConnect = sqlite3.connect(dbPath, timeout=5.0)
+        with databaseConnect:
+            databaseConnect.execute("DELETE FROM PLUGIN_KV WHERE EXPIRES_AT IS NOT NULL AND EXPIRES_AT <= ?", (now,))
+        rows = databaseConnect.execute("SELECT PLUGIN_NAME, KEY, VALUE, EXPIRES_AT FROM PLUGIN_KV").fetchall()
+        databaseConnect.close()
+    except Exception as e:
+        logging.error(f"Failed to load plugin key-value store: {e}")
         return
     
-    timestamp = int(time.time())
-    eventData = json.dumps(rawEvent, ensure_ascii=False)
+    with PLUGIN_KV_LOCK:
+        for pluginName, key, valueData, expiresAt in rows:
+            PLUGIN_KV_STORE.setdefault(pluginName, {})[key] = (valueData, expiresAt)
     
-    tableName = None
-    insertSql = None
-    insertParams = None
+    if rows:
+        logging.info(f"Loaded {len(rows)} plugin key-value entries")
+
+def KvKeyValidator(pluginName: str, key: Any) -> bool:
+    if not isinstance(key, str) or not key or len(key) > CONFIG['PLUGIN_KV']['max_key_length']:
+        logging.error(f"Plugin {pluginName} KvStore key must be a non-empty string of at most "
+                      f"{CONFIG['PLUGIN_KV']['max_key_length']} characters, got {key!r}")
+        return False
+    return True
+
+def KvExpiryParser(pluginName: str, ttlSeconds: Any) -> tuple[bool, Optional[float]]:
+    if ttlSeconds is None:
+        return True, None
+    if isinstance(ttlSeconds, bool) or not isinstance(ttlSeconds, (int, float)) or ttlSeconds <= 0:
+        logging.error(f"Plugin {pluginName} KvStore ttlSeconds must be a positive number, got {ttlSeconds!r}")
+        return False, None
+    return True, time.time() + ttlSeconds
+
+# Callers hold PLUGIN_KV_LOCK, so rows reach the writer thread in the order they were applied
+def KvEntryGetter(pluginName: str, key: str) -> Optional[tuple[str, Optional[float]]]:
+    global PLUGIN_KV_SWEPT_AT
+    now = time.time()
     
-    # Classify events into appropriate tables
-    if eventType in ["MESSAGE_PRIVATE", "NOTICE_FRIEND_RECALL", "NOTICE_FRIEND_ADD", "NOTICE_PROFILE_LIKE"]:
-        userId = rawEvent.get("user_id")
-        if userId:
-            tableName = "FRIEND_EVENTS"
-            insertSql = "INSERT INTO FRIEND_EVENTS (USER_ID, EVENT_TYPE, EVENT_DATA, TIMESTAMP) VALUES (?, ?, ?, ?)"
-            insertParams = (userId, eventType, eventData, timestamp)
+    # Drop every expired key now and then, so keys nobody reads again do not pile up
+    if now - PLUGIN_KV_SWEPT_AT >= CONFIG['PLUGIN_KV']['sweep_interval_seconds']:
+        PLUGIN_KV_SWEPT_AT = now
+        for pluginStore in PLUGIN_KV_STORE.values():
+            for expiredKey in [k for k, (v, expiresAt) in pluginStore.items() if expiresAt is not None and expiresAt <= now]:
+                del pluginStore[expiredKey]
+        WriterEnqueuer("PLUGIN_KV", "DELETE FROM PLUGIN_KV WHERE EXPIRES_AT IS NOT NULL AND EXPIRES_AT <= ?", (now,))
     
-    elif eventType in ["MESSAGE_GROUP", "MESSAGE_GROUP_MENTION", "MESSAGE_GROUP_BOT",
-                      "NOTICE_GROUP_RECALL", "NOTICE_GROUP_INCREASE", 
-                      "NOTICE_GROUP_DECREASE", "NOTICE_GROUP_ADMIN", "NOTICE_GROUP_BAN",
-                      "NOTICE_GROUP_UPLOAD", "NOTICE_GROUP_CARD", "NOTICE_ESSENCE",
-                      "NOTICE_GROUP_MSG_EMOJI_LIKE", "NOTICE_GROUP_NAME", "NOTICE_GROUP_TITLE"]:
-        groupId = rawEvent.get("group_id")
-        if groupId:
-            userId = rawEvent.get("user_id")
-            tableName = "GROUP_EVENTS"
-            insertSql = "INSERT INTO GROUP_EVENTS (GROUP_ID, USER_ID, EVENT_TYPE, EVENT_DATA, TIMESTAMP) VALUES (?, ?, ?, ?, ?)"
-            insertParams = (groupId, userId, eventType, eventData, timestamp)
+    pluginStore = PLUGIN_KV_STORE.get(pluginName, {})
+    entry = pluginStore.get(key)
+    if entry is not None and entry[1] is not None and entry[1] <= now:
+        KvEntryRemover(pluginName, key)
+        return None
+    return entry
+
+# The store changes before the row is written; a change the writer thread drops puts back the entry
+# last known to be in the database, unless a later change to the key is still on its way
+def KvEntryApplier(pluginName: str, key: str, entry: Optional[tuple[str, Optional[float]]], sql: str, params: tuple) -> None:
+    pluginStore = PLUGIN_KV_STORE.setdefault(pluginName, {})
+    pending = PLUGIN_KV_PENDING.setdefault((pluginName, key), [0, pluginStore.get(key)])
+    pending[0] += 1
+    if entry is None:
+        pluginStore.pop(key, None)
+    else:
+        pluginStore[key] = entry
     
-    elif eventType == "NOTICE_POKE":
-        # POKE can be in group or private
-        groupId = rawEvent.get("group_id")
-        userId = rawEvent.get("user_id")
-        if groupId:
-            tableName = "GROUP_EVENTS"
-            insertSql = "INSERT INTO GROUP_EVENTS (GROUP_ID, USER_ID, EVENT_TYPE, EVENT_DATA, TIMESTAMP) VALUES (?, ?, ?, ?, ?)"
-            insertParams = (groupId, userId, eventType, eventData, timestamp)
-        elif userId:
-            tableName = "FRIEND_EVENTS"
-            insertSql = "INSERT INTO FRIEND_EVENTS (USER_ID, EVENT_TYPE, EVENT_DATA, TIMESTAMP) VALUES (?, ?, ?, ?)"
-            insertParams = (userId, eventType, eventData, timestamp)
+    def rowReporter(committed: bool) -> None:
+        with PLUGIN_KV_LOCK:
+            pending[0] -= 1
+            if committed:
+                pending[1] = entry
+            if pending[0] > 0:
+                return
+            del PLUGIN_KV_PENDING[(pluginName, key)]
+            if not committed:
+                logging.error(f"Plugin {pluginName} KvStore change to '{key}' was not saved, reverting to the saved value")
+                if pending[1] is None:
+                    PLUGIN_KV_STORE.setdefault(pluginName, {}).pop(key, None)
+                else:
+                    PLUGIN_KV_STORE.setdefault(pluginName, {})[key] = pending[1]
     
-    # Default: OTHER_EVENTS
-    if not tableName:
-        tableName = "OTHER_EVENTS"
-        insertSql = "INSERT INTO OTHER_EVENTS (EVENT_TYPE, EVENT_DATA, TIMESTAMP) VALUES (?, ?, ?)"
-        insertParams = (eventType, eventData, timestamp)
+    WriterEnqueuer("PLUGIN_KV", sql, params, onCommit=rowReporter)
+
+def KvEntryPutter(pluginName: str, key: str, valueData: str, expiresAt: Optional[float]) -> bool:
+    pluginStore = PLUGIN_KV_STORE.setdefault(pluginName, {})
+    maxKeys = CONFIG['PLUGIN_KV']['max_keys_per_plugin']
     
-    dbPath = CONFIG['PATHS']['database_file']
-    maxRetries = 3
+    # Expired keys still count until they are swept, so drop this plugin's before refusing a new key
+    if key not in pluginStore and len(pluginStore) >= maxKeys:
+        now = time.time()
+        for expiredKey in [k for k, (v, expiresAt_) in pluginStore.items() if expiresAt_ is not None and expiresAt_ <= now]:
+            KvEntryRemover(pluginName, expiredKey)
+        if len(pluginStore) >= maxKeys:
+            logging.error(f"Plugin {pluginName} KvStore already holds {len(pluginStore)} keys, cannot add '{key}'")
+            return False
+    
+    KvEntryApplier(pluginName, key, (valueData, expiresAt),
+                   "INSERT INTO PLUGIN_KV (PLUGIN_NAME, KEY, VALUE, EXPIRES_AT, UPDATED_AT) VALUES (?, ?, ?, ?, ?) "
+                   "ON CONFLICT(PLUGIN_NAME, KEY) DO UPDATE SET VALUE = excluded.VALUE, "
+                   "EXPIRES_AT = excluded.EXPIRES_AT, UPDATED_AT = excluded.UPDATED_AT",
+                   (pluginName, key, valueData, expiresAt, int(time.time())))
+    return True
+
+def KvEntryRemover(pluginName: str, key: str) -> None:
+    KvEntryApplier(pluginName, key, None, "DELETE FROM PLUGIN_KV WHERE PLUGIN_NAME = ? AND KEY = ?", (pluginName, key))
+
+def KvReader(pluginName: str, key: str) -> Optional[str]:
+    if not KvKeyValidator(pluginName, key):
+        return None
+    
+    with PLUGIN_KV_LOCK:
+        entry = KvEntryGetter(pluginName, key)
+    return entry[0] if entry is not None else None
+
+def KvWriter(pluginName: str, key: str, valueData: str, ttlSeconds: Optional[float] = None) -> bool:
+    if not KvKeyValidator(pluginName, key):
+        return False
+    
+    if len(valueData.encode('utf-8')) > CONFIG['PLUGIN_KV']['max_value_bytes']:
+        logging.error(f"Plugin {pluginName} KvStore value for '{key}' exceeds {CONFIG['PLUGIN_KV']['max_value_bytes']} bytes")
+        return False
+    
+    validTtl, expiresAt = KvExpiryParser(pluginName, ttlSeconds)
+    if not validTtl:
+        return False
+    
+    with PLUGIN_KV_LOCK:
+        KvEntryGetter(pluginName, key)
+        return KvEntryPutter(pluginName, key, valueData, expiresAt)
+
+def KvDeleter(pluginName: str, key: str) -> bool:
+    if not KvKeyValidator(pluginName, key):
+        return False
+    
+    with PLUGIN_KV_LOCK:
+        if KvEntryGetter(pluginName, key) is None:
+            return False
+        KvEntryRemover(pluginName, key)
+    return True
+
+# A missing key counts from 0, ttlSeconds None keeps the key's current expiry
+def KvIncrementer(pluginName: str, key: str, amount: Union[int, float] = 1,
+                  ttlSeconds: Optional[float] = None) -> Optional[Union[int, float]]:
+    if not KvKeyValidator(pluginName, key):
+        return None
+    
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+        logging.error(f"Plugin {pluginName} KvIncrement amount must be a number, got {amount!r}")
+        return None
+    
+    validTtl, expiresAt = KvExpiryParser(pluginName, ttlSeconds)
+    if not validTtl:
+        return None
+    
+    with PLUGIN_KV_LOCK:
+        entry = KvEntryGetter(pluginName, key)
+        currentValue = 0
+        if entry is not None:
+            currentValue = json.loads(entry[0])
+            if isinstance(currentValue, bool) or not isinstance(currentValue, (int, float)):
+                logging.error(f"Plugin {pluginName} KvIncrement on '{key}' which holds a non-number value")
+                return None
+            if ttlSeconds is None:
+                expiresAt = entry[1]
+        
+        newValue = currentValue + amount
+        if not KvEntryPutter(pluginName, key, json.dumps(newValue), expiresAt):
+            return None
+    return newValue
+
+def KvSwapper(pluginName: str, key: str, expectedData: Optional[str], valueData: str,
+              ttlSeconds: Optional[float] = None) -> bool:
+    if not KvKeyValidator(pluginName, key):
+        return False
     
-    for attempt in range(maxRetries):
+    if len(valueData.encode('utf-8')) > CONFIG['PLUGIN_KV']['max_value_bytes']:
+        logging.error(f"Plugin {pluginName} KvStore value for '{key}' exceeds {CONFIG['PLUGIN_KV']['max_value_bytes']} bytes")
+        return False
+    
+    validTtl, expiresAt = KvExpiryParser(pluginName, ttlSeconds)
+    if not validTtl:
+        return False
+    
+    with PLUGIN_KV_LOCK:
+        entry = KvEntryGetter(pluginName, key)
+        
+        # Compared as decoded values so key order inside objects does not matter
+        if expectedData is None:
+            if entry is not None:
+                return False
+        elif entry is None or json.loads(entry[0]) != json.loads(expectedData):
+            return False
+        
+        return KvEntryPutter(pluginName, key, valueData, expiresAt)
+
+def KvScanner(pluginName: str, prefix: str = "", limit: Optional[int] = None) -> List[tuple[str, str]]:
+    if not isinstance(prefix, str):
+        logging.error(f"Plugin {pluginName} KvScan prefix must be a string, got {prefix!r}")
+        return []
+    
+    maxResults = CONFIG['PLUGIN_KV']['max_scan_results']
+    limit = min(limit, maxResults) if isinstance(limit, int) and limit > 0 else maxResults
+    now = time.time()
+    
+    with PLUGIN_KV_LOCK:
+        pluginStore = PLUGIN_KV_STORE.get(pluginName, {})
+        matchedKeys_ = sorted(key for key, (valueData, expiresAt) in pluginStore.items()
+                              if key.startswith(prefix) and (expiresAt is None or expiresAt > now))
+        return [(key, pluginStore[key][0]) for key in matchedKeys_[:limit]]
+
+def SharedStateCreator() -> None:
+    global SHARED_STATE_HANDLE, SHARED_STATE_MEMORY
+    slots = CONFIG['SHARED_STATE']['slots']
+    slotSize = SHARED_STATE_KEY_OFFSET + CONFIG['SHARED_STATE']['max_key_bytes']
+    
+    try:
+        memory = multiprocessing.shared_memory.SharedMemory(create=True, size=SHARED_STATE_HEADER.size + slots * slotSize)
+    except Exception as e:
+        logging.error(f"Failed to create shared state memory: {e}")
+        return
+    
+    # flock() on this file is the cross-process lock, the kernel drops it when its holder dies
+    try:
+        lockFd, lockPath = tempfile.mkstemp(prefix=f"askr-{memory.name.lstrip('/')}-", suffix=".lock")
+        os.close(lockFd)
+    except Exception as e:
+        logging.error(f"Failed to create shared state lock file: {e}")
+        memory.close()
+        memory.unlink()
+        return
+    
+    # New shared memory is zero filled, which is an empty table
+    SHARED_STATE_MEMORY = memory
+    SHARED_STATE_HANDLE = (memory.name, lockPath, slots, slotSize)
+    atexit.register(SharedStateCloser)
+    
+    logging.info(f"Created shared state table with {slots} slots ({memory.size // 1024} KB)")
+
+def SharedStateAttacher(sharedStateHandle: Optional[tuple]) -> None:
+    global SHARED_STATE_HANDLE, SHARED_STATE_MEMORY
+    if sharedStateHandle is None:
+        return
+    
+    # Forked workers inherit the parent's mapping
+    if SHARED_STATE_MEMORY is None or SHARED_STATE_MEMORY.name != sharedStateHandle[0]:
         try:
-            databaseConnect = sqlite3.connect(dbPath, timeout=10.0)
-            databaseConnect.execute(insertSql, insertParams)
-            databaseConnect.commit()
-            databaseConnect.close()
-            return
-            
-        except sqlite3.OperationalError as e:
-            logging.warning(f"Historian attempt {attempt + 1}/{maxRetries} failed for {tableName}: {e}")
-            if attempt < maxRetries - 1:
-                time.sleep(1)
-            else:
-                logging.error(f"Historian failed after {maxRetries} attempts for {tableName}: {e}")
-                
+            SHARED_STATE_MEMORY = multiprocessing.shared_memory.SharedMemory(name=sharedStateHandle[0])
         except Exception as e:
-            logging.error(f"Historian database error for {tableName}: {e}")
+            logging.error(f"Failed to attach shared state memory: {e}")
             return
+    SHARED_STATE_HANDLE = sharedStateHandle
 
-def ConfigReader(pluginName: str) -> Dict:
-    dbPath = CONFIG['PATHS']['database_file']
+def SharedStateCloser() -> None:
+    global SHARED_STATE_HANDLE, SHARED_STATE_MEMORY
+    if SHARED_STATE_MEMORY is None:
+        return
     
     try:
-        if not pluginName:
-            logging.warning("ConfigReader: empty plugin name")
-            return {}
-            
-        databaseConnect = sqlite3.connect(dbPath, timeout=5.0)
-        cursor = databaseConnect.cursor()
-        
-        cursor.execute("""
-            SELECT CONFIG_DATA FROM PLUGIN_CONFIGS 
-            WHERE PLUGIN_NAME = ?
-        """, (pluginName,))
+        SHARED_STATE_MEMORY.close()
+        SHARED_STATE_MEMORY.unlink()
+        os.unlink(SHARED_STATE_HANDLE[1])
+    except Exception as e:
+        logging.warning(f"Failed to release shared state memory: {e}")
+    SHARED_STATE_MEMORY = None
+    SHARED_STATE_HANDLE = None
+
+def SharedStateKeyEncoder(namespace: str, key: Any) -> Optional[tuple[bytes, int]]:
+    if SHARED_STATE_MEMORY is None:
+        logging.error("SharedState is not available in this process")
+        return None
+    
+    if not isinstance(key, str) or not key:
+        logging.error(f"Plugin {namespace} SharedState key must be a non-empty string, got {key!r}")
+        return None
+    
+    keyData = f"{namespace}\x00{key}".encode('utf-8')
+    if len(keyData) > SHARED_STATE_HANDLE[3] - SHARED_STATE_KEY_OFFSET:
+        logging.error(f"Plugin {namespace} SharedState key '{key}' exceeds "
+                      f"{SHARED_STATE_HANDLE[3] - SHARED_STATE_KEY_OFFSET} bytes together with the plugin name")
+        return None
+    
+    # Python's hash() differs between processes, the table needs the same hash everywhere
+    return keyData, int.from_bytes(hashlib.blake2b(keyData, digest_size=8).digest(), 'little')
+
+def SharedStateLocker() -> bool:
+    global SHARED_STATE_LOCK
+    
+    # flock() belongs to an open file, so every process opens its own instead of using one inherited through fork,
+    # and threads of one process share it and are serialized by the thread lock
+    currentPid = os.getpid()
+    if SHARED_STATE_LOCK is None or SHARED_STATE_LOCK[0] != currentPid:
+        try:
+            SHARED_STATE_LOCK = (currentPid, os.open(SHARED_STATE_HANDLE[1], os.O_RDWR), threading.Lock())
+        except OSError as e:
+            logging.error(f"Failed to open SharedState lock file: {e}")
+            return False
+    
+    # A holder killed inside an operation loses its flock() with its file descriptors, nobody waits on a dead process
+    SHARED_STATE_LOCK[2].acquire()
+    try:
+        fcntl.flock(SHARED_STATE_LOCK[1], fcntl.LOCK_EX)
+    except OSError as e:
+        SHARED_STATE_LOCK[2].release()
+        logging.error(f"Failed to lock SharedState: {e}")
+        return False
+    return True
+
+def SharedStateUnlocker() -> None:
+    fcntl.flock(SHARED_STATE_LOCK[1], fcntl.LOCK_UN)
+    SHARED_STATE_LOCK[2].release()
+
+# The functions below expect the caller to hold the shared state lock
+def SharedStateRemover(buf, offset: int) -> None:
+    buf[offset] = 2
+    live, tombstones = SHARED_STATE_HEADER.unpack_from(buf, 0)
+    SHARED_STATE_HEADER.pack_into(buf, 0, live - 1, tombstones + 1)
+
+def SharedStateFinder(buf, keyData: bytes, keyHash: int, now: float) -> tuple[int, int]:
+    # Offset of the live key and of the first reusable slot on its probe path, -1 when there is none
+    slots, slotSize = SHARED_STATE_HANDLE[2], SHARED_STATE_HANDLE[3]
+    index = keyHash % slots
+    freeOffset = -1
+    
+    for _ in range(slots):
+        offset = SHARED_STATE_HEADER.size + index * slotSize
+        state, kind, keyLength, slotHash = SHARED_STATE_SLOT.unpack_from(buf, offset)
+        if state == 0:
+            return -1, freeOffset if freeOffset >= 0 else offset
         
-        row = cursor.fetchone()
-        databaseConnect.close()
+        if state == 1 and slotHash == keyHash and buf[offset + SHARED_STATE_KEY_OFFSET:offset + SHARED_STATE_KEY_OFFSET + keyLength] == keyData:
+            expiresAt = SHARED_STATE_VALUES_[kind].unpack_from(buf, offset + 16)[1]
+            if not expiresAt or expiresAt > now:
+                return offset, -1
+            SharedStateRemover(buf, offset)
+            return -1, freeOffset if freeOffset >= 0 else offset
         
-        if row:
-            try:
-                config = json.loads(row[0])
-                return config
-            except json.JSONDecodeError as e:
-                logging.error(f"ConfigReader: Invalid JSON for plugin {pluginName}: {e}")
-                return {}
-        else:
-            return {}
-            
-    except Exception as e:
-        logging.error(f"ConfigReader error for plugin {pluginName}: {e}")
-        return {}
+        if state == 2 and freeOffset < 0:
+            freeOffset = offset
+        index = (index + 1) % slots
+    
+    return -1, freeOffset
 
-def ConfigWriter(pluginName: str, config: Dict) -> None:
-    dbPath = CONFIG['PATHS']['database_file']
+def SharedStateCompactor(buf, now: float) -> None:
+    slots, slotSize = SHARED_STATE_HANDLE[2], SHARED_STATE_HANDLE[3]
+    tableStart = SHARED_STATE_HEADER.size
     
-    if not pluginName:
-        logging.error("ConfigWriter: empty plugin name")
+    # Drop tombstones and expired keys, then reinsert the rest so probe paths are short again
+    entries_ = []
+    for index in range(slots):
+        offset = tableStart + index * slotSize
+        state, kind, keyLength, slotHash = SHARED_STATE_SLOT.unpack_from(buf, offset)
+        if state == 1:
+            expiresAt = SHARED_STATE_VALUES_[kind].unpack_from(buf, offset + 16)[1]
+            if not expiresAt or expiresAt > now:
+                entries_.append((slotHash, bytes(buf[offset:offset + slotSize])))
+    
+    table = bytearray(slots * slotSize)
+    for slotHash, slotData in entries_:
+        index = slotHash % slots
+        while table[index * slotSize] != 0:
+            index = (index + 1) % slots
+        table[index * slotSize:(index + 1) * slotSize] = slotData
+    
+    # The counts come from the slots, which also corrects a header left behind by a worker killed mid-operation
+    buf[tableStart:tableStart + slots * slotSize] = table
+    SHARED_STATE_HEADER.pack_into(buf, 0, len(entries_), 0)
+    logging.info(f"SharedState compacted, {len(entries_)} live keys")
+
+# Past max_load there is no room until the parent compacts, see SharedStateCompactionRunner
+def SharedStateSlotClaimer(buf, freeOffset: int) -> int:
+    live, tombstones = SHARED_STATE_HEADER.unpack_from(buf, 0)
+    
+    # Reusing a tombstone never lengthens a probe path
+    if freeOffset >= 0 and buf[freeOffset] == 2:
+        SHARED_STATE_HEADER.pack_into(buf, 0, live + 1, tombstones - 1)
+        return freeOffset
+    
+    if freeOffset < 0 or live + tombstones + 1 > SHARED_STATE_HANDLE[2] * CONFIG['SHARED_STATE']['max_load']:
+        return -1
+    
+    SHARED_STATE_HEADER.pack_into(buf, 0, live + 1, tombstones)
+    return freeOffset
+
+# Only the parent compacts: the copy back is not atomic, and a worker killed halfway through it
+# for exceeding its CPU or wall time would leave a torn table behind
+def SharedStateCompactionRunner() -> None:
+    global SHARED_STATE_COMPACTED_AT
+    if SHARED_STATE_MEMORY is None or not SharedStateLocker():
         return
+    
+    try:
+        buf = SHARED_STATE_MEMORY.buf
+        now = time.time()
         
-    if not isinstance(config, dict):
-        logging.error(f"ConfigWriter: config must be a dict, got {type(config)} for plugin {pluginName}")
-        return
+        # Without tombstones only keys expired since the last pass can be dropped, so a full table is not rescanned on every add
+        if SHARED_STATE_HEADER.unpack_from(buf, 0)[1] == 0 and now - SHARED_STATE_COMPACTED_AT < 1.0:
+            return
+        SharedStateCompactor(buf, now)
+        SHARED_STATE_COMPACTED_AT = now
+    finally:
+        SharedStateUnlocker()
+
+def SharedStateCompactionRequester() -> None:
+    if WORKER_TASK_PIPE is None:
+        SharedStateCompactionRunner()
+    else:
+        ParentRequester("shared_state_compact", ())
+
+def SharedStateReader(namespace: str, key: str, default: Any = None) -> Any:
+    encodedKey = SharedStateKeyEncoder(namespace, key)
+    if encodedKey is None or not SharedStateLocker():
+        return default
     
     try:
-        configData = json.dumps(config, ensure_ascii=False)
-        timestamp = int(time.time())
+        buf = SHARED_STATE_MEMORY.buf
+        offset = SharedStateFinder(buf, *encodedKey, time.time())[0]
+        if offset < 0:
+            return default
+        return SHARED_STATE_VALUES_[buf[offset + 1]].unpack_from(buf, offset + 16)[0]
+    finally:
+        SharedStateUnlocker()
+
+# ttlSeconds only applies when this call creates the key, so repeated adds count within one window
+def SharedStateAdder(namespace: str, key: str, amount: Union[int, float] = 1,
+                     ttlSeconds: Optional[float] = None) -> Optional[Union[int, float]]:
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+        logging.error(f"Plugin {namespace} SharedState amount must be a number, got {amount!r}")
+        return None
+    
+    if ttlSeconds is not None and (isinstance(ttlSeconds, bool) or not isinstance(ttlSeconds, (int, float)) or ttlSeconds <= 0):
+        logging.error(f"Plugin {namespace} SharedState ttlSeconds must be a positive number, got {ttlSeconds!r}")
+        return None
+    
+    encodedKey = SharedStateKeyEncoder(namespace, key)
+    if encodedKey is None:
+        return None
+    
+    # A new key that finds no room is tried once more after the parent compacted the table
+    for attempt in range(2):
+        # Released before asking, the parent takes the lock to compact
+        if attempt > 0:
+            SharedStateCompactionRequester()
+        if not SharedStateLocker():
+            return None
         
-        maxRetries = 3
-        for attempt in range(maxRetries):
-            try:
-                databaseConnect = sqlite3.connect(dbPath, timeout=10.0)
-                
-                # UPSERT: preserve created_at, update updated_at
-                databaseConnect.execute("""
-                    INSERT OR REPLACE INTO PLUGIN_CONFIGS 
-                    (PLUGIN_NAME, CONFIG_DATA, CREATED_AT, UPDATED_AT) 
-                    VALUES (
-                        ?, 
-                        ?, 
-                        COALESCE((SELECT CREATED_AT FROM PLUGIN_CONFIGS WHERE PLUGIN_NAME = ?), ?),
-                        ?
-                    )
-                """, (pluginName, configData, pluginName, timestamp, timestamp))
-                
-                databaseConnect.commit()
-                databaseConnect.close()
-                return
-                
-            except sqlite3.OperationalError as e:
-                logging.warning(f"ConfigWriter attempt {attempt + 1}/{maxRetries} failed for plugin {pluginName}: {e}")
-                if attempt < maxRetries - 1:
-                    time.sleep(1)
-                else:
-                    logging.error(f"ConfigWriter failed after {maxRetries} attempts for plugin {pluginName}: {e}")
-                    
-            except Exception as e:
-                logging.error(f"ConfigWriter database error for plugin {pluginName}: {e}")
-                return
-                
-    except (TypeError, ValueError) as e:
-        logging.error(f"ConfigWriter: Failed to serialize config for plugin {pluginName}: {e}")
+        try:
+            buf = SHARED_STATE_MEMORY.buf
+            keyData, keyHash = encodedKey
+            now = time.time()
+            offset, freeOffset = SharedStateFinder(buf, keyData, keyHash, now)
+            
+            if offset >= 0:
+                currentValue, expiresAt = SHARED_STATE_VALUES_[buf[offset + 1]].unpack_from(buf, offset + 16)
+                newValue = currentValue + amount
+            else:
+                offset = SharedStateSlotClaimer(buf, freeOffset)
+                if offset < 0:
+                    continue
+                newValue = amount
+                expiresAt = now + ttlSeconds if ttlSeconds is not None else 0.0
+                buf[offset + SHARED_STATE_KEY_OFFSET:offset + SHARED_STATE_KEY_OFFSET + len(keyData)] = keyData
+            
+            # Integers beyond 64 bits continue as floats
+            kind = 0 if isinstance(newValue, int) and -2 ** 63 <= newValue < 2 ** 63 else 1
+            SHARED_STATE_VALUES_[kind].pack_into(buf, offset + 16, newValue, expiresAt)
+            SHARED_STATE_SLOT.pack_into(buf, offset, 1, kind, len(keyData), keyHash)
+            return newValue if kind == 0 else float(newValue)
+        finally:
+            SharedStateUnlocker()
+    
+    logging.error(f"SharedState is full, plugin {namespace} could not add '{key}'")
+    return None
+
+# None makes the key permanent, zero or less removes it now
+def SharedStateExpirer(namespace: str, key: str, ttlSeconds: Optional[float]) -> bool:
+    if ttlSeconds is not None and (isinstance(ttlSeconds, bool) or not isinstance(ttlSeconds, (int, float))):
+        logging.error(f"Plugin {namespace} SharedState ttlSeconds must be a number or None, got {ttlSeconds!r}")
+        return False
+    
+    encodedKey = SharedStateKeyEncoder(namespace, key)
+    if encodedKey is None or not SharedStateLocker():
+        return False
+    
+    try:
+        buf = SHARED_STATE_MEMORY.buf
+        now = time.time()
+        offset = SharedStateFinder(buf, *encodedKey, now)[0]
+        if offset < 0:
+            return False
+        
+        if ttlSeconds is not None and ttlSeconds <= 0:
+            SharedStateRemover(buf, offset)
+            return True
+        
+        values = SHARED_STATE_VALUES_[buf[offset + 1]]
+        values.pack_into(buf, offset + 16, values.unpack_from(buf, offset + 16)[0], now + ttlSeconds if ttlSeconds is not None else 0.0)
+        return True
+    finally:
+        SharedStateUnlocker()
 
 def Librarian(eventIdentifier: Dict, eventCount: int = 50) -> List[Dict]:
     dbPath = CONFIG['PATHS']['database_file']
     databaseConnect = None
     
     try:
+        # Taken before querying, so an event flushed in between is still seen
+        with HISTORIAN_CONDITION:
+            overlay_ = [(entry["table"], entry["key"], entry["data"]) for entry in HISTORIAN_PENDING if entry["data"]]
+        
         databaseConnect = sqlite3.connect(dbPath, timeout=5.0)
         cursor = databaseConnect.cursor()
         
@@ -1371,13 +3957,13 @@ def Librarian(eventIdentifier: Dict, eventCount: int = 50) -> List[Dict]:
                     cursor.execute("""
                         SELECT EVENT_DATA FROM FRIEND_EVENTS 
                         WHERE USER_ID = ? 
-                        ORDER BY TIMESTAMP DESC
+                        ORDER BY TIMESTAMP DESC, ID DESC
                     """, (userId,))
                 else:
                     cursor.execute("""
                         SELECT EVENT_DATA FROM FRIEND_EVENTS 
                         WHERE USER_ID = ? 
-                        ORDER BY TIMESTAMP DESC 
+                        ORDER BY TIMESTAMP DESC, ID DESC 
                         LIMIT ?
                     """, (userId, eventCount))
                 
@@ -1391,13 +3977,13 @@ def Librarian(eventIdentifier: Dict, eventCount: int = 50) -> List[Dict]:
                     cursor.execute("""
                         SELECT EVENT_DATA FROM GROUP_EVENTS 
                         WHERE GROUP_ID = ? 
-                        ORDER BY TIMESTAMP DESC
+                        ORDER BY TIMESTAMP DESC, ID DESC
                     """, (groupId,))
                 else:
                     cursor.execute("""
                         SELECT EVENT_DATA FROM GROUP_EVENTS 
                         WHERE GROUP_ID = ? 
-                        ORDER BY TIMESTAMP DESC 
+                        ORDER BY TIMESTAMP DESC, ID DESC 
                         LIMIT ?
                     """, (groupId, eventCount))
                 
@@ -1411,13 +3997,13 @@ def Librarian(eventIdentifier: Dict, eventCount: int = 50) -> List[Dict]:
                     cursor.execute("""
                         SELECT EVENT_DATA FROM OTHER_EVENTS 
                         WHERE EVENT_TYPE = ? 
-                        ORDER BY TIMESTAMP DESC
+                        ORDER BY TIMESTAMP DESC, ID DESC
                     """, (eventType,))
                 else:
                     cursor.execute("""
                         SELECT EVENT_DATA FROM OTHER_EVENTS 
                         WHERE EVENT_TYPE = ? 
-                        ORDER BY TIMESTAMP DESC 
+                        ORDER BY TIMESTAMP DESC, ID DESC 
                         LIMIT ?
                     """, (eventType, eventCount))
                 
@@ -1425,7 +4011,7 @@ def Librarian(eventIdentifier: Dict, eventCount: int = 50) -> List[Dict]:
                 logging.warning(f"Librarian: unknown identifier type '{identifierType}'")
                 return []
         
-        rows = cursor.fetchall()
+        rows = HistoryOverlayMerger(cursor.fetchall(), overlay_, eventIdentifier, eventCount)
         
         events = []
         for i, row in enumerate(rows):
@@ -1453,39 +4039,320 @@ def Librarian(eventIdentifier: Dict, eventCount: int = 50) -> List[Dict]:
             except Exception:
                 pass
 
-def MainDispatcher(rawEvent: Dict) -> None:
-    eventType = EventTypeParser(rawEvent)
-    
-    if eventType == "UNEXPECTED":
+def MainDispatcher(parsedEvent: ParsedEvent) -> None:
+    if parsedEvent.eventType == "UNEXPECTED":
         return
         
-    simpleEvent = InbondMessageParser(rawEvent)
+    simpleEvent = InbondMessageParser(parsedEvent)
     
-    # Store history synchronously to ensure plugins can read it immediately
-    Historian(rawEvent)
+    # Queue history before plugins start, so Librarian sees it through the overlay
+    Historian(parsedEvent)
     
-    # Collect handlers to trigger (including inherited events)
-    eventTypesToTrigger = [eventType]
-    if eventType in EVENT_INHERITANCE:
-        eventTypesToTrigger.extend(EVENT_INHERITANCE[eventType])
-    
-    # Deduplicate handlers
+    # Deduplicate handlers (including inherited events), skipping those whose TRIGGERS do not match
     all_handlers = []
     processed_handlers = set()
+    textMessage = parsedEvent.textMessage or ""
     
-    for triggerType in eventTypesToTrigger:
+    for triggerType in parsedEvent.triggerTypes:
         handlerList_ = PLUGIN_REGISTRY.get(triggerType, [])
+        matcher = TRIGGER_MATCHERS.get(triggerType)
+        matchedHandlers = TriggerMatcher(matcher, textMessage) if matcher else set()
+        
         for handler in handlerList_:
-            if handler not in processed_handlers:
-                processed_handlers.add(handler)
-                all_handlers.append(handler)
+            if handler in processed_handlers:
+                continue
+            if matcher and handler in matcher["filtered"] and handler not in matchedHandlers:
+                continue
+            processed_handlers.add(handler)
+            if not PluginSwitchChecker(HandlerPluginName(handler), parsedEvent):
+                continue
+            all_handlers.append(handler)
     
-    # Execute all plugins in parallel with immediate response
+    # Execute all plugins in parallel, responses are sent as soon as each plugin finishes
     if all_handlers:
-        def response_callback(result, event):
-            OutbondMessageParser(result, event)
+        PluginCaller(all_handlers, simpleEvent, parsedEvent, OutboundEnqueuer)
+
+def DispatchStarter() -> None:
+    global DISPATCH_QUEUE
+    
+    DISPATCH_QUEUE = queue.Queue(maxsize=CONFIG['DISPATCH']['queue_size'])
+    
+    workerCount = CONFIG['DISPATCH']['worker_count']
+    for i in range(workerCount):
+        thread = threading.Thread(target=DispatchWorker, name=f"askr-dispatch-{i}", daemon=True)
+        thread.start()
+    
+    logging.info(f"Started {workerCount} dispatcher threads (queue size {CONFIG['DISPATCH']['queue_size']}, "
+                 f"policy '{CONFIG['DISPATCH']['backpressure_policy']}')")
+
+def DispatchEnqueuer(parsedEvent: ParsedEvent) -> bool:
+    policy = CONFIG['DISPATCH']['backpressure_policy']
+    
+    try:
+        if policy == 'block':
+            DISPATCH_QUEUE.put(parsedEvent, timeout=CONFIG['DISPATCH']['block_timeout_seconds'])
+        elif policy == 'drop_oldest':
+            # Serialize evict-and-insert so concurrent producers cannot both evict
+            with DISPATCH_LOCK:
+                while True:
+                    try:
+                        DISPATCH_QUEUE.put_nowait(parsedEvent)
+                        break
+                    except queue.Full:
+                        try:
+                            DISPATCH_QUEUE.get_nowait()
+                            DISPATCH_QUEUE.task_done()
+                            DISPATCH_STATS["dropped"] += 1
+                        except queue.Empty:
+                            pass
+        else:
+            DISPATCH_QUEUE.put_nowait(parsedEvent)
+    except queue.Full:
+        with DISPATCH_LOCK:
+            DISPATCH_STATS["rejected"] += 1
+        logging.warning(f"Dispatch queue full ({DISPATCH_QUEUE.maxsize}), rejected event under '{policy}' policy")
+        return False
+    
+    with DISPATCH_LOCK:
+        DISPATCH_STATS["enqueued"] += 1
+        depth = DISPATCH_QUEUE.qsize()
+        if depth > DISPATCH_STATS["max_depth"]:
+            DISPATCH_STATS["max_depth"] = depth
+    
+    return True
+
+def DispatchWorker() -> None:
+    while True:
+        parsedEvent = DISPATCH_QUEUE.get()
+        try:
+            MainDispatcher(parsedEvent)
+        except Exception as e:
+            logging.error(f"Dispatcher failed to process event: {e}")
+        finally:
+            DISPATCH_QUEUE.task_done()
+            with DISPATCH_LOCK:
+                DISPATCH_STATS["dispatched"] += 1
+
+def DispatchQueueStats() -> Dict:
+    with DISPATCH_LOCK:
+        stats = dict(DISPATCH_STATS)
+    
+    stats["depth"] = DISPATCH_QUEUE.qsize() if DISPATCH_QUEUE else 0
+    stats["capacity"] = CONFIG['DISPATCH']['queue_size']
+    return stats
+
+def PluginStatsRecorder(invocation: Dict, exitReason: str, workerStats: Optional[Dict]) -> None:
+    currentTime = time.time()
+    currentHour = int(currentTime // 3600) * 3600
+    if currentHour != PLUGIN_STATS_ROLLED_HOUR:
+        PluginStatsRollup(currentHour)
+    
+    # Terminated workers report nothing, their wall time is measured here
+    if workerStats:
+        wallTime, cpuTime, peakRss = workerStats["wall_time"], workerStats["cpu_time"], workerStats["peak_rss"]
+    else:
+        wallTime, cpuTime, peakRss = currentTime - invocation["startTime"], None, None
+    
+    WriterEnqueuer("PLUGIN_STATS",
+                   "INSERT INTO PLUGIN_STATS (PLUGIN_NAME, EVENT_TYPE, GROUP_ID, WALL_TIME, CPU_TIME, PEAK_RSS, EXIT_REASON, TIMESTAMP) "
+                   "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                   (invocation["pluginName"], invocation["eventType"], invocation["groupId"],
+                    wallTime, cpuTime, peakRss, exitReason, int(currentTime)))
+
+def PluginStatsRollup(currentHour: int) -> None:
+    global PLUGIN_STATS_ROLLED_HOUR
+    statsConfig = CONFIG['PLUGIN_STATS']
+    rawCutoff = currentHour - statsConfig['raw_retention_hours'] * 3600
+    
+    with PLUGIN_STATS_LOCK:
+        if PLUGIN_STATS_ROLLED_HOUR == currentHour:
+            return
+        # After a restart, recompute every hour that still has raw rows
+        rollupFrom = PLUGIN_STATS_ROLLED_HOUR if PLUGIN_STATS_ROLLED_HOUR is not None else rawCutoff
+        PLUGIN_STATS_ROLLED_HOUR = currentHour
         
-        PluginCaller(all_handlers, simpleEvent, rawEvent, response_callback)
+        # Runs on the writer thread in queue order, after every row of the finished hours
+        WriterEnqueuer("PLUGIN_STATS_HOURLY",
+                       "INSERT OR REPLACE INTO PLUGIN_STATS_HOURLY "
+                       "(HOUR, PLUGIN_NAME, EVENT_TYPE, GROUP_ID, INVOCATIONS, FAILURES, WALL_TIME_SUM, WALL_TIME_MAX, "
+                       "CPU_TIME_SUM, CPU_TIME_MAX, PEAK_RSS_MAX) "
+                       "SELECT TIMESTAMP / 3600 * 3600, PLUGIN_NAME, EVENT_TYPE, COALESCE(GROUP_ID, 0), COUNT(*), "
+                       "SUM(EXIT_REASON != 'ok'), SUM(WALL_TIME), MAX(WALL_TIME), "
+                       "COALESCE(SUM(CPU_TIME), 0), COALESCE(MAX(CPU_TIME), 0), COALESCE(MAX(PEAK_RSS), 0) "
+                       "FROM PLUGIN_STATS WHERE TIMESTAMP >= ? AND TIMESTAMP < ? GROUP BY 1, 2, 3, 4",
+                       (rollupFrom, currentHour))
+        WriterEnqueuer("PLUGIN_STATS", "DELETE FROM PLUGIN_STATS WHERE TIMESTAMP < ?", (rawCutoff,))
+        WriterEnqueuer("PLUGIN_STATS_HOURLY", "DELETE FROM PLUGIN_STATS_HOURLY WHERE HOUR < ?",
+                       (currentHour - statsConfig['hourly_retention_days'] * 86400,))
+
+def PluginStatsQuery(dimension: str, hours: int, limit: int = 5) -> List[Dict]:
+    column = PLUGIN_STATS_DIMENSIONS.get(dimension)
+    if column is None:
+        logging.error(f"Unknown plugin stats dimension '{dimension}'. Valid dimensions: {list(PLUGIN_STATS_DIMENSIONS)}")
+        return []
+    
+    # Finished hours come from the rollups, the current hour from raw rows
+    currentHour = int(time.time() // 3600) * 3600
+    PluginStatsRollup(currentHour)
+    HistorianFlusher()
+    
+    dbPath = CONFIG['PATHS']['database_file']
+    try:
+        databaseConnect = sqlite3.connect(dbPath, timeout=5.0)
+        rows = databaseConnect.execute(f"""
+            SELECT {column}, SUM(INVOCATIONS), SUM(FAILURES), SUM(WALL_TIME_SUM), MAX(WALL_TIME_MAX),
+                   SUM(CPU_TIME_SUM), MAX(CPU_TIME_MAX), MAX(PEAK_RSS_MAX)
+            FROM (
+                SELECT PLUGIN_NAME, EVENT_TYPE, GROUP_ID, INVOCATIONS, FAILURES, WALL_TIME_SUM, WALL_TIME_MAX,
+                       CPU_TIME_SUM, CPU_TIME_MAX, PEAK_RSS_MAX
+                FROM PLUGIN_STATS_HOURLY WHERE HOUR >= ? AND HOUR < ?
+                UNION ALL
+                SELECT PLUGIN_NAME, EVENT_TYPE, COALESCE(GROUP_ID, 0), 1, EXIT_REASON != 'ok', WALL_TIME, WALL_TIME,
+                       COALESCE(CPU_TIME, 0), COALESCE(CPU_TIME, 0), COALESCE(PEAK_RSS, 0)
+                FROM PLUGIN_STATS WHERE TIMESTAMP >= ?
+            )
+            GROUP BY {column}
+            ORDER BY SUM(CPU_TIME_SUM) DESC, SUM(WALL_TIME_SUM) DESC
+            LIMIT ?
+        """, (currentHour - (hours - 1) * 3600, currentHour, currentHour, limit)).fetchall()
+        databaseConnect.close()
+    except Exception as e:
+        logging.error(f"Failed to query plugin stats: {e}")
+        return []
+    
+    return [{
+        "key": key,
+        "invocations": invocations,
+        "failures": failures,
+        "wall_time": wallTime,
+        "max_wall_time": maxWallTime,
+        "cpu_time": cpuTime,
+        "max_cpu_time": maxCpuTime,
+        "peak_rss": peakRss
+    } for key, invocations, failures, wallTime, maxWallTime, cpuTime, maxCpuTime, peakRss in rows]
+
+def PluginStatsReporter(hours: int) -> str:
+    reportLines_ = [f"Plugin stats, last {hours}h, by CPU time"]
+    for dimension in PLUGIN_STATS_DIMENSIONS:
+        reportLines_.append(f"[{dimension}]")
+        stats_ = PluginStatsQuery(dimension, hours)
+        if not stats_:
+            reportLines_.append("  no invocations")
+        for stat in stats_:
+            reportLines_.append(
+                f"  {stat['key'] if stat['key'] != 0 else '-'}: {stat['invocations']} calls, {stat['failures']} failed, "
+                f"cpu {stat['cpu_time']:.1f}s (max {stat['max_cpu_time']:.2f}s), "
+                f"wall avg {stat['wall_time'] / stat['invocations']:.2f}s (max {stat['max_wall_time']:.2f}s), "
+                f"rss {stat['peak_rss'] / (1024 * 1024):.0f}MB"
+            )
+    return "\n".join(reportLines_)
+
+def MetricsObserver(stage: str, seconds: float) -> None:
+    # Recording is a bisect and three increments, all formatting happens at scrape time
+    bucketIndex = bisect.bisect_left(METRICS_BUCKETS_, seconds)
+    histogram = METRICS_HISTOGRAMS[stage]
+    with METRICS_LOCK:
+        histogram[bucketIndex] += 1
+        histogram[-2] += 1
+        histogram[-1] += seconds
+
+def MetricsCounter(name: str, pluginName: str, reason: str = "") -> None:
+    key = (name, pluginName, reason)
+    with METRICS_LOCK:
+        METRICS_COUNTERS[key] = METRICS_COUNTERS.get(key, 0) + 1
+
+def MetricsRenderer() -> str:
+    with METRICS_LOCK:
+        histograms = {stage: histogram[:] for stage, histogram in METRICS_HISTOGRAMS.items()}
+        counters = dict(METRICS_COUNTERS)
+    
+    lines_ = [
+        "# HELP askr_stage_duration_seconds Time spent in each stage between receiving an event and sending the response",
+        "# TYPE askr_stage_duration_seconds histogram"
+    ]
+    for stage, histogram in histograms.items():
+        cumulative = 0
+        for bound, count in zip(METRICS_BUCKETS_, histogram):
+            cumulative += count
+            lines_.append(f'askr_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines_.append(f'askr_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram[-2]}')
+        lines_.append(f'askr_stage_duration_seconds_sum{{stage="{stage}"}} {histogram[-1]}')
+        lines_.append(f'askr_stage_duration_seconds_count{{stage="{stage}"}} {histogram[-2]}')
+    
+    counterHelp = {
+        "plugin_invocations": "Plugin invocations that finished, including terminated ones",
+        "plugin_errors": "Plugin invocations that raised an exception",
+        "plugin_terminations": "Plugin workers terminated during an invocation, by reason",
+        "service_restarts": "SERVICE processes that stopped and were restarted, by reason"
+    }
+    for name, helpText in counterHelp.items():
+        lines_.append(f"# HELP askr_{name}_total {helpText}")
+        lines_.append(f"# TYPE askr_{name}_total counter")
+        for (counterName, pluginName, reason), value in sorted(counters.items()):
+            if counterName != name:
+                continue
+            reasonLabel = f',reason="{reason}"' if reason else ""
+            lines_.append(f'askr_{name}_total{{plugin="{pluginName}"{reasonLabel}}} {value}')
+    
+    dispatchStats = DispatchQueueStats()
+    lines_.append("# HELP askr_dispatch_events_total Events handled by the dispatch queue, by outcome")
+    lines_.append("# TYPE askr_dispatch_events_total counter")
+    for outcome in ("enqueued", "dispatched", "dropped", "rejected"):
+        lines_.append(f'askr_dispatch_events_total{{outcome="{outcome}"}} {dispatchStats[outcome]}')
+    
+    lines_.append("# HELP askr_outbound_dropped_total Replies dropped because their sender queue was full")
+    lines_.append("# TYPE askr_outbound_dropped_total counter")
+    lines_.append(f"askr_outbound_dropped_total {OUTBOUND_DROPPED}")
+    
+    lines_.append("# HELP askr_scheduler_runs_total UNCONDITIONAL job due times, by outcome")
+    lines_.append("# TYPE askr_scheduler_runs_total counter")
+    for jobId, jobStats in SchedulerStats().items():
+        for outcome in ("runs", "skipped", "missed", "failures"):
+            lines_.append(f'askr_scheduler_runs_total{{job="{jobId}",outcome="{outcome}"}} {jobStats[outcome]}')
+    
+    # Gauges are read from live state, nothing is tracked for them between scrapes
+    workerCount = 0
+    busyCount = 0
+    backlogDepth = 0
+    with WORKER_POOLS_LOCK:
+        pools_ = list(WORKER_POOLS.values())
+    for pool in pools_:
+        with pool["lock"]:
+            workerCount += pool["size"]
+            busyCount += pool["size"] - len(pool["idle"])
+            backlogDepth += len(pool["backlog"])
+    
+    with SUPERVISOR_LOCK:
+        supervisorDepth = len(SUPERVISOR_PENDING)
+    with HISTORIAN_CONDITION:
+        historianDepth = len(HISTORIAN_PENDING)
+    with SCHEDULER_LOCK:
+        deferredPending = len(DEFERRED_HEAP_)
+    
+    gauges_ = [
+        ("askr_worker_processes", "Plugin worker processes, idle or busy", workerCount),
+        ("askr_inflight_invocations", "Plugin invocations currently running in a worker", busyCount),
+        ("askr_threads", "Threads in the framework process", threading.active_count()),
+        ("askr_deferred_pending", "Deferred invocations waiting for their due time", deferredPending)
+    ]
+    for metricName, helpText, value in gauges_:
+        lines_.append(f"# HELP {metricName} {helpText}")
+        lines_.append(f"# TYPE {metricName} gauge")
+        lines_.append(f"{metricName} {value}")
+    
+    queueDepths = {
+        "dispatch": dispatchStats["depth"],
+        "supervisor": supervisorDepth,
+        "worker_backlog": backlogDepth,
+        "outbound": sum(senderQueue.qsize() for senderQueue in OUTBOUND_QUEUES_),
+        "historian": historianDepth
+    }
+    lines_.append("# HELP askr_queue_depth Items waiting in each internal queue")
+    lines_.append("# TYPE askr_queue_depth gauge")
+    for queueName, depth in queueDepths.items():
+        lines_.append(f'askr_queue_depth{{queue="{queueName}"}} {depth}')
+    
+    return "\n".join(lines_) + "\n"
 
 def InitializerGuard():
     global INITIALIZED
@@ -1495,7 +4362,11 @@ def InitializerGuard():
     with INIT_LOCK:
         if not INITIALIZED:
             try:
-                multiprocessing.set_start_method(CONFIG['PLUGIN_EXECUTION']['process_creation_method'], force=True)
+                # 'zygote' is a forkserver that has imported the framework and all plugins
+                startMethod = CONFIG['PLUGIN_EXECUTION']['process_creation_method']
+                if startMethod == 'zygote':
+                    startMethod = 'forkserver'
+                multiprocessing.set_start_method(startMethod, force=True)
             except Exception as e:
                 logging.critical(f"Failed to set multiprocessing start method: {e}")
                 sys.exit(1)
@@ -1507,17 +4378,28 @@ NAPCAT_LISTENER = Flask(__name__)
 def NapCatListener() -> str:
     InitializerGuard()  # 懒加载初始化
     
-    rawEvent = request.get_json()
+    # Parse once, every later stage reads the parsed event
+    parseStart = time.perf_counter()
+    parsedEvent = ParsedEvent(request.get_json(), request.get_data())
+    MetricsObserver("ingress_parse", time.perf_counter() - parseStart)
     
-    if AdminDispatcher(rawEvent):
+    if AdminDispatcher(parsedEvent):
         return 'OK'
     
     if IS_MUTED:
         return 'OK'
     
-    MainDispatcher(rawEvent)
+    # Acknowledge immediately, plugins run on the dispatcher threads
+    if not DispatchEnqueuer(parsedEvent):
+        return 'Busy', 503
+    
     return 'OK'
 
+@NAPCAT_LISTENER.route('/metrics', methods=['GET'])
+def MetricsListener():
+    # Never triggers initialization, a scrape before the first event sees empty metrics
+    return MetricsRenderer(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
 
 
 if __name__ == '__main__':
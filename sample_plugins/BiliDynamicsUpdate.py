@@ -21,9 +21,11 @@ from bilibili_api import user, sync, Credential
 
 MANIFEST = {
     "INITIALIZER": "init_bilibili_monitor",
-    "UNCONDITIONAL": ["check_bilibili_dynamics", 2]  # 每2分钟检查一次
+    "SERVICE": "bilibili_dynamics_service"  # 常驻进程，每2分钟检查一次
 }
 
+POLL_INTERVAL_SECONDS = 120
+
 def init_bilibili_monitor(botContext):
     """
     插件初始化：读取外部配置，验证有效性，初始化框架配置
@@ -77,19 +79,21 @@ def init_bilibili_monitor(botContext):
         except Exception as e:
             raise Exception(f"初始化动态状态失败: {str(e)}")
         
-        # 初始化框架配置
+        # 初始化框架配置，只保存不变的设置
         internal_config = {
             "bilibili_credential": external_config["bilibili_credential"],
             "target_groups": external_config["target_groups"],
             "uid": external_config["uid"],
-            "up_name": external_config["up_name"],
-            "known_top": known_top,
-            "last_dynamics": last_dynamics,
-            "consecutive_fail_count": 0
+            "up_name": external_config["up_name"]
         }
         
         botContext["ConfigWriter"](internal_config)
         
+        # 运行状态逐键保存，更新时只写一行
+        botContext["KvSet"]("known_top", known_top)
+        botContext["KvSet"]("last_dynamics", last_dynamics)
+        botContext["KvSet"]("consecutive_fail_count", 0)
+        
         print("B站动态监控插件初始化成功")
         return None
         
@@ -97,40 +101,52 @@ def init_bilibili_monitor(botContext):
         print(f"B站动态监控插件初始化失败: {str(e)}")
         raise e
 
-def check_bilibili_dynamics(rawEvent, botContext):
+def bilibili_dynamics_service(botContext):
     """
-    定时检查B站动态更新
+    常驻服务：复用同一个B站API客户端，定期检查动态更新并推送
+    抛出异常时框架会记录错误并在退避后重启服务
     """
     config = botContext["ConfigReader"]()
-    consecutive_fail_count = config["consecutive_fail_count"]
     
-    # 检查是否已禁用服务
-    if consecutive_fail_count == 3:
-        # 刚好达到3次，通知后进入禁用状态
-        config["consecutive_fail_count"] = 4
-        botContext["ConfigWriter"](config)
-        raise Exception("B站动态播报连续三次异常，已禁用服务")
-    
-    elif consecutive_fail_count > 3:
-        # 已禁用，直接跳过
-        return None
+    # B站API客户端只在服务启动时创建一次
+    cre = Credential(sessdata=config["bilibili_credential"]["sessdata"])
+    u = user.User(uid=config["uid"], credential=cre)
     
-    # 正常执行检查逻辑
-    try:
-        # 初始化B站API客户端
-        cre = Credential(sessdata=config["bilibili_credential"]["sessdata"])
-        u = user.User(uid=config["uid"], credential=cre)
+    while True:
+        config = botContext["ConfigReader"]()
+        consecutive_fail_count = botContext["KvGet"]("consecutive_fail_count", 0)
+        
+        # 检查是否已禁用服务
+        if consecutive_fail_count == 3:
+            # 刚好达到3次，通知后进入禁用状态
+            botContext["KvSet"]("consecutive_fail_count", 4)
+            raise Exception("B站动态播报连续三次异常，已禁用服务")
+        
+        elif consecutive_fail_count > 3:
+            # 已禁用，正常返回后框架不会再重启服务
+            return None
         
+        time.sleep(POLL_INTERVAL_SECONDS)
+        
+        messages = check_bilibili_dynamics(u, config, botContext)
+        if messages:
+            botContext["Emit"](messages)
+
+def check_bilibili_dynamics(u, config, botContext):
+    """
+    检查一次B站动态更新，返回要发送的消息列表
+    """
+    try:
         # 使用sync同步获取最新动态
         dynamics = sync(u.get_dynamics_new())["items"]
         
         if not dynamics:
-            config["consecutive_fail_count"] += 1
-            botContext["ConfigWriter"](config)
+            botContext["KvIncrement"]("consecutive_fail_count")
             raise Exception("获取动态列表为空")
         
         messages = []
-        config_updated = False
+        known_top = botContext["KvGet"]("known_top")
+        last_dynamics = botContext["KvGet"]("last_dynamics")
         up_name = config["up_name"]  # 读取UP主名称
         
         # 检查置顶动态
@@ -140,14 +156,14 @@ def check_bilibili_dynamics(rawEvent, botContext):
         
         else:
             # 检查置顶动态是否更换
-            if dynamics[0]["id_str"] != config["known_top"]:
-                config["known_top"] = dynamics[0]["id_str"]
-                config_updated = True
-                message = f"{up_name}更换了置顶动态！https://t.bilibili.com/{config['known_top']}"
+            if dynamics[0]["id_str"] != known_top:
+                known_top = dynamics[0]["id_str"]
+                botContext["KvSet"]("known_top", known_top)
+                message = f"{up_name}更换了置顶动态！https://t.bilibili.com/{known_top}"
                 messages.extend(create_messages(config["target_groups"], message))
             
             # 检查最新动态
-            elif len(dynamics) > 1 and dynamics[1]["id_str"] != config["last_dynamics"]:
+            elif len(dynamics) > 1 and dynamics[1]["id_str"] != last_dynamics:
                 dynamic_type = dynamics[1].get("type")
                 
                 if dynamic_type == "DYNAMIC_TYPE_LIVE_RCMD":
@@ -156,8 +172,7 @@ def check_bilibili_dynamics(rawEvent, botContext):
                 
                 elif dynamic_type == "DYNAMIC_TYPE_AV":
                     # 新视频
-                    config["last_dynamics"] = dynamics[1]["id_str"]
-                    config_updated = True
+                    botContext["KvSet"]("last_dynamics", dynamics[1]["id_str"])
                     
                     try:
                         title = dynamics[1]["modules"]["module_dynamic"]["major"]["archive"]["title"]
@@ -170,8 +185,7 @@ def check_bilibili_dynamics(rawEvent, botContext):
                 
                 elif dynamic_type == "DYNAMIC_TYPE_DRAW":
                     # 图文动态
-                    config["last_dynamics"] = dynamics[1]["id_str"]
-                    config_updated = True
+                    botContext["KvSet"]("last_dynamics", dynamics[1]["id_str"])
                     
                     try:
                         title = dynamics[1]["modules"]["module_dynamic"]["major"]["opus"]["title"]
@@ -184,33 +198,25 @@ def check_bilibili_dynamics(rawEvent, botContext):
                 
                 elif dynamic_type == "DYNAMIC_TYPE_FORWARD":
                     # 转发动态
-                    config["last_dynamics"] = dynamics[1]["id_str"]
-                    config_updated = True
+                    botContext["KvSet"]("last_dynamics", dynamics[1]["id_str"])
                     message = f"{up_name}转发了一条动态..."
                     messages.extend(create_messages(config["target_groups"], message))
                 
                 else:
                     # 未知类型
-                    config["last_dynamics"] = dynamics[1]["id_str"]
-                    config_updated = True
+                    botContext["KvSet"]("last_dynamics", dynamics[1]["id_str"])
                     message = f"{up_name}大抵是发布了新动态..."
                     messages.extend(create_messages(config["target_groups"], message))
         
         # 成功执行，重置失败计数
-        config["consecutive_fail_count"] = 0
-        config_updated = True
-        
-        # 更新配置
-        if config_updated:
-            botContext["ConfigWriter"](config)
+        botContext["KvSet"]("consecutive_fail_count", 0)
         
         # 返回要发送的消息
         return messages if messages else None
         
     except Exception as e:
         # 失败则计数+1
-        config["consecutive_fail_count"] += 1
-        botContext["ConfigWriter"](config)
+        botContext["KvIncrement"]("consecutive_fail_count")
         raise e  # 重新抛出异常，让框架处理通知
 
 def create_messages(target_groups, text):
@@ -20,7 +20,16 @@ from typing import Tuple, Dict, Any, Optional, List
 MANIFEST = {
     "INITIALIZER": "init_database",
     "MESSAGE_GROUP_BOT": "handle_group_command",
-    "MESSAGE_PRIVATE": "handle_private_command"
+    "MESSAGE_PRIVATE": "handle_private_command",
+    # 只有以下指令前缀的消息才会启动插件进程
+    "TRIGGERS": {
+        "MESSAGE_GROUP_BOT": {"prefix": [".help", ".bot", ".dismiss", ".r", ".set", ".nn", ".coc",
+                                         ".pc", ".st", ".sc", ".ti", ".li", ".en"]},
+        "MESSAGE_PRIVATE": {"prefix": [".help", ".bot", ".dismiss", ".r", ".set", ".nn", ".coc",
+                                       ".pc", ".st", ".sc", ".ti", ".li", ".en"]}
+    },
+    # .bot off 由框架的插件开关实现，关闭后仍需收到 .bot on
+    "SWITCH": {"exempt_prefixes": [".bot"]}
 }
 
 # 配置常量
@@ -505,40 +514,18 @@ def get_db_connection():
     """获取数据库连接"""
     return sqlite3.connect(CONFIG["database_path"])
 
-def ensure_user_exists(user_id: str):
-    """确保用户记录存在"""
+def ensure_records_exist(user_id: str, group_id: str = ""):
+    """确保用户记录存在，群聊中同时确保群组和群组用户记录存在"""
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("INSERT OR IGNORE INTO users (user_id) VALUES (?)", (user_id,))
+    if group_id:
+        cursor.execute("INSERT OR IGNORE INTO groups (group_id) VALUES (?)", (group_id,))
+        cursor.execute("INSERT OR IGNORE INTO group_users (user_id, group_id) VALUES (?, ?)", 
+                       (user_id, group_id))
     conn.commit()
     conn.close()
 
-def ensure_group_exists(group_id: str):
-    """确保群组记录存在"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("INSERT OR IGNORE INTO groups (group_id) VALUES (?)", (group_id,))
-    conn.commit()
-    conn.close()
-
-def ensure_group_user_exists(user_id: str, group_id: str):
-    """确保群组用户记录存在"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("INSERT OR IGNORE INTO group_users (user_id, group_id) VALUES (?, ?)", 
-                   (user_id, group_id))
-    conn.commit()
-    conn.close()
-
-def is_bot_enabled(group_id: str) -> bool:
-    """检查机器人是否在群内开启"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT bot_on FROM groups WHERE group_id = ?", (group_id,))
-    result = cursor.fetchone()
-    conn.close()
-    return result and result[0]
-
 def get_user_nickname(user_id: str, group_id: str = "", rawEvent=None) -> str:
     """获取用户昵称，按优先级：群组昵称 > 全局昵称 > sender nickname"""
     conn = get_db_connection()
@@ -688,6 +675,12 @@ def init_database(botContext):
         );
         """)
         
+        # 旧版本在groups.bot_on中记录开关，迁移到框架的插件开关后复位
+        cursor.execute("SELECT group_id FROM groups WHERE bot_on = 0")
+        for (group_id,) in cursor.fetchall():
+            if botContext["PluginSwitch"]("group", group_id, False):
+                cursor.execute("UPDATE groups SET bot_on = 1 WHERE group_id = ?", (group_id,))
+        
         conn.commit()
         conn.close()
         
@@ -721,21 +714,14 @@ def handle_command(simpleEvent, rawEvent, botContext, is_group: bool):
         if len(message) > CONFIG["max_command_length"]:
             return "指令长度超过限制（30字符）"
         
-        # 确保用户和群组数据存在
-        ensure_user_exists(user_id)
-        if is_group:
-            ensure_group_exists(group_id)
-            ensure_group_user_exists(user_id, group_id)
-            
-            # 检查机器人开关状态
-            if not is_bot_enabled(group_id):
-                return None
+        # 确保用户和群组数据存在（机器人关闭的群由框架过滤，不会执行到这里）
+        ensure_records_exist(user_id, group_id)
         
         # 解析指令
         if message.startswith(".help"):
             return cmd_help(message)
         elif message.startswith(".bot"):
-            return cmd_bot(message, group_id, is_group)
+            return cmd_bot(message, group_id, is_group, botContext)
         elif message.startswith(".dismiss"):
             return cmd_dismiss(group_id, is_group)
         elif message.startswith(".r"):
@@ -792,7 +778,7 @@ def cmd_help(message: str) -> str:
     except Exception:
         return "读取帮助文件失败"
 
-def cmd_bot(message: str, group_id: str, is_group: bool) -> str:
+def cmd_bot(message: str, group_id: str, is_group: bool, botContext) -> str:
     """机器人开关指令"""
     if not is_group:
         return "该指令仅限群聊使用"
@@ -803,11 +789,8 @@ def cmd_bot(message: str, group_id: str, is_group: bool) -> str:
     
     new_status = parts[1] == "on"
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE groups SET bot_on = ? WHERE group_id = ?", (new_status, group_id))
-    conn.commit()
-    conn.close()
+    if not botContext["PluginSwitch"]("group", group_id, new_status):
+        return "机器人开关设置失败"
     
     return f"机器人已{'开启' if new_status else '关闭'}"
 
@@ -9,7 +9,10 @@ import anthropic
 API_KEY="****" #在此处输入你的真实API Key
 
 MANIFEST = {
-    "MESSAGE_GROUP": "Lenormand"
+    "MESSAGE_GROUP": "Lenormand",
+    "TRIGGERS": {
+        "MESSAGE_GROUP": {"exact": ["/今日牌阵", "/今日牌阵（解读）"]}
+    }
 }
 
 def Lenormand(simpleEvent, rawEvent):
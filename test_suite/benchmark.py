@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Askr Framework 压测脚本
+复用伪NapCat服务器和事件生成器，按指定速率和事件配比驱动框架，
+统计吞吐量、端到端延迟分位数、框架进程内存和线程数，结果写入可对比的JSON文件
+"""
+
+import os
+import sys
+import time
+import json
+import random
+import argparse
+import threading
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+
+# 导入伪NapCat服务器
+from fake_napcat import FakeNapCat, TestEventGenerator
+
+# 默认事件配比：私聊、群聊、群指令、通知、心跳
+DEFAULT_MIX = "private=4,group=3,group_bot=1,notice=1,heartbeat=1"
+EVENT_KINDS = ["private", "group", "group_bot", "notice", "heartbeat"]
+
+
+def parse_mix(mix_text):
+    """解析事件配比，格式如 private=4,group=3"""
+    mix = {}
+    for item in mix_text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        kind, _, weight = item.partition("=")
+        kind = kind.strip()
+        if kind not in EVENT_KINDS:
+            raise ValueError(f"未知事件类型: {kind}，可选: {EVENT_KINDS}")
+        mix[kind] = float(weight) if weight else 1.0
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("事件配比为空")
+    return mix
+
+
+def percentile(sorted_values, pct):
+    """最近秩法计算分位数"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def latency_summary(latencies):
+    """汇总延迟（毫秒）"""
+    values = sorted(latencies)
+    if not values:
+        return {"count": 0, "mean": None, "p50": None, "p95": None, "p99": None, "max": None}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 2),
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "p99": round(percentile(values, 99), 2),
+        "max": round(values[-1], 2)
+    }
+
+
+class AskrBenchmarkRunner:
+    def __init__(self, args):
+        self.args = args
+        # 压测配置，端口与 run_tests.py 保持一致
+        self.config = {
+            "listen_host": "localhost",
+            "listen_port": 29217,        # 接收框架API调用
+            "framework_url": "http://localhost:29218",  # 向框架发送事件
+            "bot_qq": 123456789,         # 机器人QQ号
+            "admin_qq": 999999999,       # 管理员QQ号
+            "test_user_qq": 111111111,   # 测试用户QQ号
+            "test_group_id": 222222222   # 测试群号
+        }
+
+        self.mix = parse_mix(args.mix)
+        self.fake_napcat = FakeNapCat(self.config)
+        self.event_generator = TestEventGenerator(self.config)
+        self.framework_process = None
+        self.framework_log = None
+        self.random = random.Random(args.seed)
+
+        # 压测状态
+        self.lock = threading.Lock()
+        self.next_seq = 0
+        self.sent = {}          # seq -> (事件类型, 发送时间)
+        self.replied = {}       # seq -> 首次回复时间
+        self.send_failures = 0
+        self.resource_samples = []
+        self.sampling = False
+
+        # 静默伪服务器的逐条打印，压测时只记录回复时间
+        self.fake_napcat.log_api_call = self.record_api_call
+
+    def record_api_call(self, action, data):
+        """记录API调用，识别压测回复"""
+        received = time.perf_counter()
+        if not action.startswith("send_") or not action.endswith("_msg"):
+            return
+        try:
+            text = data["message"][0]["data"]["text"]
+        except (KeyError, IndexError, TypeError):
+            return
+        if not text.startswith("[bench] "):
+            return
+        try:
+            seq = int(text[len("[bench] "):])
+        except ValueError:
+            return
+        with self.lock:
+            self.replied.setdefault(seq, received)
+
+    def build_event(self, kind):
+        """按类型生成事件"""
+        if kind == "private":
+            return self.event_generator.generate_message_private("压测私聊消息")
+        if kind == "group":
+            return self.event_generator.generate_message_group("压测群消息")
+        if kind == "group_bot":
+            return self.event_generator.generate_message_group_bot("/压测指令")
+        if kind == "notice":
+            if self.random.random() < 0.5:
+                return self.event_generator.generate_notice_poke()
+            return self.event_generator.generate_notice_group_increase()
+        # TestEventGenerator 不提供心跳事件，这里按 OneBot 11 格式构造
+        return {
+            "post_type": "meta_event",
+            "meta_event_type": "heartbeat",
+            "status": {"online": True, "good": True},
+            "interval": 5000,
+            "time": int(time.time()),
+            "self_id": self.config["bot_qq"]
+        }
+
+    def send_one(self, kind, measured):
+        """发送一个带压测序号的事件"""
+        event_data = self.build_event(kind)
+        with self.lock:
+            seq = self.next_seq
+            self.next_seq += 1
+        event_data["bench_seq"] = seq
+        event_data["bench_reply_to"] = self.config["test_user_qq"]
+
+        send_time = time.perf_counter()
+        if measured:
+            with self.lock:
+                self.sent[seq] = (kind, send_time)
+
+        success = self.fake_napcat.send_event(event_data)
+        if not success and measured:
+            with self.lock:
+                self.send_failures += 1
+                self.sent.pop(seq, None)
+        return seq, success
+
+    def sample_resources(self):
+        """周期采样框架进程的RSS和线程数"""
+        try:
+            process = psutil.Process(self.framework_process.pid)
+        except psutil.Error:
+            return
+        while self.sampling:
+            try:
+                self.resource_samples.append({
+                    "rss_mb": process.memory_info().rss / 1024 / 1024,
+                    "threads": process.num_threads(),
+                    "children": len(process.children(recursive=True))
+                })
+            except psutil.Error:
+                return
+            time.sleep(self.args.sample_interval)
+
+    def setup_environment(self):
+        """启动伪NapCat服务器和框架"""
+        print("=== 设置压测环境 ===")
+
+        if not os.path.exists(os.path.join("plugins", "test_benchmark_plugin.py")):
+            print("未找到 plugins/test_benchmark_plugin.py，请先复制压测插件")
+            return False
+
+        print("启动伪NapCat服务器...")
+        self.fake_napcat.start_server()
+
+        print("启动Askr框架...")
+        try:
+            # 框架输出写入日志文件，避免管道写满阻塞框架
+            self.framework_log = open(self.args.framework_log, "w", encoding="utf-8")
+            self.framework_process = subprocess.Popen(
+                [sys.executable, "askr_framework.py"],
+                stdout=self.framework_log,
+                stderr=subprocess.STDOUT,
+                text=True
+            )
+        except Exception as e:
+            print(f"启动框架失败: {e}")
+            return False
+
+        # 预热：等待框架初始化并完成首次插件调用
+        print("等待框架初始化...")
+        time.sleep(2)
+        deadline = time.time() + self.args.startup_timeout
+        while time.time() < deadline:
+            if self.framework_process.poll() is not None:
+                print(f"框架启动失败，详见 {self.args.framework_log}")
+                return False
+            seq, success = self.send_one("private", measured=False)
+            if success:
+                wait_until = time.time() + 5
+                while time.time() < wait_until:
+                    with self.lock:
+                        if seq in self.replied:
+                            print("Askr框架已就绪")
+                            return True
+                    time.sleep(0.1)
+            else:
+                time.sleep(1)
+
+        print("框架在限定时间内未就绪")
+        return False
+
+    def run_load(self):
+        """按固定速率开环发送事件"""
+        print(f"\n=== 开始压测: {self.args.rate} 事件/秒，持续 {self.args.duration} 秒 ===")
+        print(f"事件配比: {self.mix}")
+
+        kinds = list(self.mix.keys())
+        weights = [self.mix[k] for k in kinds]
+        interval = 1.0 / self.args.rate
+        total = int(self.args.rate * self.args.duration)
+
+        self.sampling = True
+        sampler = threading.Thread(target=self.sample_resources, daemon=True)
+        sampler.start()
+
+        # 开环：按计划时间发送，不等待上一个请求返回
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.senders) as executor:
+            for i in range(total):
+                scheduled = start + i * interval
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                kind = self.random.choices(kinds, weights)[0]
+                executor.submit(self.send_one, kind, True)
+        send_elapsed = time.perf_counter() - start
+
+        # 等待剩余回复
+        print("等待剩余回复...")
+        drain_deadline = time.time() + self.args.drain_timeout
+        while time.time() < drain_deadline:
+            with self.lock:
+                if all(seq in self.replied for seq in self.sent):
+                    break
+            time.sleep(0.2)
+        total_elapsed = time.perf_counter() - start
+
+        self.sampling = False
+        sampler.join(timeout=self.args.sample_interval * 2)
+
+        return send_elapsed, total_elapsed
+
+    def generate_report(self, send_elapsed, total_elapsed):
+        """生成压测报告"""
+        with self.lock:
+            sent = dict(self.sent)
+            replied = dict(self.replied)
+
+        latencies = []
+        by_kind = {kind: [] for kind in self.mix}
+        for seq, (kind, send_time) in sent.items():
+            if seq in replied:
+                latency = (replied[seq] - send_time) * 1000
+                latencies.append(latency)
+                by_kind[kind].append(latency)
+
+        completed = len(latencies)
+        rss_values = [s["rss_mb"] for s in self.resource_samples]
+        thread_values = [s["threads"] for s in self.resource_samples]
+        child_values = [s["children"] for s in self.resource_samples]
+
+        report = {
+            "parameters": {
+                "rate": self.args.rate,
+                "duration_seconds": self.args.duration,
+                "mix": self.mix,
+                "senders": self.args.senders,
+                "seed": self.args.seed
+            },
+            "throughput": {
+                "sent": len(sent) + self.send_failures,
+                "send_failures": self.send_failures,
+                "completed": completed,
+                "lost": len(sent) - completed,
+                "offered_eps": round((len(sent) + self.send_failures) / send_elapsed, 2) if send_elapsed else 0,
+                "completed_eps": round(completed / total_elapsed, 2) if total_elapsed else 0
+            },
+            "latency_ms": latency_summary(latencies),
+            "latency_ms_by_kind": {kind: latency_summary(values) for kind, values in sorted(by_kind.items())},
+            "resources": {
+                "rss_mb_start": round(rss_values[0], 1) if rss_values else None,
+                "rss_mb_end": round(rss_values[-1], 1) if rss_values else None,
+                "rss_mb_max": round(max(rss_values), 1) if rss_values else None,
+                "threads_max": max(thread_values) if thread_values else None,
+                "threads_end": thread_values[-1] if thread_values else None,
+                "children_max": max(child_values) if child_values else None,
+                "samples": len(self.resource_samples)
+            },
+            "run": {
+                "timestamp": datetime.now().isoformat(),
+                "python": sys.version.split()[0],
+                "cpu_count": os.cpu_count()
+            }
+        }
+
+        with open(self.args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, sort_keys=True)
+
+        latency = report["latency_ms"]
+        print("\n" + "=" * 60)
+        print("压测完成！")
+        print(f"发送: {report['throughput']['sent']}，完成: {completed}，丢失: {report['throughput']['lost']}，发送失败: {self.send_failures}")
+        print(f"吞吐量: {report['throughput']['completed_eps']} 事件/秒")
+        print(f"延迟(ms): p50={latency['p50']} p95={latency['p95']} p99={latency['p99']} max={latency['max']}")
+        print(f"框架RSS峰值: {report['resources']['rss_mb_max']}MB，线程峰值: {report['resources']['threads_max']}")
+        print(f"详细结果已保存到: {self.args.output}")
+        print("=" * 60)
+
+        return report
+
+    def cleanup(self):
+        """清理压测环境"""
+        print("\n清理压测环境...")
+
+        if self.framework_process:
+            try:
+                self.framework_process.terminate()
+                self.framework_process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.framework_process.kill()
+            except Exception as e:
+                print(f"清理框架进程时出错: {e}")
+
+        if self.framework_log:
+            self.framework_log.close()
+
+        print("压测环境清理完成")
+
+    def run(self):
+        """运行压测"""
+        try:
+            if not self.setup_environment():
+                print("环境设置失败，压测终止")
+                return None
+
+            send_elapsed, total_elapsed = self.run_load()
+            return self.generate_report(send_elapsed, total_elapsed)
+
+        except KeyboardInterrupt:
+            print("\n压测被用户中断")
+            return None
+        finally:
+            self.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Askr Framework 压测")
+    parser.add_argument("--rate", type=float, default=20, help="每秒发送事件数")
+    parser.add_argument("--duration", type=float, default=30, help="压测持续秒数")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"事件配比，默认 {DEFAULT_MIX}")
+    parser.add_argument("--senders", type=int, default=16, help="并发发送线程数")
+    parser.add_argument("--seed", type=int, default=0, help="事件配比随机种子")
+    parser.add_argument("--drain-timeout", type=float, default=30, help="发送结束后等待回复的秒数")
+    parser.add_argument("--startup-timeout", type=float, default=60, help="等待框架就绪的秒数")
+    parser.add_argument("--sample-interval", type=float, default=0.5, help="资源采样间隔秒数")
+    parser.add_argument("--output", default="benchmark_result.json", help="结果JSON文件")
+    parser.add_argument("--framework-log", default="benchmark_framework.log", help="框架输出日志文件")
+    args = parser.parse_args()
+
+    print("Askr Framework 压测")
+    print("=" * 60)
+
+    runner = AskrBenchmarkRunner(args)
+    report = runner.run()
+    sys.exit(0 if report else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Askr Framework 微基准测试
+单独测量事件处理路径上的各个函数，换算为校准循环耗时的倍数后与基线对比，超出容差即判定为性能回退
+"""
+
+import os
+import sys
+import time
+import json
+import shutil
+import sqlite3
+import argparse
+import platform
+import datetime
+import tempfile
+import statistics
+
+# 与 run_tests.py 一样默认框架位于当前目录，仓库内直接运行时回退到上级目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import askr_framework as af
+from fake_napcat import TestEventGenerator
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "microbenchmark_baseline.json")
+DEFAULT_TOLERANCE = 0.3
+LIBRARIAN_SIZES = [10000, 100000, 1000000]
+
+# 无操作插件，只用于测量 PluginCallerSingle 的调度开销
+NOOP_PLUGIN = '''MANIFEST = {"MESSAGE_PRIVATE": "noop"}
+
+def noop():
+    return None
+'''
+
+CONFIG = {
+    "listen_host": "localhost",
+    "listen_port": 29217,
+    "framework_url": "http://localhost:29218",
+    "bot_qq": 123456789,
+    "admin_qq": 999999999,
+    "test_user_qq": 111111111,
+    "test_group_id": 222222222
+}
+
+
+def calibration_loop():
+    """固定的纯Python工作量（格式化、字典、JSON往返），耗时只取决于机器和解释器"""
+    total = 0
+    for i in range(100):
+        total += len(f"{i}:{i * 7}")
+    record = {"id": total, "items": [1, 2, 3], "text": "校准"}
+    return json.loads(json.dumps(record, ensure_ascii=False))
+
+
+def measure(func, number, repeat):
+    """运行 repeat 轮，每轮调用 number 次，返回单次调用耗时（微秒）的中位数和最小值"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number * 1e6)
+    return {"median_us": round(statistics.median(samples), 3), "min_us": round(min(samples), 3)}
+
+
+class AskrMicrobenchmark:
+    def __init__(self, args):
+        self.args = args
+        self.generator = TestEventGenerator(CONFIG)
+        self.work_dir = tempfile.mkdtemp(prefix="askr_microbench_")
+        self.results = {}
+        self.calibration_us = None
+
+        # 框架指向临时目录，不触碰真实数据库和插件
+        plugins_dir = os.path.join(self.work_dir, "plugins")
+        os.makedirs(plugins_dir)
+        with open(os.path.join(plugins_dir, "bench_noop.py"), "w", encoding="utf-8") as f:
+            f.write(NOOP_PLUGIN)
+        af.CONFIG['PATHS']['plugins_dir'] = plugins_dir
+        af.CONFIG['PATHS']['database_file'] = os.path.join(self.work_dir, "bench.db")
+        af.CONFIG['ADMIN_NOTIFICATION']['enabled'] = False
+
+    def all_events(self):
+        """TestEventGenerator 生成的全部事件"""
+        names = sorted(n for n in dir(self.generator) if n.startswith("generate_"))
+        return [getattr(self.generator, n)() for n in names]
+
+    def record(self, name, func, number, repeat=None):
+        """测量并记录一个基准"""
+        result = measure(func, number, repeat or self.args.repeat)
+        self.results[name] = result
+        print(f"  {name:<36} {result['median_us']:>12.2f} us")
+
+    def calibrate(self):
+        """测量校准循环，开始和结束各测一次取较小值"""
+        result = measure(calibration_loop, 5000, self.args.repeat)
+        self.calibration_us = result["min_us"] if self.calibration_us is None else min(self.calibration_us, result["min_us"])
+        print(f"  {'calibration':<36} {result['median_us']:>12.2f} us")
+
+    def warm_workers(self):
+        """等预热的工作进程完成导入，进程启动不与后续测量争用CPU"""
+        parsed = af.ParsedEvent(self.generator.generate_message_private())
+        af.PluginCallerSingle("bench_noop:noop", af.InbondMessageParser(parsed), parsed)
+
+    def bench_parsers(self):
+        """事件分类与入站解析"""
+        events = self.all_events()
+        group_events = [
+            self.generator.generate_message_group(),
+            self.generator.generate_message_group_mention(),
+            self.generator.generate_message_group_bot()
+        ]
+        serialized = [(e, json.dumps(e, ensure_ascii=False).encode("utf-8")) for e in events]
+        parsed = [af.ParsedEvent(e, s) for e, s in serialized]
+
+        def event_type_parser():
+            for e in events:
+                af.EventTypeParser(e)
+
+        def group_message_analyzer():
+            for e in group_events:
+                af.GroupMessageAnalyzer(e)
+
+        def parsed_event():
+            for e, s in serialized:
+                af.ParsedEvent(e, s)
+
+        def inbond_message_parser():
+            for p in parsed:
+                af.InbondMessageParser(p)
+
+        # 每次调用覆盖一整组事件，结果按组计
+        self.record(f"EventTypeParser[x{len(events)}]", event_type_parser, 2000)
+        self.record(f"GroupMessageAnalyzer[x{len(group_events)}]", group_message_analyzer, 10000)
+        self.record(f"ParsedEvent[x{len(events)}]", parsed_event, 1000)
+        self.record(f"InbondMessageParser[x{len(parsed)}]", inbond_message_parser, 5000)
+
+    def bench_historian(self):
+        """历史记录写入，包含写线程落盘"""
+        events = [
+            self.generator.generate_message_private(),
+            self.generator.generate_message_group(),
+            self.generator.generate_notice_poke()
+        ]
+        parsed = [af.ParsedEvent(e, json.dumps(e, ensure_ascii=False).encode("utf-8")) for e in events]
+        batch = 300
+
+        def historian_batch():
+            for i in range(batch):
+                af.Historian(parsed[i % len(parsed)])
+            af.HistorianFlusher(30)
+
+        result = measure(historian_batch, 1, self.args.repeat)
+        # 折算为单条事件耗时
+        self.results["Historian"] = {k: round(v / batch, 3) for k, v in result.items()}
+        print(f"  {'Historian':<36} {self.results['Historian']['median_us']:>12.2f} us")
+
+    def populate_history(self, target_rows):
+        """向 GROUP_EVENTS 补足到目标行数，分布在100个群"""
+        connection = sqlite3.connect(af.CONFIG['PATHS']['database_file'])
+        try:
+            current = connection.execute("SELECT COUNT(*) FROM GROUP_EVENTS").fetchone()[0]
+            template = self.generator.generate_message_group("基准测试历史消息")
+            base_time = int(time.time()) - target_rows
+            chunk = 50000
+            while current < target_rows:
+                rows = []
+                for i in range(current, min(current + chunk, target_rows)):
+                    group_id = CONFIG["test_group_id"] + i % 100
+                    template["group_id"] = group_id
+                    template["message_id"] = i
+                    rows.append((group_id, CONFIG["test_user_qq"], "MESSAGE_GROUP",
+                                 json.dumps(template, ensure_ascii=False), base_time + i))
+                with connection:
+                    connection.executemany(
+                        "INSERT INTO GROUP_EVENTS (GROUP_ID, USER_ID, EVENT_TYPE, EVENT_DATA, TIMESTAMP) VALUES (?, ?, ?, ?, ?)",
+                        rows)
+                current += len(rows)
+        finally:
+            connection.close()
+
+    def bench_librarian(self):
+        """历史记录查询，按表规模分别测量"""
+        identifier = {"type": "group", "group_id": CONFIG["test_group_id"]}
+        for size in self.args.sizes:
+            print(f"  准备 {size} 行历史记录...")
+            self.populate_history(size)
+            self.record(f"Librarian[{size}]", lambda: af.Librarian(identifier, 50), 50)
+            self.record(f"SubprocessLibrarian[{size}]", lambda: af.SubprocessLibrarian(identifier, 50), 50)
+
+    def bench_outbound(self):
+        """出站消息解析，发送函数替换为空操作"""
+        private_event = af.ParsedEvent(self.generator.generate_message_private())
+        group_event = af.ParsedEvent(self.generator.generate_message_group())
+        response = [
+            "文本回复",
+            {"action": "send_private_msg", "data": {"user_id": CONFIG["test_user_qq"],
+                                                    "message": [{"type": "text", "data": {"text": "字典回复"}}]}}
+        ]
+
+        original_sender = af.NapCatSender
+        af.NapCatSender = lambda actionEndpoint, requestBody: None
+        try:
+            def outbound():
+                af.OutbondMessageParser(response, private_event)
+                af.OutbondMessageParser("文本回复", group_event)
+            self.record("OutbondMessageParser[x2]", outbound, 10000)
+        finally:
+            af.NapCatSender = original_sender
+
+    def bench_plugin_call(self):
+        """单个无操作插件的完整调用往返"""
+        parsed = af.ParsedEvent(self.generator.generate_message_private())
+        simple_event = af.InbondMessageParser(parsed)
+        handler = "bench_noop:noop"
+
+        # 预热：首次调用包含工作进程启动和插件导入
+        af.PluginCallerSingle(handler, simple_event, parsed)
+        self.record("PluginCallerSingle", lambda: af.PluginCallerSingle(handler, simple_event, parsed), 200)
+
+    def bench_state(self):
+        """插件状态存储的主进程侧操作"""
+        self.record("SharedStateAdder", lambda: af.SharedStateAdder("bench_noop", "counter"), 10000)
+        self.record("SharedStateReader", lambda: af.SharedStateReader("bench_noop", "counter"), 10000)
+        self.record("KvIncrementer", lambda: af.KvIncrementer("bench_noop", "counter"), 2000)
+        af.HistorianFlusher(30)
+
+    def run(self):
+        """运行全部基准"""
+        print("=== 校准 ===")
+        self.calibrate()
+        print("=== 解析 ===")
+        self.bench_parsers()
+        print("=== 出站 ===")
+        self.bench_outbound()
+
+        # 以下基准需要数据库、写线程和插件注册
+        af.InitializerGuard()
+        self.warm_workers()
+        print("=== 历史记录 ===")
+        self.bench_historian()
+        self.bench_librarian()
+        print("=== 状态存储 ===")
+        self.bench_state()
+        print("=== 插件调用 ===")
+        self.bench_plugin_call()
+        print("=== 校准 ===")
+        self.calibrate()
+
+        # 以校准循环为单位，基线在不同机器之间也可以比较；
+        # 取各轮最小值，单核机器上的瞬时负载只会拉高个别轮次
+        for result in self.results.values():
+            result["ratio"] = round(result["min_us"] / self.calibration_us, 3)
+        return self.results
+
+    def metadata(self):
+        """记录测量环境，写入基线便于判断基线是否还适用"""
+        return {
+            "calibration_us": self.calibration_us,
+            "machine": f"{platform.machine()} {platform.processor() or ''}".strip() + f", {os.cpu_count()} CPUs",
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "recorded_at": datetime.datetime.now().strftime("%Y-%m-%d")
+        }
+
+    def cleanup(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+def compare(results, baseline, default_tolerance):
+    """按校准循环倍数与基线对比，返回回退项列表"""
+    regressions = []
+    benchmarks = baseline.get("benchmarks", {})
+    print("\n" + "=" * 60)
+    for name, result in results.items():
+        entry = benchmarks.get(name)
+        if entry is None:
+            print(f"⚪ {name}: 无基线")
+            continue
+        tolerance = entry.get("tolerance", default_tolerance)
+        limit = entry["ratio"] * (1 + tolerance)
+        change = result["ratio"] / entry["ratio"] if entry["ratio"] else float("inf")
+        detail = f"{result['min_us']:.2f}us = 校准x{result['ratio']:.2f}，基线 校准x{entry['ratio']:.2f}"
+        if result["ratio"] > limit:
+            regressions.append(name)
+            print(f"❌ {name}: {detail} (x{change:.2f}，容差 {tolerance:.0%})")
+        else:
+            print(f"✅ {name}: {detail} (x{change:.2f})")
+    print("=" * 60)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Askr Framework 微基准测试")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="基线JSON文件")
+    parser.add_argument("--update-baseline", action="store_true", help="用本次结果覆盖基线")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="基线未指定时的默认容差")
+    parser.add_argument("--repeat", type=int, default=5, help="每个基准的测量轮数")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in LIBRARIAN_SIZES), help="历史记录查询的表规模")
+    parser.add_argument("--output", help="本次结果JSON文件")
+    args = parser.parse_args()
+    args.sizes = [int(s) for s in args.sizes.split(",") if s]
+
+    print("Askr Framework 微基准测试")
+    print("=" * 60)
+
+    benchmark = AskrMicrobenchmark(args)
+    try:
+        results = benchmark.run()
+    finally:
+        benchmark.cleanup()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"meta": benchmark.metadata(), "benchmarks": results}, f, indent=2, ensure_ascii=False, sort_keys=True)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    if args.update_baseline:
+        # 只覆盖本次测到的项，并保留已调整过的单项容差
+        updated = dict(baseline.get("benchmarks", {}))
+        for name, result in results.items():
+            tolerance = updated.get(name, {}).get("tolerance", args.tolerance)
+            updated[name] = {"min_us": result["min_us"], "ratio": result["ratio"], "tolerance": tolerance}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"meta": benchmark.metadata(), "benchmarks": updated}, f, indent=2, ensure_ascii=False, sort_keys=True)
+        print(f"基线已更新: {args.baseline}")
+        sys.exit(0)
+
+    if baseline.get("meta"):
+        meta = baseline["meta"]
+        print(f"基线: {meta['recorded_at']}，{meta['machine']}，Python {meta['python']}，校准 {meta['calibration_us']:.2f}us；"
+              f"本次校准 {benchmark.calibration_us:.2f}us")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"性能回退: {', '.join(regressions)}")
+        sys.exit(1)
+    print("未发现性能回退")
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -5,16 +5,25 @@ Askr Framework 自动化测试脚本
 """
 
 import os
+import re
 import sys
 import time
 import json
+import sqlite3
 import subprocess
 import signal
+import tempfile
 from datetime import datetime
 
+import requests
+
 # 导入伪NapCat服务器
 from fake_napcat import FakeNapCat, TestEventGenerator
 
+# cron表达式测试和写入线程测试直接调用框架函数；与 microbenchmark.py 一样默认框架位于当前目录，仓库内直接运行时回退到上级目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import askr_framework
+
 class AskrTestRunner:
     def __init__(self):
         # 测试配置
@@ -31,6 +40,8 @@ class AskrTestRunner:
         self.fake_napcat = FakeNapCat(self.config)
         self.event_generator = TestEventGenerator(self.config)
         self.framework_process = None
+        self.framework_log_path = "test_framework.log"
+        self.framework_log = None
         self.test_results = {
             "start_time": None,
             "end_time": None,
@@ -51,13 +62,20 @@ class AskrTestRunner:
         self.fake_napcat.start_server()
         print(f"伪NapCat服务器已启动: {self.config['listen_host']}:{self.config['listen_port']}")
         
-        # 启动Askr框架
+        # 每次测试重新开始记录框架输出，重启时追加
+        open(self.framework_log_path, "w", encoding="utf-8").close()
+        return self.start_framework()
+    
+    def start_framework(self):
+        """启动Askr框架并等待初始化"""
         print("启动Askr框架...")
         try:
+            # 框架输出写入日志文件，避免管道写满阻塞框架
+            self.framework_log = open(self.framework_log_path, "a", encoding="utf-8")
             self.framework_process = subprocess.Popen(
                 [sys.executable, "askr_framework.py"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+                stdout=self.framework_log,
+                stderr=subprocess.STDOUT,
                 text=True
             )
             
@@ -67,10 +85,7 @@ class AskrTestRunner:
             
             # 检查框架是否成功启动
             if self.framework_process.poll() is not None:
-                stdout, stderr = self.framework_process.communicate()
-                print(f"框架启动失败:")
-                print(f"STDOUT: {stdout}")
-                print(f"STDERR: {stderr}")
+                print(f"框架启动失败，详见 {self.framework_log_path}")
                 return False
             
             print("Askr框架已启动")
@@ -80,6 +95,27 @@ class AskrTestRunner:
             print(f"启动框架失败: {e}")
             return False
     
+    def stop_framework(self):
+        """停止Askr框架"""
+        if self.framework_process:
+            try:
+                self.framework_process.terminate()
+                self.framework_process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.framework_process.kill()
+            except Exception as e:
+                print(f"清理框架进程时出错: {e}")
+        
+        if self.framework_log:
+            self.framework_log.close()
+            self.framework_log = None
+    
+    def restart_framework(self):
+        """重启Askr框架，用于验证重启后仍然保留的状态"""
+        print("\n重启Askr框架...")
+        self.stop_framework()
+        return self.start_framework()
+    
     def test_event_dispatch(self):
         """测试事件分发功能"""
         print("\n=== 测试事件分发功能 ===")
@@ -348,6 +384,668 @@ class AskrTestRunner:
         else:
             self.record_test_result("插件移除", False, "插件3未被正确移除", response_time)
     
+    def test_triggers(self):
+        """测试TRIGGERS过滤"""
+        print("\n=== 测试TRIGGERS过滤 ===")
+        
+        # 插件5的私聊处理函数收到什么都回复，有无响应只取决于主进程的过滤
+        trigger_cases = [
+            ("/触发精确", True, "exact命中"),
+            ("  /触发精确  ", True, "exact忽略首尾空白"),
+            ("/触发精确 多余内容", False, "exact不接受多余内容"),
+            ("/触发前缀 参数", True, "prefix命中"),
+            ("  /触发前缀参数", True, "prefix忽略开头空白"),
+            ("先说话 /触发前缀", False, "prefix不在开头"),
+            ("消息中间有触发关键词也算", True, "keyword任意位置"),
+            ("/触发正则42", True, "regex命中"),
+            ("/触发正则abc", False, "regex不匹配"),
+            ("毫不相关的私聊消息", False, "未命中任何条件")
+        ]
+        for message, expect_response, description in trigger_cases:
+            self.run_marker_test(self.private_event(message), "[插件5] 私聊收到", f"TRIGGERS {description}",
+                                 expect_response, timeout=5 if expect_response else 3, expected_text=message)
+        
+        # 群聊处理函数没有声明TRIGGERS，不命中私聊条件的消息照常送达
+        self.run_marker_test(self.group_event("无触发条件的群消息"), "[插件5] 群聊收到",
+                             "TRIGGERS 未声明的事件类型照常接收", True)
+    
+    def test_plugin_switch(self):
+        """测试SWITCH插件开关"""
+        print("\n=== 测试SWITCH插件开关 ===")
+        user_id = self.config["test_user_qq"]
+        allowed_group = self.config["test_group_id"]
+        persisted_group = 333333333
+        unlisted_group = 666666666
+        denied_user = 444444444
+        
+        # 管理员指令需要插件名，由插件报告自己的模块名
+        responses, _ = self.send_and_collect(self.private_event("/开关 名称"), "[插件6] 名称")
+        if not responses:
+            self.record_test_result("SWITCH 获取插件名", False, "插件6未响应", 0)
+            return
+        plugin_name = self.message_text(responses[0]).split()[-1]
+        
+        def admin_command(command, expected_text, test_name):
+            self.run_marker_test(self.private_event(command, self.config["admin_qq"]), expected_text, test_name, True)
+        
+        # MANIFEST中的静态列表
+        self.run_marker_test(self.group_event("开关测试"), f"[插件6] 群{allowed_group} 收到", "SWITCH allow列表中的群", True)
+        self.run_marker_test(self.group_event("开关测试", unlisted_group), f"[插件6] 群{unlisted_group} 收到",
+                             "SWITCH allow列表外的群", False, timeout=3)
+        self.run_marker_test(self.group_event("开关测试", user_id=denied_user), f"[插件6] 群{allowed_group} 收到",
+                             "SWITCH deny列表中的用户（群聊）", False, timeout=3)
+        self.run_marker_test(self.private_event("开关测试", denied_user), f"[插件6] 私聊收到 {denied_user}",
+                             "SWITCH deny列表中的用户（私聊）", False, timeout=3)
+        self.run_marker_test(self.private_event("开关测试"), f"[插件6] 私聊收到 {user_id}", "SWITCH 未停用的用户", True)
+        
+        # 插件自己设置运行时开关，停用后只有exempt_prefixes开头的消息送达
+        self.run_marker_test(self.group_event("/开关 关闭"), f"[插件6] 群{allowed_group} 已关闭", "SWITCH 插件关闭本群", True)
+        self.run_marker_test(self.group_event("开关测试"), f"[插件6] 群{allowed_group} 收到", "SWITCH 关闭后不再接收", False, timeout=3)
+        self.run_marker_test(self.group_event("/开关 开启"), f"[插件6] 群{allowed_group} 已开启", "SWITCH exempt_prefixes停用时送达", True)
+        self.run_marker_test(self.group_event("开关测试"), f"[插件6] 群{allowed_group} 收到", "SWITCH 重新开启后接收", True)
+        self.run_marker_test(self.group_event("/开关 恢复"), f"[插件6] 群{allowed_group} 已恢复", "SWITCH 删除运行时开关", True)
+        
+        # 管理员指令：运行时开关优先于MANIFEST，reset恢复MANIFEST中的设置
+        admin_command(f"enable {plugin_name} group {unlisted_group}", ": done", "SWITCH 管理员启用allow列表外的群")
+        self.run_marker_test(self.group_event("开关测试", unlisted_group), f"[插件6] 群{unlisted_group} 收到",
+                             "SWITCH 运行时开关优先于allow列表", True)
+        admin_command(f"reset {plugin_name} group {unlisted_group}", ": done", "SWITCH 管理员reset")
+        self.run_marker_test(self.group_event("开关测试", unlisted_group), f"[插件6] 群{unlisted_group} 收到",
+                             "SWITCH reset后恢复allow列表", False, timeout=3)
+        
+        # 管理员指令参数有误时不做修改并回复原因
+        admin_command("disable no_such_plugin group 1", "Unknown plugin 'no_such_plugin'", "SWITCH 管理员指令未知插件")
+        admin_command(f"disable {plugin_name} channel 1", "Unknown scope 'channel'", "SWITCH 管理员指令未知范围")
+        admin_command(f"disable {plugin_name} group abc", "Invalid group id 'abc'", "SWITCH 管理员指令非数字ID")
+        
+        # 运行时开关持久化，重启后仍然生效
+        admin_command(f"disable {plugin_name} group {persisted_group}", ": done", "SWITCH 管理员停用群")
+        self.run_marker_test(self.group_event("开关测试", persisted_group), f"[插件6] 群{persisted_group} 收到",
+                             "SWITCH 管理员停用后不再接收", False, timeout=3)
+        if not self.restart_framework():
+            self.record_test_result("SWITCH 重启框架", False, "框架重启失败", 0)
+            return
+        self.run_marker_test(self.group_event("开关测试", persisted_group), f"[插件6] 群{persisted_group} 收到",
+                             "SWITCH 重启后停用仍然生效", False, timeout=3)
+        admin_command(f"reset {plugin_name} group {persisted_group}", ": done", "SWITCH 重启后管理员reset")
+        self.run_marker_test(self.group_event("开关测试", persisted_group), f"[插件6] 群{persisted_group} 收到",
+                             "SWITCH reset后重新接收", True)
+    
+    def read_metrics(self):
+        """读取框架的/metrics文本，失败时返回空字符串"""
+        try:
+            return requests.get(f"{self.config['framework_url']}/metrics", timeout=5).text
+        except Exception as e:
+            print(f"读取/metrics失败: {e}")
+            return ""
+    
+    def scheduler_metrics(self):
+        """从/metrics读取各定时任务的计数，返回 {(处理函数名, outcome): 次数}"""
+        # 任务ID为"插件名:处理函数名"，插件文件名可能不同，只取处理函数名
+        pattern = re.compile(r'askr_scheduler_runs_total\{job="[^":]+:(\w+)",outcome="(\w+)"\} (\d+)')
+        return {(job, outcome): int(count) for job, outcome, count in pattern.findall(self.read_metrics())}
+    
+    def service_restart_metrics(self):
+        """从/metrics读取SERVICE按原因统计的重启次数，返回 {原因: 次数}"""
+        pattern = re.compile(r'askr_service_restarts_total\{plugin="[^"]+",reason="(\w+)"\} (\d+)')
+        return {reason: int(count) for reason, count in pattern.findall(self.read_metrics())}
+    
+    def termination_metrics(self):
+        """从/metrics读取所有插件worker在执行中被终止的次数，返回 {原因: 次数}"""
+        pattern = re.compile(r'askr_plugin_terminations_total\{plugin="[^"]+",reason="(\w+)"\} (\d+)')
+        terminations = {}
+        for reason, count in pattern.findall(self.read_metrics()):
+            terminations[reason] = terminations.get(reason, 0) + int(count)
+        return terminations
+    
+    def test_cron_expressions(self):
+        """测试cron表达式的边界情况，直接调用框架的解析和计算函数"""
+        print("\n=== 测试cron表达式 ===")
+        
+        # (表达式, 起始时间, 期望的下一次执行时间)，None表示永不执行；时间均为本地时间
+        next_time_cases = [
+            ("*/15 9-17 * * 1-5", datetime(2026, 10, 16, 17, 50), datetime(2026, 10, 19, 9, 0), "周五收盘后跳到周一"),
+            ("0 0 29 2 *", datetime(2026, 3, 1), datetime(2028, 2, 29), "2月29日只在闰年"),
+            ("0 0 31 * *", datetime(2026, 4, 1), datetime(2026, 5, 31), "跳过没有31日的月份"),
+            ("0 0 30 2 *", datetime(2026, 1, 1), None, "2月30日永不执行"),
+            ("0 9 * * 7", datetime(2026, 10, 19), datetime(2026, 10, 25, 9, 0), "周日写作7"),
+            ("0 9 * * 0", datetime(2026, 10, 19), datetime(2026, 10, 25, 9, 0), "周日写作0"),
+            ("0 0 13 * 5", datetime(2026, 10, 1), datetime(2026, 10, 2), "日和周同时限定时满足其一即可"),
+            ("59 23 31 12 *", datetime(2026, 12, 31, 23, 59), datetime(2027, 12, 31, 23, 59), "恰好在执行时刻时取下一次"),
+            ("5,10-12 * * * *", datetime(2026, 10, 18, 10, 10, 30), datetime(2026, 10, 18, 10, 11), "列表与范围组合")
+        ]
+        for expression, after, expected, description in next_time_cases:
+            test_name = f"cron '{expression}' {description}"
+            try:
+                next_time = askr_framework.CronNextTime(askr_framework.CronParser(expression), after.timestamp())
+            except Exception as e:
+                self.record_test_result(test_name, False, f"解析失败: {e}", 0)
+                continue
+            
+            actual = datetime.fromtimestamp(next_time) if next_time is not None else None
+            if actual == expected:
+                self.record_test_result(test_name, True, f"下一次执行: {actual}", 0)
+            else:
+                self.record_test_result(test_name, False, f"期望 {expected}，实际 {actual}", 0)
+        
+        invalid_cases = [
+            ("60 * * * *", "分钟超出范围"),
+            ("* * * *", "字段数量不足"),
+            ("5-1 * * * *", "范围起点大于终点"),
+            ("*/0 * * * *", "步长为0"),
+            ("* * * 13 *", "月份超出范围"),
+            ("* * 0 * *", "日期为0"),
+            ("a * * * *", "非数字")
+        ]
+        for expression, description in invalid_cases:
+            test_name = f"cron '{expression}' {description}"
+            try:
+                askr_framework.CronParser(expression)
+                self.record_test_result(test_name, False, "应被拒绝但解析成功", 0)
+            except ValueError as e:
+                self.record_test_result(test_name, True, f"按预期拒绝: {e}", 0)
+    
+    def test_historian_failures(self):
+        """测试写入线程只丢弃被数据库拒绝的语句，以及配置和键值未能保存时的内存回滚，在测试进程中对临时数据库运行框架的写入线程"""
+        print("\n=== 测试写入失败的处理 ===")
+        paths = askr_framework.CONFIG['PATHS']
+        original_database = paths['database_file']
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths['database_file'] = os.path.join(temp_dir, "historian_test.db")
+            try:
+                askr_framework.DatabaseInitializer()
+                askr_framework.HistorianStarter()
+                self.check_historian_failures(paths['database_file'])
+            finally:
+                askr_framework.HistorianFlusher()
+                paths['database_file'] = original_database
+    
+    def check_historian_failures(self, database_file):
+        plugin = "historian_test_plugin"
+        event_sql = "INSERT INTO OTHER_EVENTS (EVENT_TYPE, EVENT_DATA, TIMESTAMP) VALUES (?, ?, ?)"
+        results = {}
+        
+        # 写入线程先把该批移出队列再回调，等待回调本身而不是队列清空；键值的回调以没有未确认的写入为准
+        def wait_for_callbacks(*names):
+            deadline = time.time() + 10
+            while ((not all(name in results for name in names) or askr_framework.PLUGIN_KV_PENDING)
+                   and time.time() < deadline):
+                time.sleep(0.1)
+        
+        askr_framework.ConfigCommitter(plugin, '{"v": 1}')
+        askr_framework.KvWriter(plugin, "kept", '"已保存"')
+        askr_framework.KvWriter(plugin, "removed", '"已保存"')
+        askr_framework.HistorianFlusher()
+        
+        # 持有条件变量入队，保证三条语句进入同一批：违反NOT NULL的行、配置写入、正常的事件
+        print("\n测试: 写入 被拒绝的语句只丢弃自身")
+        with askr_framework.HISTORIAN_CONDITION:
+            askr_framework.WriterEnqueuer("OTHER_EVENTS", event_sql, ("BAD", None, 0),
+                                          onCommit=lambda committed: results.__setitem__("bad", committed))
+            askr_framework.ConfigCommitter(plugin, '{"v": 2}', onCommit=lambda version: results.__setitem__("config", version))
+            askr_framework.WriterEnqueuer("OTHER_EVENTS", event_sql, ("GOOD", "{}", 0),
+                                          onCommit=lambda committed: results.__setitem__("good", committed))
+        wait_for_callbacks("bad", "config", "good")
+        
+        database = sqlite3.connect(database_file)
+        try:
+            saved_config = database.execute("SELECT CONFIG_DATA, VERSION FROM PLUGIN_CONFIGS WHERE PLUGIN_NAME = ?", (plugin,)).fetchone()
+            saved_events = [row[0] for row in database.execute("SELECT EVENT_TYPE FROM OTHER_EVENTS")]
+            if results == {"bad": False, "config": 2, "good": True} and saved_config == ('{"v": 2}', 2) and saved_events == ["GOOD"]:
+                self.record_test_result("写入 被拒绝的语句只丢弃自身", True, "同一批的配置和事件均已写入", 0)
+            else:
+                self.record_test_result("写入 被拒绝的语句只丢弃自身", False,
+                                        f"回调 {results}，配置 {saved_config}，事件 {saved_events}", 0)
+            
+            # 删除配置表和键值表使写入在重试后被丢弃，缓存应恢复为已保存的内容，基于被丢弃版本的写入仍被拒绝
+            print("\n测试: 写入 配置未保存时缓存回滚")
+            with database:
+                database.execute("DROP TABLE PLUGIN_CONFIGS")
+                database.execute("DROP TABLE PLUGIN_KV")
+        finally:
+            database.close()
+        
+        lost_version = askr_framework.ConfigCommitter(plugin, '{"v": 3}', onCommit=lambda version: results.__setitem__("lost", version))
+        askr_framework.KvWriter(plugin, "kept", '"未保存"')
+        askr_framework.KvIncrementer(plugin, "kept_counter")
+        askr_framework.KvDeleter(plugin, "removed")
+        wait_for_callbacks("lost")
+        snapshot = askr_framework.ConfigSnapshotGetter(plugin)
+        stale_write = askr_framework.ConfigCommitter(plugin, '{"v": 4}', expectedVersion=lost_version)
+        if results.get("lost", "未回调") is None and snapshot[1] == '{"v": 2}' and snapshot[0] > lost_version and stale_write is None:
+            self.record_test_result("写入 配置未保存时缓存回滚", True, f"恢复为已保存的配置，版本{snapshot[0]}", 0)
+        else:
+            self.record_test_result("写入 配置未保存时缓存回滚", False,
+                                    f"回调 {results.get('lost', '未回调')}，缓存 {snapshot}，基于丢弃版本的写入返回 {stale_write}", 0)
+        
+        print("\n测试: 写入 键值未保存时内存回滚")
+        kv_state = {key: askr_framework.KvReader(plugin, key) for key in ("kept", "kept_counter", "removed")}
+        if kv_state == {"kept": '"已保存"', "kept_counter": None, "removed": '"已保存"'} and not askr_framework.PLUGIN_KV_PENDING:
+            self.record_test_result("写入 键值未保存时内存回滚", True, "修改、新增和删除都恢复为已保存的状态", 0)
+        else:
+            self.record_test_result("写入 键值未保存时内存回滚", False,
+                                    f"键值 {kv_state}，未确认 {askr_framework.PLUGIN_KV_PENDING}", 0)
+    
+    def test_schedule_overlap(self):
+        """测试定时任务的overlap策略"""
+        print("\n=== 测试定时任务overlap策略 ===")
+        initial_api_count = len(self.fake_napcat.api_call_log)
+        metrics_before = self.scheduler_metrics()
+        
+        responses, _ = self.send_and_collect(self.private_event("/重叠测试开始"), "[插件7] 重叠测试已开始")
+        if not responses:
+            self.record_test_result("overlap 启用任务", False, "插件7未响应", 0)
+            return
+        
+        # 任务每3秒到期、每次运行4秒，运行期间必然有下一次到期
+        print("等待定时任务运行16秒...")
+        time.sleep(16)
+        self.send_and_collect(self.private_event("/重叠测试停止"), "[插件7] 重叠测试已停止", timeout=10)
+        time.sleep(5)  # 等待进行中的运行回复
+        
+        runs = {}
+        pattern = re.compile(r"\[插件7\] (\w+) 开始([\d.]+) 结束([\d.]+) 并发(\d+)")
+        for call in self.fake_napcat.api_call_log[initial_api_count:]:
+            match = pattern.search(self.message_text(call))
+            if match:
+                runs.setdefault(match.group(1), []).append((float(match.group(2)), float(match.group(3)), int(match.group(4))))
+        
+        metrics_after = self.scheduler_metrics()
+        def skipped(job):
+            return metrics_after.get((job, "skipped"), 0) - metrics_before.get((job, "skipped"), 0)
+        
+        def gaps(job_runs):
+            job_runs = sorted(job_runs)
+            return [later[0] - earlier[1] for earlier, later in zip(job_runs, job_runs[1:])]
+        
+        # skip：从不并发，上一次结束后等到下一个到期时间才运行
+        skip_runs = runs.get("overlap_skip", [])
+        skip_gaps = gaps(skip_runs)
+        if len(skip_runs) >= 2 and max(run[2] for run in skip_runs) == 1 and min(skip_gaps) >= 1.0 and skipped("overlap_skip") >= 1:
+            self.record_test_result("overlap skip", True, f"运行{len(skip_runs)}次，跳过{skipped('overlap_skip')}次", 0)
+        else:
+            self.record_test_result("overlap skip", False, f"运行记录{skip_runs}，间隔{skip_gaps}，跳过{skipped('overlap_skip')}次", 0)
+        
+        # queue_one：从不并发，上一次结束后立即执行排队的一次；已有排队时到期的运行仍会被跳过
+        queue_runs = runs.get("overlap_queue_one", [])
+        queue_gaps = gaps(queue_runs)
+        if len(queue_runs) >= 3 and max(run[2] for run in queue_runs) == 1 and max(queue_gaps) < 1.0:
+            self.record_test_result("overlap queue_one", True, f"运行{len(queue_runs)}次，最大间隔{max(queue_gaps):.2f}秒", 0)
+        else:
+            self.record_test_result("overlap queue_one", False, f"运行记录{queue_runs}，间隔{queue_gaps}，跳过{skipped('overlap_queue_one')}次", 0)
+        
+        # parallel：到期即运行，前一次未结束时并发执行
+        parallel_runs = runs.get("overlap_parallel", [])
+        if parallel_runs and max(run[2] for run in parallel_runs) >= 2 and skipped("overlap_parallel") == 0:
+            self.record_test_result("overlap parallel", True, f"运行{len(parallel_runs)}次，最大并发{max(run[2] for run in parallel_runs)}", 0)
+        else:
+            self.record_test_result("overlap parallel", False, f"运行记录{parallel_runs}，跳过{skipped('overlap_parallel')}次", 0)
+    
+    def test_schedule_missed(self):
+        """测试定时任务的missed策略：静音期间错过的执行"""
+        print("\n=== 测试定时任务missed策略 ===")
+        
+        # 在每分钟第40秒后静音、下一分钟第10秒解除，两个每分钟执行的任务各错过一次，
+        # 解除静音后距离下一次到期还有50秒，期间的执行只可能是补执行
+        second = datetime.now().second
+        if not 40 <= second < 50:
+            print("等待到每分钟第40秒...")
+            time.sleep((40 - second) % 60)
+        
+        responses, _ = self.send_and_collect(self.private_event("/错过测试开始"), "[插件8] 错过测试已开始")
+        if not responses:
+            self.record_test_result("missed 启用任务", False, "插件8未响应", 0)
+            return
+        
+        metrics_before = self.scheduler_metrics()
+        self.fake_napcat.send_event(self.private_event("mute", self.config["admin_qq"]))
+        print("静音，等待跨过整分钟...")
+        time.sleep(70 - datetime.now().second)
+        
+        initial_api_count = len(self.fake_napcat.api_call_log)
+        self.fake_napcat.send_event(self.private_event("unmute", self.config["admin_qq"]))
+        time.sleep(5)
+        self.send_and_collect(self.private_event("/错过测试停止"), "[插件8] 错过测试已停止")
+        
+        reported = [self.message_text(call) for call in self.fake_napcat.api_call_log[initial_api_count:]
+                    if "[插件8] missed_" in self.message_text(call)]
+        metrics_after = self.scheduler_metrics()
+        def missed(job):
+            return metrics_after.get((job, "missed"), 0) - metrics_before.get((job, "missed"), 0)
+        
+        catch_up_runs = [text for text in reported if "missed_catch_up" in text]
+        if len(catch_up_runs) == 1 and missed("missed_catch_up") >= 1:
+            self.record_test_result("missed catch_up", True, f"错过{missed('missed_catch_up')}次，解除静音后补执行一次", 0)
+        else:
+            self.record_test_result("missed catch_up", False, f"补执行{len(catch_up_runs)}次，错过{missed('missed_catch_up')}次", 0)
+        
+        skip_runs = [text for text in reported if "missed_skip" in text]
+        if not skip_runs and missed("missed_skip") >= 1:
+            self.record_test_result("missed skip", True, f"错过{missed('missed_skip')}次，解除静音后没有补执行", 0)
+        else:
+            self.record_test_result("missed skip", False, f"补执行{len(skip_runs)}次，错过{missed('missed_skip')}次", 0)
+    
+    def test_schedule_restart_phase(self):
+        """测试固定间隔任务在框架重启后沿用上次到期时间的相位"""
+        print("\n=== 测试固定间隔任务重启相位 ===")
+        period = 30
+        pattern = re.compile(r"\[插件12\] phase_probe 执行 ([\d.]+)")
+        
+        def wait_for_run(timeout):
+            initial_api_count = len(self.fake_napcat.api_call_log)
+            runs = self.fake_napcat.wait_for_responses(1, timeout=timeout,
+                                                       filter_func=lambda call: pattern.search(self.message_text(call)) is not None,
+                                                       start_from_count=initial_api_count)
+            return float(pattern.search(self.message_text(runs[0])).group(1)) if runs else None
+        
+        responses, _ = self.send_and_collect(self.private_event("/相位测试开始"), "[插件12] 相位测试已开始")
+        if not responses:
+            self.record_test_result("固定间隔任务 重启后沿用相位", False, "插件12未响应", 0)
+            return
+        
+        print(f"等待任务执行（间隔{period}秒）...")
+        before_restart = wait_for_run(period + 5)
+        time.sleep(1)  # 等待写入线程保存这次的到期时间
+        
+        if before_restart is None or not self.restart_framework():
+            self.record_test_result("固定间隔任务 重启后沿用相位", False, f"重启前执行时间 {before_restart}", 0)
+            return
+        
+        after_restart = wait_for_run(period + 5)
+        self.send_and_collect(self.private_event("/相位测试停止"), "[插件12] 相位测试已停止")
+        if after_restart is None:
+            self.record_test_result("固定间隔任务 重启后沿用相位", False, "重启后任务没有执行", 0)
+            return
+        
+        # 重新随机选取相位时两次执行的间隔通常不是周期的整数倍
+        elapsed = after_restart - before_restart
+        periods = round(elapsed / period)
+        if periods >= 1 and abs(elapsed - periods * period) < 2:
+            self.record_test_result("固定间隔任务 重启后沿用相位", True, f"重启前后两次执行相隔{elapsed:.1f}秒（{periods}个周期）", 0)
+        else:
+            self.record_test_result("固定间隔任务 重启后沿用相位", False, f"重启前后两次执行相隔{elapsed:.1f}秒，不是{period}秒的整数倍", 0)
+    
+    def test_service_supervisor(self):
+        """测试SERVICE的退避重启、CPU占用率限制和内存限制"""
+        print("\n=== 测试SERVICE监管 ===")
+        initial_api_count = len(self.fake_napcat.api_call_log)
+        
+        responses, _ = self.send_and_collect(self.private_event("/服务测试开始"), "[插件9] 服务测试已开始")
+        if not responses:
+            self.record_test_result("SERVICE 启动测试", False, "插件9未响应", 0)
+            return
+        
+        # 两次异常、一次CPU超限、一次内存超限后第5次启动，退避依次为5、10、20、40秒
+        print("等待服务依次失败并重启（约100秒）...")
+        def is_service_start(call):
+            return "[插件9] 第" in self.message_text(call) and "次启动" in self.message_text(call)
+        
+        starts = self.fake_napcat.wait_for_responses(5, timeout=150, filter_func=is_service_start,
+                                                     start_from_count=initial_api_count)
+        if len(starts) == 5:
+            # 第5次启动连续发出大量消息后返回，等全部送达
+            self.fake_napcat.wait_for_responses(1, timeout=60, filter_func=lambda call: "[插件9] 正常结束" in self.message_text(call),
+                                                start_from_count=initial_api_count)
+        time.sleep(5)  # 第5次启动正常返回后不应再有启动
+        texts = [self.message_text(call) for call in self.fake_napcat.api_call_log[initial_api_count:]]
+        burst = [text for text in texts if text.startswith("[插件9] 突发 ")]
+        texts = [text for text in texts if not text.startswith("[插件9] 突发 ")]
+        starts = [call for call in self.fake_napcat.api_call_log[initial_api_count:] if is_service_start(call)]
+        start_times = [call["timestamp"] for call in starts]
+        restarts = self.service_restart_metrics()
+        
+        if len(starts) < 5:
+            # 测试中途失败时结束仍在占用CPU的服务
+            self.send_and_collect(self.private_event("/服务测试停止"), "[插件9] 服务测试已停止")
+            self.record_test_result("SERVICE 监管", False, f"只启动了{len(starts)}次: {texts}", 0)
+            return
+        
+        gaps = [later - earlier for earlier, later in zip(start_times, start_times[1:])]
+        gap_text = "、".join(f"{gap:.1f}" for gap in gaps)
+        
+        # 退避从5秒开始翻倍；进程启动需要一些时间，上限留出余量
+        if 4.5 <= gaps[0] <= 8 and 9.5 <= gaps[1] <= 14:
+            self.record_test_result("SERVICE 异常后退避重启", True, f"启动间隔 {gap_text} 秒", 0)
+        else:
+            self.record_test_result("SERVICE 异常后退避重启", False, f"启动间隔 {gap_text} 秒，期望约5秒和10秒", 0)
+        
+        # 第3次启动后持续占满CPU，检查周期内被终止，之后退避20秒
+        if restarts.get("cpu_rate_exceeded", 0) >= 1 and 19.5 <= gaps[2] <= 20 + 2 * askr_framework.CONFIG['SERVICE']['cpu_check_interval_seconds'] + 4:
+            self.record_test_result("SERVICE CPU占用率超限", True, f"被终止后重启，间隔 {gaps[2]:.1f} 秒", 0)
+        else:
+            self.record_test_result("SERVICE CPU占用率超限", False, f"重启原因 {restarts}，间隔 {gaps[2]:.1f} 秒", 0)
+        
+        # 第4次启动分配超过RLIMIT_AS的内存，分配失败后退出，之后退避40秒
+        if any("内存分配被拒绝" in text for text in texts) and gaps[3] >= 39.5:
+            self.record_test_result("SERVICE 内存上限", True, f"分配被拒绝后重启，间隔 {gaps[3]:.1f} 秒", 0)
+        else:
+            self.record_test_result("SERVICE 内存上限", False, f"服务回复 {texts}，间隔 {gaps[3]:.1f} 秒", 0)
+        
+        if len(starts) == 5 and any("正常结束" in text for text in texts):
+            self.record_test_result("SERVICE 正常返回后不再重启", True, "第5次启动正常返回，没有再启动", 0)
+        else:
+            self.record_test_result("SERVICE 正常返回后不再重启", False, f"启动了{len(starts)}次: {texts}", 0)
+        
+        # 服务退出时仍留在管道中的消息也要送达，且不重复
+        burst_size = 3000
+        received = {int(text.split()[-1]) for text in burst}
+        if len(burst) == burst_size and received == set(range(burst_size)):
+            self.record_test_result("SERVICE 返回前的消息全部送达", True, f"连续发出的{burst_size}条消息全部收到", 0)
+        else:
+            self.record_test_result("SERVICE 返回前的消息全部送达", False,
+                                    f"收到{len(burst)}条，缺少{len(set(range(burst_size)) - received)}条", 0)
+    
+    def test_deferred_restart(self):
+        """测试延迟回调在框架重启后执行，且只执行一次"""
+        print("\n=== 测试延迟回调跨重启 ===")
+        
+        # 标记区分本次登记的回调和以前中断的测试留在数据库中的回调
+        run_token = str(int(time.time()))
+        down_token, up_token = f"停机{run_token}", f"运行{run_token}"
+        initial_api_count = len(self.fake_napcat.api_call_log)
+        
+        # 一个在框架停止期间到期，启动后立即执行；一个在重启完成后才到期
+        registered = {}
+        for token, delay in ((down_token, 3), (up_token, 25)):
+            responses, _ = self.send_and_collect(self.private_event(f"/延迟测试 登记 {delay} {token}"), f"[插件13] 已登记 {token}")
+            if not responses:
+                self.record_test_result("Defer 登记回调", False, f"登记 {token} 没有收到编号", 0)
+                return
+            registered[token] = self.message_text(responses[0]).split()[-1]
+        
+        if not self.restart_framework():
+            self.record_test_result("Defer 重启框架", False, "框架重启失败", 0)
+            return
+        
+        print("等待重启后到期的回调...")
+        self.fake_napcat.wait_for_responses(1, timeout=30, filter_func=lambda call: f"[插件13] 回调 {up_token}" in self.message_text(call),
+                                            start_from_count=initial_api_count)
+        
+        # 再重启一次，执行过的回调已被删除，不应再次执行
+        self.restart_framework()
+        time.sleep(5)
+        
+        callbacks = [self.message_text(call) for call in self.fake_napcat.api_call_log[initial_api_count:]
+                     if "[插件13] 回调" in self.message_text(call)]
+        for token, description in ((down_token, "停机期间到期"), (up_token, "重启后到期")):
+            fired = [text for text in callbacks if f"[插件13] 回调 {token} " in text]
+            test_name = f"Defer {description}的回调跨重启执行一次"
+            if len(fired) != 1:
+                self.record_test_result(test_name, False, f"执行了{len(fired)}次", 0)
+                continue
+            
+            _, _, _, deferred_id, payload_text = fired[0].split(" ", 4)
+            payload = json.loads(payload_text)
+            if deferred_id == registered[token] and payload == {"token": token, "items": [1, "二", None]}:
+                self.record_test_result(test_name, True, f"回调编号{deferred_id}，payload完整", 0)
+            else:
+                self.record_test_result(test_name, False, f"回调编号{deferred_id}（登记时{registered[token]}），payload {payload}", 0)
+    
+    def test_kv_store(self):
+        """测试KvStore的过期、自增、比较交换、扫描和键数上限"""
+        print("\n=== 测试KvStore ===")
+        
+        # KvStore会持久化，先清除上一次测试留下的键
+        responses, _ = self.send_and_collect(self.private_event("/键值 重置"), "[插件10] 已重置")
+        if not responses:
+            self.record_test_result("KV 重置", False, "插件10未响应", 0)
+            return
+        
+        # 每条指令在插件内核对结果，回复"成功"或第一处不符
+        kv_cases = [
+            ("过期", "KV TTL过期"),
+            ("非数字", "KV 对非数字自增"),
+            ("比较交换", "KV 比较交换"),
+            ("扫描", "KV 按前缀扫描")
+        ]
+        for command, test_name in kv_cases:
+            self.run_marker_test(self.private_event(f"/键值 {command}"), f"[插件10] {command}", test_name,
+                                 True, timeout=10, expected_text="成功")
+        
+        # 同时发出多条抢占指令，比较交换只能有一个获胜者
+        print("\n测试: KV 并发比较交换")
+        contenders = 8
+        initial_api_count = len(self.fake_napcat.api_call_log)
+        for index in range(contenders):
+            self.fake_napcat.send_event(self.private_event(f"/键值 抢占 {index}"))
+        
+        responses = self.fake_napcat.wait_for_responses(contenders, timeout=15,
+                                                       filter_func=lambda call: "[插件10] 抢占" in self.message_text(call),
+                                                       start_from_count=initial_api_count)
+        texts = [self.message_text(call) for call in responses]
+        winners = [text.split()[2] for text in texts if "获胜" in text]
+        saw_absent = sum("看到空" in text for text in texts)
+        owner, _ = self.send_and_collect(self.private_event("/键值 归属"), "[插件10] 归属")
+        owner = self.message_text(owner[0]).split()[-1] if owner else None
+        
+        # 至少两条指令在读写之间重叠，否则没有形成竞争
+        if len(texts) == contenders and len(winners) == 1 and owner == winners[0] and saw_absent >= 2:
+            self.record_test_result("KV 并发比较交换", True, f"{saw_absent}条指令读到键不存在，只有{winners[0]}写入成功", 0)
+        else:
+            self.record_test_result("KV 并发比较交换", False, f"获胜者 {winners}，归属 {owner}，回复 {texts}", 0)
+        
+        # 插件内不断加入新键直到失败，加入的数量与原有键数之和应等于上限；填满和清理产生上万条写入，放在并发测试之后
+        max_keys = askr_framework.CONFIG['PLUGIN_KV']['max_keys_per_plugin']
+        self.run_marker_test(self.private_event(f"/键值 上限 {max_keys}"), "[插件10] 上限", "KV 每个插件的键数上限",
+                             True, timeout=60, expected_text="成功")
+    
+    def test_config_conflict(self):
+        """测试基于同一版本的并发配置写入只有一个被接受，以及不等待提交时的返回值"""
+        print("\n=== 测试配置版本冲突 ===")
+        
+        responses, _ = self.send_and_collect(self.private_event("/配置测试 重置"), "[插件14] 重置")
+        if not responses or not self.message_text(responses[0]).endswith("True"):
+            self.record_test_result("Config 重置配置", False, "插件14未能重置配置", 0)
+            return
+        
+        # 同时发出多条写入指令，读到同一版本的写入中只有第一个提交，其余因版本冲突被拒绝
+        print("\n测试: Config 并发写入版本冲突")
+        contenders = 4
+        initial_api_count = len(self.fake_napcat.api_call_log)
+        for index in range(contenders):
+            self.fake_napcat.send_event(self.private_event(f"/配置测试 写入 {index} 等待"))
+        
+        responses = self.fake_napcat.wait_for_responses(contenders, timeout=15,
+                                                       filter_func=lambda call: "[插件14] 写入" in self.message_text(call),
+                                                       start_from_count=initial_api_count)
+        texts = [self.message_text(call) for call in responses]
+        same_version = [text.split() for text in texts if text.endswith("读到 None")]
+        accepted = [parts[2] for parts in same_version if parts[3] == "True"]
+        rejected = [parts[2] for parts in same_version if parts[3] == "False"]
+        owner, _ = self.send_and_collect(self.private_event("/配置测试 读取"), "[插件14] 读取")
+        owner = self.message_text(owner[0]).split()[-1] if owner else None
+        
+        # 至少两条指令读到同一版本，否则没有形成冲突
+        if (len(texts) == contenders and len(same_version) >= 2 and len(accepted) == 1
+                and len(rejected) == len(same_version) - 1):
+            self.record_test_result("Config 并发写入版本冲突", True,
+                                    f"{len(same_version)}条指令读到同一版本，只有{accepted[0]}写入成功，当前为{owner}", 0)
+        else:
+            self.record_test_result("Config 并发写入版本冲突", False, f"接受 {accepted}，拒绝 {rejected}，回复 {texts}", 0)
+        
+        # 不等待提交时写入尚未确认，返回None而不是True，写入仍在后台完成
+        print("\n测试: Config 不等待提交返回未确认")
+        responses, response_time = self.send_and_collect(self.private_event("/配置测试 写入 后台 不等待"), "[插件14] 写入 后台")
+        owner, _ = self.send_and_collect(self.private_event("/配置测试 读取"), "[插件14] 读取")
+        owner = self.message_text(owner[0]).split()[-1] if owner else None
+        if responses and self.message_text(responses[0]).split()[3] == "None" and owner == "后台":
+            self.record_test_result("Config 不等待提交返回未确认", True, "返回None，之后读到新配置", response_time)
+        else:
+            reply = self.message_text(responses[0]) if responses else None
+            self.record_test_result("Config 不等待提交返回未确认", False, f"回复 {reply}，之后读到 {owner}", response_time)
+    
+    def test_shared_state(self):
+        """测试SharedState的容量、墓碑复用、键长度、并发累加和worker被终止后的恢复"""
+        print("\n=== 测试SharedState ===")
+        shared_config = askr_framework.CONFIG['SHARED_STATE']
+        
+        # 表按max_load限制存活键数；其他插件此前加入的少量键也占用容量
+        print("\n测试: SharedState 填满共享表")
+        max_entries = int(shared_config['slots'] * shared_config['max_load'])
+        responses, response_time = self.send_and_collect(self.private_event("/共享 填满"), "[插件11] 填满", timeout=30)
+        if not responses:
+            self.record_test_result("SharedState 填满共享表", False, "插件11未响应", response_time)
+            return
+        text = self.message_text(responses[0])
+        filled = int(text.split()[2])
+        if "成功" in text and max_entries - 20 <= filled <= max_entries:
+            self.record_test_result("SharedState 填满共享表", True, f"加入{filled}个键后表满（上限{max_entries}）", response_time)
+        else:
+            self.record_test_result("SharedState 填满共享表", False, f"{text}，上限{max_entries}", response_time)
+        
+        self.run_marker_test(self.private_event(f"/共享 复用 {filled}"), "[插件11] 复用", "SharedState 过期后复用墓碑槽位",
+                             True, timeout=30, expected_text="成功")
+        self.run_marker_test(self.private_event("/共享 键长"), "[插件11] 键长", "SharedState 键长度上限",
+                             True, expected_text="成功")
+        
+        # 多条指令同时累加同一个键，分散在多个worker中，总数不能丢失
+        print("\n测试: SharedState 多个worker并发累加")
+        contenders, increments = 8, 20000
+        self.send_and_collect(self.private_event("/共享 删除 counter"), "[插件11] 删除 counter")
+        initial_api_count = len(self.fake_napcat.api_call_log)
+        for _ in range(contenders):
+            self.fake_napcat.send_event(self.private_event(f"/共享 累加 counter {increments}"))
+        
+        responses = self.fake_napcat.wait_for_responses(contenders, timeout=60,
+                                                       filter_func=lambda call: "[插件11] 累加 counter" in self.message_text(call),
+                                                       start_from_count=initial_api_count)
+        total, _ = self.send_and_collect(self.private_event("/共享 读取 counter"), "[插件11] 读取 counter")
+        total = self.message_text(total[0]).split()[-1] if total else None
+        if len(responses) == contenders and total == str(contenders * increments):
+            self.record_test_result("SharedState 多个worker并发累加", True, f"{contenders}条指令各累加{increments}次，总数{total}", 0)
+        else:
+            self.record_test_result("SharedState 多个worker并发累加", False, f"收到{len(responses)}个回复，总数{total}", 0)
+        
+        # worker在累加中超过CPU时间上限被终止，内核释放它持有的锁，之后的操作不会卡住
+        print("\n测试: SharedState worker在操作中被终止")
+        def read_interrupt():
+            responses, _ = self.send_and_collect(self.private_event("/共享 读取 interrupt"), "[插件11] 读取 interrupt")
+            value = self.message_text(responses[0]).split()[-1] if responses else None
+            return int(value) if value is not None and value.isdigit() else None
+        
+        self.send_and_collect(self.private_event("/共享 删除 interrupt"), "[插件11] 删除 interrupt")
+        cpu_kills = self.termination_metrics().get("cpu_time_exceeded", 0)
+        self.fake_napcat.send_event(self.private_event("/共享 中断 interrupt"))
+        
+        # 先确认累加已经开始，再等待worker被终止
+        deadline = time.time() + 15
+        running = None
+        while time.time() < deadline and running is None:
+            running = read_interrupt()
+        while time.time() < deadline and self.termination_metrics().get("cpu_time_exceeded", 0) <= cpu_kills:
+            time.sleep(0.5)
+        killed = self.termination_metrics().get("cpu_time_exceeded", 0) > cpu_kills
+        stopped = read_interrupt()
+        
+        responses, response_time = self.send_and_collect(self.private_event("/共享 累加 interrupt 1"), "[插件11] 累加 interrupt")
+        value = self.message_text(responses[0]).split()[-1] if responses else None
+        if killed and running is not None and stopped is not None and stopped >= running and value == str(stopped + 1):
+            self.record_test_result("SharedState worker在操作中被终止", True, f"被终止前累加到{stopped}，之后的累加正常返回", response_time)
+        else:
+            self.record_test_result("SharedState worker在操作中被终止", False,
+                                    f"worker被终止: {killed}，运行中 {running}，终止后 {stopped}，之后的累加返回 {value}", response_time)
+    
     def run_private_message_test(self, command, test_name, expect_response, timeout, expected_count=1):
         """运行私聊消息测试"""
         print(f"\n测试: {test_name}")
@@ -376,6 +1074,64 @@ class AskrTestRunner:
             response_time = (time.time() - send_time) * 1000
             self.record_test_result(test_name, True, "按预期无响应", response_time)
     
+    def private_event(self, message, user_id=None):
+        """生成指定发送者的私聊消息"""
+        event_data = self.event_generator.generate_message_private(message)
+        if user_id is not None:
+            event_data["user_id"] = event_data["sender"]["user_id"] = user_id
+        return event_data
+    
+    def group_event(self, message, group_id=None, user_id=None):
+        """生成指定群和发送者的群聊消息，指令消息由框架按内容识别"""
+        event_data = self.event_generator.generate_message_group(message)
+        if group_id is not None:
+            event_data["group_id"] = group_id
+        if user_id is not None:
+            event_data["user_id"] = event_data["sender"]["user_id"] = user_id
+        return event_data
+    
+    @staticmethod
+    def message_text(call):
+        """提取API调用中消息的纯文本"""
+        message = call["data"].get("message", "")
+        if isinstance(message, list):
+            return "".join(segment.get("data", {}).get("text", "") for segment in message if isinstance(segment, dict))
+        return str(message)
+    
+    def send_and_collect(self, event_data, marker, expected_count=1, timeout=5):
+        """发送事件并等待文本包含标记的响应，返回响应列表和耗时（毫秒），发送失败时响应为None"""
+        initial_api_count = len(self.fake_napcat.api_call_log)
+        send_time = time.time()
+        
+        if not self.fake_napcat.send_event(event_data):
+            return None, 0
+        
+        responses = self.fake_napcat.wait_for_responses(expected_count, timeout=timeout,
+                                                       filter_func=lambda call: marker in self.message_text(call),
+                                                       start_from_count=initial_api_count)
+        return responses, (time.time() - send_time) * 1000
+    
+    def run_marker_test(self, event_data, marker, test_name, expect_response, timeout=5, expected_text=None):
+        """发送事件并检查是否收到带标记的响应；不期望响应时等满timeout，期望响应时可再检查文本内容"""
+        print(f"\n测试: {test_name}")
+        responses, response_time = self.send_and_collect(event_data, marker, 1, timeout)
+        
+        if responses is None:
+            self.record_test_result(test_name, False, "发送事件失败", 0)
+        elif not expect_response:
+            if responses:
+                self.record_test_result(test_name, False, f"不应响应，实际收到: {self.message_text(responses[0])}", response_time)
+            else:
+                self.record_test_result(test_name, True, "按预期无响应", response_time)
+        elif not responses:
+            self.record_test_result(test_name, False, "未收到响应", response_time)
+        elif expected_text is not None and expected_text not in self.message_text(responses[0]):
+            self.record_test_result(test_name, False, f"响应内容不符: {self.message_text(responses[0])}", response_time)
+        else:
+            self.record_test_result(test_name, True, self.message_text(responses[0]), response_time)
+            self.test_results["response_times"].append(response_time)
+        return responses
+    
     def record_test_result(self, test_name, passed, message, response_time):
         """记录测试结果"""
         result = {
@@ -457,14 +1213,7 @@ class AskrTestRunner:
         """清理测试环境"""
         print("\n清理测试环境...")
         
-        if self.framework_process:
-            try:
-                self.framework_process.terminate()
-                self.framework_process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                self.framework_process.kill()
-            except Exception as e:
-                print(f"清理框架进程时出错: {e}")
+        self.stop_framework()
         
         print("测试环境清理完成")
     
@@ -489,6 +1238,18 @@ class AskrTestRunner:
             self.test_comprehensive_functionality()  # 综合功能测试
             self.test_crash_scenarios()     # 崩溃场景测试
             self.test_unconditional_events() # 定时任务测试
+            self.test_cron_expressions()    # cron表达式测试
+            self.test_historian_failures()  # 写入失败处理测试
+            self.test_schedule_overlap()    # 定时任务overlap策略测试
+            self.test_schedule_missed()     # 定时任务missed策略测试
+            self.test_service_supervisor()  # SERVICE监管测试
+            self.test_kv_store()            # KvStore测试
+            self.test_shared_state()        # SharedState测试
+            self.test_config_conflict()     # 配置版本冲突测试
+            self.test_triggers()            # TRIGGERS过滤测试
+            self.test_plugin_switch()       # 插件开关测试，包含一次框架重启
+            self.test_schedule_restart_phase() # 固定间隔任务重启相位测试，包含一次框架重启
+            self.test_deferred_restart()    # 延迟回调跨重启测试，包含两次框架重启
             
             # 生成报告
             return self.generate_test_report()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+压测插件：回显压测序号
+把事件中的 bench_seq 原样带回，供 benchmark.py 关联事件与回复并计算端到端延迟
+"""
+
+MANIFEST = {
+    "MESSAGE_PRIVATE": "bench_echo",
+    "MESSAGE_GROUP": "bench_echo",
+    "NOTICE_POKE": "bench_echo",
+    "NOTICE_GROUP_INCREASE": "bench_echo",
+    "META_HEARTBEAT": "bench_echo"
+}
+
+def bench_echo(rawEvent):
+    seq = rawEvent.get("bench_seq")
+    if seq is None:
+        return None
+
+    text = [{"type": "text", "data": {"text": f"[bench] {seq}"}}]
+
+    # 群事件回群，其余回给压测用户
+    if rawEvent.get("message_type") == "group":
+        return {
+            "action": "send_group_msg",
+            "data": {"group_id": rawEvent["group_id"], "message": text}
+        }
+
+    return {
+        "action": "send_private_msg",
+        "data": {"user_id": rawEvent.get("bench_reply_to", rawEvent.get("user_id")), "message": text}
+    }
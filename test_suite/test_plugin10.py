@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+测试插件10：KvStore测试
+每条指令在插件内完成一组KvStore操作并核对结果，回复成功或第一处不符，
+覆盖过期、对非数字自增、比较交换、按前缀扫描和每个插件的键数上限；抢占指令用于验证并发比较交换只有一个获胜者（需手动启用）
+"""
+
+import time
+
+MANIFEST = {
+    "MESSAGE_PRIVATE": "handle_command",
+    "TRIGGERS": {"MESSAGE_PRIVATE": {"prefix": ["/键值"]}}
+}
+
+def check_expiry(kv):
+    kv["KvSet"]("ttl:short", 1, ttlSeconds=1)
+    kv["KvSet"]("ttl:long", 2)
+    if kv["KvGet"]("ttl:short") != 1:
+        return "过期前读不到值"
+    
+    time.sleep(1.5)
+    if kv["KvGet"]("ttl:short", "默认") != "默认":
+        return f"过期后仍读到 {kv['KvGet']('ttl:short')!r}"
+    if kv["KvScan"]("ttl:") != {"ttl:long": 2}:
+        return f"扫描包含过期键 {kv['KvScan']('ttl:')}"
+    if kv["KvDelete"]("ttl:short"):
+        return "删除过期键返回True"
+    
+    # 自增不指定ttlSeconds时保留原有过期时间，过期后从0开始计数
+    kv["KvIncrement"]("ttl:counter", 5, ttlSeconds=1)
+    kv["KvIncrement"]("ttl:counter")
+    time.sleep(1.5)
+    if kv["KvIncrement"]("ttl:counter") != 1:
+        return "自增没有保留过期时间"
+    return None
+
+def check_non_number(kv):
+    kv["KvSet"]("text", "abc")
+    kv["KvSet"]("flag", True)
+    if kv["KvIncrement"]("text") is not None:
+        return "对字符串自增没有失败"
+    if kv["KvGet"]("text") != "abc":
+        return f"失败的自增改变了值 {kv['KvGet']('text')!r}"
+    if kv["KvIncrement"]("flag") is not None or kv["KvGet"]("flag") is not True:
+        return "对布尔值自增没有失败"
+    if kv["KvIncrement"]("number", "1") is not None or kv["KvGet"]("number") is not None:
+        return "非数字的增量没有失败"
+    if kv["KvIncrement"]("number", 0.5) != 0.5 or kv["KvIncrement"]("number", 2) != 2.5:
+        return f"数字自增结果错误 {kv['KvGet']('number')!r}"
+    return None
+
+def check_compare_and_swap(kv):
+    absent = kv["KvAbsent"]
+    kv["KvDelete"]("cas")
+    if not kv["KvCompareAndSwap"]("cas", absent, 1):
+        return "键不存在时KvAbsent没有成功"
+    if kv["KvCompareAndSwap"]("cas", absent, 2):
+        return "键存在时KvAbsent成功了"
+    if kv["KvCompareAndSwap"]("cas", 2, 3) or kv["KvGet"]("cas") != 1:
+        return "期望值不符时写入了新值"
+    
+    # 按解码后的值比较，对象的键顺序不影响结果
+    if not kv["KvCompareAndSwap"]("cas", 1, {"a": 1, "b": 2}):
+        return "期望值相符时没有成功"
+    if not kv["KvCompareAndSwap"]("cas", {"b": 2, "a": 1}, None):
+        return "对象的键顺序影响了比较"
+    
+    # None匹配存储的null，不匹配不存在的键
+    if kv["KvGet"]("cas", "默认") is not None:
+        return "存储的null被当作不存在"
+    if not kv["KvCompareAndSwap"]("cas", None, 5):
+        return "None没有匹配存储的null"
+    kv["KvDelete"]("cas")
+    if kv["KvCompareAndSwap"]("cas", None, 6) or kv["KvGet"]("cas") is not None:
+        return "None匹配了不存在的键"
+    return None
+
+def check_scan(kv):
+    for key in ("scan:b", "scan:a", "scan:c", "scanx"):
+        kv["KvSet"](key, key)
+    kv["KvSet"]("scan:0", "即将过期", ttlSeconds=0.5)
+    time.sleep(1)
+    
+    if list(kv["KvScan"]("scan:")) != ["scan:a", "scan:b", "scan:c"]:
+        return f"前缀扫描结果 {list(kv['KvScan']('scan:'))}"
+    if kv["KvScan"]("scan:", limit=2) != {"scan:a": "scan:a", "scan:b": "scan:b"}:
+        return f"limit=2的扫描结果 {kv['KvScan']('scan:', limit=2)}"
+    if len(kv["KvScan"]("scan:", limit=0)) != 3:
+        return "limit=0没有按上限处理"
+    if "scanx" not in kv["KvScan"]("scan") or kv["KvScan"]("不存在的前缀") != {}:
+        return "前缀匹配错误"
+    return None
+
+def check_key_limit(kv, limit):
+    # 其他检查留下的键也占用名额；带过期时间的键过期后应让出名额
+    existing = len(kv["KvScan"]())
+    kv["KvSet"]("cap:expiring", 0, ttlSeconds=2)
+    added = 1
+    while added <= limit and kv["KvSet"](f"cap:{added}", added):
+        added += 1
+    if existing + added != limit:
+        return f"加入{added}个键后失败，原有{existing}个，上限{limit}"
+    
+    if not kv["KvSet"]("cap:1", "覆盖") or kv["KvGet"]("cap:1") != "覆盖":
+        return "已满时无法覆盖已有的键"
+    if kv["KvIncrement"]("cap:new") is not None or kv["KvCompareAndSwap"]("cap:new", kv["KvAbsent"], 1):
+        return "已满时仍能通过自增或比较交换加入新键"
+    if kv["KvGet"]("cap:new") is not None:
+        return "加入失败的键仍然存在"
+    
+    time.sleep(2.5)
+    if not kv["KvSet"]("cap:new", 1):
+        return "过期的键没有让出名额"
+    kv["KvDelete"]("cap:1")
+    if not kv["KvSet"]("cap:other", 1):
+        return "删除键后仍无法加入新键"
+    return None
+
+def delete_keys(kv, prefix=""):
+    # KvScan每次最多返回max_scan_results个键
+    keys = kv["KvScan"](prefix)
+    while keys:
+        for key in keys:
+            kv["KvDelete"](key)
+        keys = kv["KvScan"](prefix)
+
+CHECKS = {
+    "过期": check_expiry,
+    "非数字": check_non_number,
+    "比较交换": check_compare_and_swap,
+    "扫描": check_scan
+}
+
+def handle_command(simpleEvent, botContext):
+    parts = simpleEvent["text_message"].split()
+    if len(parts) < 2:
+        return None
+    command = parts[1]
+    
+    if command == "重置":
+        delete_keys(botContext)
+        return "[插件10] 已重置"
+    
+    if command in CHECKS:
+        problem = CHECKS[command](botContext)
+        return f"[插件10] {command} " + (f"失败: {problem}" if problem else "成功")
+    
+    # 上限由测试脚本从框架配置中读出后传入，检查后删除填入的键
+    if command == "上限" and len(parts) == 3:
+        problem = check_key_limit(botContext, int(parts[2]))
+        delete_keys(botContext, "cap:")
+        return "[插件10] 上限 " + (f"失败: {problem}" if problem else "成功")
+    
+    # 先读再比较交换：读和写之间留出时间，让扩容出的其他worker同时看到键不存在，但只有一个能写入；
+    # 新worker启动可能接近1秒，间隔需要明显更长
+    if command == "抢占" and len(parts) == 3:
+        seen_absent = botContext["KvGet"]("owner") is None
+        time.sleep(3)
+        won = botContext["KvCompareAndSwap"]("owner", botContext["KvAbsent"], parts[2])
+        return f"[插件10] 抢占 {parts[2]} {'获胜' if won else '落败'} {'看到空' if seen_absent else '看到已占'}"
+    
+    if command == "归属":
+        return f"[插件10] 归属 {botContext['KvGet']('owner')}"
+    
+    return None
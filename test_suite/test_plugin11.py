@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+测试插件11：SharedState测试
+填满共享表、过期后复用墓碑槽位、键长度上限在插件内完成并核对；
+累加和中断指令由测试脚本同时或依次发出，验证多个worker并发累加和worker在操作中被终止后的情况（需手动启用）
+"""
+
+MANIFEST = {
+    "MESSAGE_PRIVATE": "handle_command",
+    "TRIGGERS": {"MESSAGE_PRIVATE": {"prefix": ["/共享"]}}
+}
+
+MAX_KEY_BYTES = 96  # 与框架的 SHARED_STATE.max_key_bytes 一致，包含插件名和一个分隔字节
+
+def fill_table(state):
+    count = 0
+    while state["Add"](f"fill:{count}") is not None:
+        count += 1
+    
+    # 表满时已有的键仍然可以累加
+    if state["Add"]("fill:0") != 2 or state["Get"]("fill:0") != 2:
+        return count, "表满后无法累加已有的键"
+    return count, None
+
+def reuse_tombstones(state, count):
+    expired = sum(state["Expire"](f"fill:{index}", 0) for index in range(count))
+    if expired != count:
+        return f"只过期了{expired}个键"
+    
+    # 重新加入同样的键会占用探测路径上的墓碑槽位，值从头计数
+    values_ = [state["Add"](f"fill:{index}") for index in range(count)]
+    failed = sum(value is None for value in values_)
+    reused = sum(value == 1 for value in values_)
+    if failed or reused != count:
+        return f"重新加入时{failed}个失败，{count - failed - reused}个保留了旧值"
+    if state["Add"]("fill:extra") is not None:
+        return "表重新填满后仍能加入新键"
+    return None
+
+def check_key_length(state):
+    limit = MAX_KEY_BYTES - len(__name__.encode('utf-8')) - 1
+    cases = [
+        ("a" * limit, 1),
+        ("a" * (limit + 1), None),
+        ("键" * (limit // 3), 1),  # 每个汉字占3字节
+        ("键" * (limit // 3 + 1), None),
+        ("", None)
+    ]
+    for key, expected in cases:
+        value = state["Add"](key)
+        if value != expected:
+            return f"{len(key.encode('utf-8'))}字节的键返回 {value!r}，期望 {expected!r}（上限{limit}字节）"
+        if value is not None:
+            state["Expire"](key, 0)
+    
+    if state["Add"](42) is not None or state["Get"](42, "默认") != "默认":
+        return "非字符串的键没有被拒绝"
+    return None
+
+def handle_command(simpleEvent, botContext):
+    state = botContext["SharedState"]
+    parts = simpleEvent["text_message"].split()
+    if len(parts) < 2:
+        return None
+    command = parts[1]
+    
+    if command == "填满":
+        count, problem = fill_table(state)
+        return f"[插件11] 填满 {count} " + (f"失败: {problem}" if problem else "成功")
+    
+    # 复用后把填入的键全部过期，不影响之后的测试；此时表中几乎全是墓碑，新键需要主进程压缩后才能加入
+    if command == "复用" and len(parts) == 3:
+        count = int(parts[2])
+        problem = reuse_tombstones(state, count)
+        for index in range(count):
+            state["Expire"](f"fill:{index}", 0)
+        added = sum(state["Add"](f"new:{index}") == 1 for index in range(100))
+        for index in range(100):
+            state["Expire"](f"new:{index}", 0)
+        if problem is None and added != 100:
+            problem = f"墓碑占满后只加入了{added}个新键"
+        return "[插件11] 复用 " + (f"失败: {problem}" if problem else "成功")
+    
+    if command == "键长":
+        problem = check_key_length(state)
+        return "[插件11] 键长 " + (f"失败: {problem}" if problem else "成功")
+    
+    if command == "读取" and len(parts) == 3:
+        return f"[插件11] 读取 {parts[2]} {state['Get'](parts[2])}"
+    
+    if command == "删除" and len(parts) == 3:
+        state["Expire"](parts[2], 0)
+        return f"[插件11] 删除 {parts[2]}"
+    
+    if command == "累加" and len(parts) == 4:
+        value = None
+        for _ in range(int(parts[3])):
+            value = state["Add"](parts[2])
+        return f"[插件11] 累加 {parts[2]} {value}"
+    
+    # 一直累加直到超过CPU时间上限被终止，终止时很可能正持有共享表的锁
+    if command == "中断" and len(parts) == 3:
+        while True:
+            state["Add"](parts[2])
+    
+    return None
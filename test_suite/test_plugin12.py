@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+测试插件12：固定间隔任务重启相位测试
+每30秒执行一次的任务在启用时回复执行时间，框架重启后应沿用上次到期时间的相位，
+而不是重新随机选取（需手动启用，启用标记保存在KvStore中，重启后仍然有效）
+"""
+
+import time
+
+MANIFEST = {
+    "MESSAGE_PRIVATE": "handle_command",
+    "TRIGGERS": {"MESSAGE_PRIVATE": {"prefix": ["/相位测试"]}},
+    "UNCONDITIONAL": {"handler": "phase_probe", "seconds": 30, "jitter": 0}
+}
+
+def handle_command(simpleEvent, botContext):
+    message = simpleEvent["text_message"].strip()
+    
+    if message == "/相位测试开始":
+        botContext["KvSet"]("enabled", True)
+        return "[插件12] 相位测试已开始"
+    
+    if message == "/相位测试停止":
+        botContext["KvDelete"]("enabled")
+        return "[插件12] 相位测试已停止"
+    
+    return None
+
+def phase_probe(botContext):
+    if not botContext["KvGet"]("enabled"):
+        return None
+    
+    return {
+        "action": "send_private_msg",
+        "data": {
+            "user_id": 111111111,
+            "message": [{"type": "text", "data": {"text": f"[插件12] phase_probe 执行 {time.time():.3f}"}}]
+        }
+    }
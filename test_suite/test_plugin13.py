@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+测试插件13：延迟回调测试
+登记指令通过Defer登记带payload的延迟回调，DEFERRED处理函数回复回调编号和payload，
+用于验证回调在框架重启后仍然执行且只执行一次（需手动启用）
+"""
+
+import json
+
+MANIFEST = {
+    "MESSAGE_PRIVATE": "handle_command",
+    "DEFERRED": "on_deferred",
+    "TRIGGERS": {"MESSAGE_PRIVATE": {"prefix": ["/延迟测试"]}}
+}
+
+def handle_command(simpleEvent, botContext):
+    # /延迟测试 登记 <延迟秒数> <标记>
+    parts = simpleEvent["text_message"].split()
+    if len(parts) != 4 or parts[1] != "登记":
+        return None
+    
+    payload = {"token": parts[3], "items": [1, "二", None]}
+    deferredId = botContext["Defer"](float(parts[2]), payload)
+    if deferredId is None:
+        return f"[插件13] 登记失败 {parts[3]}"
+    return f"[插件13] 已登记 {parts[3]} {deferredId}"
+
+def on_deferred(rawEvent):
+    # deferred事件没有会话，需要明确指定接收者
+    payload = rawEvent["payload"]
+    text = f"[插件13] 回调 {payload['token']} {rawEvent['deferred_id']} {json.dumps(payload, ensure_ascii=False)}"
+    return {
+        "action": "send_private_msg",
+        "data": {
+            "user_id": 111111111,
+            "message": [{"type": "text", "data": {"text": text}}]
+        }
+    }
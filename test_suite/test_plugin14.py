@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+测试插件14：配置版本冲突测试
+写入指令先读取配置，等待一段时间后基于读到的版本写入，回复写入结果和读到的内容，
+用于验证同时基于同一版本的写入只有一个被接受，以及不等待提交时返回未确认（需手动启用）
+"""
+
+import time
+
+MANIFEST = {
+    "MESSAGE_PRIVATE": "handle_command",
+    "TRIGGERS": {"MESSAGE_PRIVATE": {"prefix": ["/配置测试"]}}
+}
+
+def handle_command(simpleEvent, botContext):
+    parts = simpleEvent["text_message"].split()
+    if len(parts) < 2:
+        return None
+    command = parts[1]
+    
+    if command == "重置":
+        result = botContext["ConfigWriter"]({}, waitForCommit=True)
+        return f"[插件14] 重置 {result!r}"
+    
+    if command == "读取":
+        return f"[插件14] 读取 {botContext['ConfigReader']().get('owner')}"
+    
+    # /配置测试 写入 <标记> <等待|不等待>：读和写之间留出时间，让扩容出的其他worker读到同一个版本；
+    # 新worker启动可能接近1秒，间隔需要明显更长
+    if command == "写入" and len(parts) == 4:
+        seen = botContext["ConfigReader"]().get("owner")
+        time.sleep(3)
+        result = botContext["ConfigWriter"]({"owner": parts[2]}, waitForCommit=parts[3] == "等待")
+        return f"[插件14] 写入 {parts[2]} {result!r} 读到 {seen}"
+    
+    return None
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+测试插件5：TRIGGERS过滤测试
+私聊处理函数声明了exact/prefix/keyword/regex条件，收到的每条消息都会回复，
+是否回复完全取决于主进程的过滤；群聊处理函数未声明TRIGGERS，照常接收所有群消息
+"""
+
+MANIFEST = {
+    "MESSAGE_PRIVATE": "handle_private",
+    "MESSAGE_GROUP": "handle_group",
+    "TRIGGERS": {
+        "MESSAGE_PRIVATE": {
+            "exact": ["/触发精确"],
+            "prefix": ["/触发前缀"],
+            "keyword": ["触发关键词"],
+            "regex": [r"^/触发正则\d+$"]
+        }
+    }
+}
+
+def handle_private(simpleEvent):
+    """
+    不做任何判断，只有命中TRIGGERS的消息才会到达这里
+    """
+    return f"[插件5] 私聊收到: {simpleEvent['text_message']}"
+
+def handle_group(simpleEvent):
+    """
+    未声明TRIGGERS，所有群消息都会到达；只回复测试消息，避免干扰事件分发测试的响应计数
+    """
+    if "无触发条件" in simpleEvent["text_message"]:
+        return f"[插件5] 群聊收到: {simpleEvent['text_message']}"
+    return None
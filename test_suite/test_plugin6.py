@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+测试插件6：SWITCH插件开关测试
+MANIFEST中只允许测试群222222222和333333333、停用用户444444444，
+并通过exempt_prefixes让"/开关"指令在停用时仍能送达，用于在群内开启和关闭插件
+"""
+
+MANIFEST = {
+    "MESSAGE_PRIVATE": "handle_private",
+    "MESSAGE_GROUP": "handle_group",
+    "SWITCH": {
+        "allow_groups": [222222222, 333333333],
+        "deny_users": [444444444],
+        "exempt_prefixes": ["/开关"]
+    }
+}
+
+def handle_private(simpleEvent):
+    message = simpleEvent["text_message"].strip()
+    
+    # 管理员开关指令需要插件名，即模块名（插件文件名去掉.py）
+    if message == "/开关 名称":
+        return f"[插件6] 名称 {__name__}"
+    
+    if "开关测试" in message:
+        return f"[插件6] 私聊收到 {simpleEvent['user_id']}"
+    
+    return None
+
+def handle_group(simpleEvent, botContext):
+    message = simpleEvent["text_message"].strip()
+    group_id = simpleEvent["group_id"]
+    
+    if message == "/开关 关闭":
+        botContext["PluginSwitch"]("group", group_id, False)
+        return f"[插件6] 群{group_id} 已关闭"
+    
+    if message == "/开关 开启":
+        botContext["PluginSwitch"]("group", group_id, True)
+        return f"[插件6] 群{group_id} 已开启"
+    
+    if message == "/开关 恢复":
+        botContext["PluginSwitch"]("group", group_id, None)
+        return f"[插件6] 群{group_id} 已恢复"
+    
+    # 只回复测试消息，避免干扰事件分发测试的响应计数
+    if "开关测试" in message:
+        return f"[插件6] 群{group_id} 收到"
+    
+    return None
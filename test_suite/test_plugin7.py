@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+测试插件7：定时任务overlap策略测试
+三个每3秒到期、每次运行4秒的任务分别使用skip、queue_one、parallel策略，
+每次运行回复开始时间、结束时间和同一任务的并发数（需手动启用）
+"""
+
+import time
+
+MANIFEST = {
+    "MESSAGE_PRIVATE": "handle_command",
+    "TRIGGERS": {"MESSAGE_PRIVATE": {"prefix": ["/重叠测试"]}},
+    "UNCONDITIONAL": [
+        {"handler": "overlap_skip", "seconds": 3, "jitter": 0, "overlap": "skip"},
+        {"handler": "overlap_queue_one", "seconds": 3, "jitter": 0, "overlap": "queue_one"},
+        {"handler": "overlap_parallel", "seconds": 3, "jitter": 0, "overlap": "parallel"}
+    ]
+}
+
+JOBS = ["overlap_skip", "overlap_queue_one", "overlap_parallel"]
+
+def handle_command(simpleEvent, botContext):
+    state = botContext["SharedState"]
+    message = simpleEvent["text_message"].strip()
+    
+    if message == "/重叠测试开始":
+        for job in JOBS:
+            state["Expire"](f"running:{job}", 0)
+        if not state["Get"]("enabled"):
+            state["Add"]("enabled")
+        return "[插件7] 重叠测试已开始"
+    
+    if message == "/重叠测试停止":
+        state["Expire"]("enabled", 0)
+        return "[插件7] 重叠测试已停止"
+    
+    return None
+
+def slow_run(job, botContext):
+    """
+    未启用时立即返回；启用时运行4秒，比3秒的间隔更长
+    """
+    state = botContext["SharedState"]
+    if not state["Get"]("enabled"):
+        return None
+    
+    start = time.time()
+    concurrent = state["Add"](f"running:{job}")
+    time.sleep(4)
+    state["Add"](f"running:{job}", -1)
+    
+    return {
+        "action": "send_private_msg",
+        "data": {
+            "user_id": 111111111,
+            "message": [{"type": "text", "data": {"text": f"[插件7] {job} 开始{start:.3f} 结束{time.time():.3f} 并发{concurrent}"}}]
+        }
+    }
+
+def overlap_skip(botContext):
+    return slow_run("overlap_skip", botContext)
+
+def overlap_queue_one(botContext):
+    return slow_run("overlap_queue_one", botContext)
+
+def overlap_parallel(botContext):
+    return slow_run("overlap_parallel", botContext)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+测试插件8：定时任务missed策略测试
+两个每分钟执行的cron任务分别使用skip和catch_up策略，
+静音期间错过执行后，只有catch_up任务在解除静音时补执行一次（需手动启用）
+"""
+
+import time
+
+MANIFEST = {
+    "MESSAGE_PRIVATE": "handle_command",
+    "TRIGGERS": {"MESSAGE_PRIVATE": {"prefix": ["/错过测试"]}},
+    "UNCONDITIONAL": [
+        {"handler": "missed_skip", "cron": "* * * * *", "jitter": 0, "missed": "skip"},
+        {"handler": "missed_catch_up", "cron": "* * * * *", "jitter": 0, "missed": "catch_up"}
+    ]
+}
+
+def handle_command(simpleEvent, botContext):
+    state = botContext["SharedState"]
+    message = simpleEvent["text_message"].strip()
+    
+    if message == "/错过测试开始":
+        if not state["Get"]("enabled"):
+            state["Add"]("enabled")
+        return "[插件8] 错过测试已开始"
+    
+    if message == "/错过测试停止":
+        state["Expire"]("enabled", 0)
+        return "[插件8] 错过测试已停止"
+    
+    return None
+
+def report_run(job, botContext):
+    if not botContext["SharedState"]["Get"]("enabled"):
+        return None
+    
+    return {
+        "action": "send_private_msg",
+        "data": {
+            "user_id": 111111111,
+            "message": [{"type": "text", "data": {"text": f"[插件8] {job} 执行 {time.time():.3f}"}}]
+        }
+    }
+
+def missed_skip(botContext):
+    return report_run("missed_skip", botContext)
+
+def missed_catch_up(botContext):
+    return report_run("missed_catch_up", botContext)
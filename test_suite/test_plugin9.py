@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+测试插件9：SERVICE监管测试
+服务每次启动时回复启动次数，依次演示异常退出、CPU占用率超限、内存分配超限和连续发出大量消息后正常返回，
+验证框架的退避重启和资源限制（需手动启用）
+"""
+
+import time
+
+MANIFEST = {
+    "INITIALIZER": "reset_scenario",
+    "SERVICE": "scenario_service",
+    "MESSAGE_PRIVATE": "handle_command",
+    "TRIGGERS": {"MESSAGE_PRIVATE": {"prefix": ["/服务测试"]}}
+}
+
+BURST_SIZE = 3000  # 第5次启动连续发出的消息数
+
+def reset_scenario(botContext):
+    """
+    KvStore会持久化，每次框架启动时清除上一次测试留下的状态
+    """
+    for key in ("started", "stop", "runs"):
+        botContext["KvDelete"](key)
+
+def handle_command(simpleEvent, botContext):
+    message = simpleEvent["text_message"].strip()
+    
+    if message == "/服务测试开始":
+        botContext["KvSet"]("started", True)
+        return "[插件9] 服务测试已开始"
+    
+    # 测试中途失败时让仍在占用CPU的服务结束
+    if message == "/服务测试停止":
+        botContext["KvSet"]("stop", True)
+        return "[插件9] 服务测试已停止"
+    
+    return None
+
+def emit(botContext, text):
+    botContext["Emit"]({
+        "action": "send_private_msg",
+        "data": {
+            "user_id": 111111111,
+            "message": [{"type": "text", "data": {"text": f"[插件9] {text}"}}]
+        }
+    })
+
+def scenario_service(botContext):
+    # 等待测试开始；KvGet经过管道，框架退出后会抛出异常，服务随之结束
+    while not botContext["KvGet"]("started"):
+        time.sleep(0.5)
+    
+    run = botContext["KvIncrement"]("runs")
+    emit(botContext, f"第{run}次启动")
+    
+    # 第1、2次：异常退出，重启间隔应从5秒开始翻倍
+    if run <= 2:
+        raise RuntimeError(f"第{run}次启动故意失败")
+    
+    # 第3次：持续占满CPU，应因CPU占用率超限被终止
+    if run == 3:
+        while not botContext["KvGet"]("stop"):
+            sum(range(1000000))
+        return
+    
+    # 第4次：超过RLIMIT_AS（默认200MB）的分配应失败
+    if run == 4:
+        try:
+            block = bytearray(300 * 1024 * 1024)
+        except MemoryError:
+            emit(botContext, "内存分配被拒绝")
+            raise
+        emit(botContext, f"内存分配未被拒绝 {len(block)}")
+        return
+    
+    # 第5次：连续发出大量消息后立即返回，退出前留在管道中的消息不能丢失；之后框架不应再启动服务
+    for index in range(BURST_SIZE):
+        emit(botContext, f"突发 {index}")
+    emit(botContext, "正常结束")